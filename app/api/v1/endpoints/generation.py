@@ -4,23 +4,47 @@
 import io
 import uuid
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, BackgroundTasks, Query
 from PIL import Image
+from starlette.concurrency import run_in_threadpool
 import structlog
 
 from app.core.config import settings
-from app.services.trellis_service import TrellisService
-from app.models.generation import GenerationRequest, GenerationResponse, GenerationStatus
-from app.services.generation_service import GenerationService
+from app.core.downloads import artifact_response
+from app.core.requester import Requester, get_requester
+from app.core.responses import FastJSONResponse
+from app.core.services import get_generation_service
+from app.core.uploads import check_upload, create_upload_intent
+from app.models.generation import GenerationRequest, GenerationResponse, GenerationStatus, UploadIntent, UploadRequest
+from app.services.generation_scheduler import QueueFull
+from app.services.generation_service import MAX_GLB_LOD, GenerationService
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
 
+@router.post("/upload", response_model=UploadIntent)
+async def create_upload(request: UploadRequest):
+    """
+    Get a presigned target for uploading a photo straight to storage
+    
+    Upload the photo with the returned method, URL, form fields and headers,
+    then pass `image_key` to `/generate` instead of the file.
+    """
+    try:
+        intent = create_upload_intent(request.content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if intent is None:
+        raise HTTPException(status_code=501, detail="Direct uploads are not supported by the storage backend")
+    return UploadIntent(**intent)
+
 @router.post("/generate", response_model=GenerationResponse)
 async def generate_3d_model(
     background_tasks: BackgroundTasks,
-    image: UploadFile = File(...),
+    generation_service: GenerationService = Depends(get_generation_service),
+    requester: Requester = Depends(get_requester),
+    image: Optional[UploadFile] = File(None),
+    image_key: Optional[str] = Form(None),
     seed: int = Form(42),
     ss_guidance_strength: float = Form(7.5),
     ss_sampling_steps: int = Form(12),
@@ -29,8 +53,25 @@ async def generate_3d_model(
 ):
     """
     Generate 3D model from uploaded image
+    
+    Send the photo as `image`, or the `image_key` of a direct upload (see `/upload`).
+    Tasks of premium users (bearer token) are queued ahead of free ones.
     """
     try:
+        if image_key:
+            return await _generate_from_upload(
+                generation_service,
+                requester,
+                image_key,
+                seed=seed,
+                ss_guidance_strength=ss_guidance_strength,
+                ss_sampling_steps=ss_sampling_steps,
+                slat_guidance_strength=slat_guidance_strength,
+                slat_sampling_steps=slat_sampling_steps
+            )
+        if image is None:
+            raise HTTPException(status_code=400, detail="Either image or image_key is required")
+        
         # Validate file
         if not image.content_type in settings.ALLOWED_IMAGE_TYPES:
             raise HTTPException(
@@ -59,15 +100,11 @@ async def generate_3d_model(
             "Starting 3D generation",
             task_id=task_id,
             image_size=pil_image.size,
-            user_id="anonymous"  # TODO: Get from auth
+            user_id=requester.user_id,
+            priority=requester.priority
         )
         
-        # Create TRELLIS service
-        trellis_service = TrellisService()
-        await trellis_service.initialize()
-        
-        # Start generation task
-        generation_service = GenerationService(trellis_service)
+        # Start generation task on the process-wide (warm) service
         await generation_service.start_generation(
             task_id=task_id,
             image=pil_image,
@@ -75,116 +112,163 @@ async def generate_3d_model(
             ss_guidance_strength=ss_guidance_strength,
             ss_sampling_steps=ss_sampling_steps,
             slat_guidance_strength=slat_guidance_strength,
-            slat_sampling_steps=slat_sampling_steps
+            slat_sampling_steps=slat_sampling_steps,
+            user_id=requester.user_id,
+            priority=requester.priority
         )
         
-        return GenerationResponse(
-            task_id=task_id,
-            status=GenerationStatus.PROCESSING,
-            message="3D generation started"
-        )
+        return await generation_service.get_status(task_id)
         
+    except QueueFull as e:
+        raise _queue_full(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Generation request failed", error=str(e))
         raise HTTPException(status_code=500, detail="Generation failed")
 
+async def _generate_from_upload(
+    generation_service: GenerationService,
+    requester: Requester,
+    image_key: str,
+    **parameters
+) -> GenerationResponse:
+    """Start a generation for a photo uploaded straight to storage"""
+    try:
+        await run_in_threadpool(check_upload, image_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    task_id = str(uuid.uuid4())
+    logger.info(
+        "Starting 3D generation",
+        task_id=task_id,
+        image_key=image_key,
+        user_id=requester.user_id,
+        priority=requester.priority
+    )
+    
+    await generation_service.start_generation(
+        task_id=task_id,
+        image_key=image_key,
+        user_id=requester.user_id,
+        priority=requester.priority,
+        **parameters
+    )
+    
+    return await generation_service.get_status(task_id)
+
+def _queue_full(error: QueueFull) -> HTTPException:
+    """503 with a retry hint when the generation queue is at capacity"""
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "30"})
+
+@router.get("/queue")
+async def get_queue_metrics(generation_service: GenerationService = Depends(get_generation_service)):
+    """
+    Generation queue metrics: depth, running tasks, and queue wait times and SLO attainment per priority class
+    
+    Queue figures are this API process's; `tasks` counts tasks per status across all replicas.
+    """
+    return await generation_service.queue_metrics()
+
 @router.get("/status/{task_id}", response_model=GenerationResponse)
 async def get_generation_status(
-    task_id: str
+    task_id: str,
+    generation_service: GenerationService = Depends(get_generation_service)
 ):
     """
     Get generation status by task ID
     """
     try:
-        # For now, return a simple mock status
-        # TODO: Implement proper status tracking with database
-        return GenerationResponse(
-            task_id=task_id,
-            status=GenerationStatus.COMPLETED,
-            message="Mock generation completed",
-            glb_url=f"/api/v1/generation/download/{task_id}/glb",
-            ply_url=f"/api/v1/generation/download/{task_id}/ply",
-            preview_url=f"/api/v1/generation/preview/{task_id}"
-        )
-        
+        # Tasks live on the process-wide service, so they outlive the request that started them
+        return await generation_service.get_status(task_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Task not found")
     except Exception as e:
         logger.error("Status check failed", task_id=task_id, error=str(e))
         raise HTTPException(status_code=500, detail="Status check failed")
 
+@router.delete("/task/{task_id}", response_model=GenerationResponse)
+async def cancel_generation(
+    task_id: str,
+    generation_service: GenerationService = Depends(get_generation_service)
+):
+    """
+    Cancel a generation
+    
+    A queued task is dropped from the queue; a running one stops at the next pipeline stage.
+    """
+    try:
+        return await generation_service.cancel_generation(task_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Task not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @router.get("/download/{task_id}/glb")
-async def download_glb(task_id: str):
+async def download_glb(request: Request, task_id: str, lod: int = Query(0, ge=0, le=MAX_GLB_LOD)):
     """
     Download GLB file for completed generation
+    
+    `lod` selects a level of detail: 0 is full resolution, higher levels are decimated.
+    Supports Range requests and ETag revalidation.
     """
+    suffix = f"_lod{lod}" if lod else ""
+    filename = f"model_{task_id}{suffix}.glb"
     try:
-        # For demo purposes, create a simple mock GLB file
-        import tempfile
-        import os
-        
-        # Create temporary GLB file
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.glb', delete=False) as f:
-            f.write(b"mock_glb_data_for_demo")
-            temp_path = f.name
-        
-        return FileResponse(
-            path=temp_path,
-            filename=f"model_{task_id}.glb",
+        return await artifact_response(
+            request,
+            GenerationService.glb_lod_key(task_id, lod),
+            filename=filename,
             media_type="model/gltf-binary"
         )
-        
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="GLB level of detail not found" if lod else "GLB file not found")
     except Exception as e:
         logger.error("GLB download failed", task_id=task_id, error=str(e))
         raise HTTPException(status_code=500, detail="Download failed")
 
 @router.get("/download/{task_id}/ply")
-async def download_ply(task_id: str):
+async def download_ply(request: Request, task_id: str):
     """
     Download PLY file for completed generation
     """
+    filename = f"model_{task_id}.ply"
     try:
-        # For demo purposes, create a simple mock PLY file
-        import tempfile
-        
-        ply_content = """ply
-format ascii 1.0
-element vertex 3
-property float x
-property float y
-property float z
-end_header
-0.0 0.0 0.0
-1.0 0.0 0.0
-0.0 1.0 0.0
-"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.ply', delete=False) as f:
-            f.write(ply_content)
-            temp_path = f.name
-        
-        return FileResponse(
-            path=temp_path,
-            filename=f"model_{task_id}.ply",
+        return await artifact_response(
+            request,
+            GenerationService.output_key(task_id, "ply"),
+            filename=filename,
             media_type="application/octet-stream"
         )
-        
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="PLY file not found")
     except Exception as e:
         logger.error("PLY download failed", task_id=task_id, error=str(e))
         raise HTTPException(status_code=500, detail="Download failed")
 
 @router.get("/preview/{task_id}")
-async def get_preview_video(task_id: str):
+async def get_preview_video(request: Request, task_id: str):
     """
-    Get preview video for completed generation
+    Get preview video for completed generation (MP4 or animated WebP, see PREVIEW_FORMAT)
     """
     try:
-        # Return a simple JSON response for now
-        from fastapi.responses import JSONResponse
-        return JSONResponse({
-            "message": "Preview video not implemented yet",
-            "task_id": task_id,
-            "note": "This would return an MP4 video file in production"
-        })
-        
+        for extension, media_type in (("mp4", "video/mp4"), ("webp", "image/webp")):
+            try:
+                return await artifact_response(
+                    request,
+                    GenerationService.output_key(task_id, extension),
+                    filename=f"preview_{task_id}.{extension}",
+                    media_type=media_type
+                )
+            except FileNotFoundError:
+                continue
+        return FastJSONResponse({
+            "message": "Preview video not available",
+            "task_id": task_id
+        }, status_code=404)
     except Exception as e:
         logger.error("Preview video failed", task_id=task_id, error=str(e))
         raise HTTPException(status_code=500, detail="Preview failed")
@@ -1,9 +1,9 @@
 """
-Application configuration for Pydantic v1
+Application configuration with defaults (only the variables that are set override them)
 """
 import os
-from typing import List, Optional
-from pydantic import BaseSettings
+from typing import Dict, List, Optional
+from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     """Application settings"""
@@ -30,6 +30,26 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     OUTPUT_DIR: str = "./outputs"
     MAX_FILE_SIZE_MB: int = 10
+    UPLOAD_URL_TTL_SECONDS: int = 600  # Lifetime of presigned direct-to-storage photo uploads
+    
+    # Artifact storage backend: "local" (files under OUTPUT_DIR) or "s3"
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = "photo-to-3d-models"
+    S3_REGION: str = "us-east-1"
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO or other S3-compatible storage
+    ARTIFACT_CACHE_MAX_AGE: int = 31536000  # Artifacts never change once stored
+    ARTIFACT_ENCODINGS: List[str] = ["zstd", "br", "gzip"]  # Precompressed variants, in preference order
+    ARTIFACT_PRECOMPRESS: bool = True  # Create the variants at completion instead of on first download
+    ARTIFACT_SIGNED_URLS: bool = True  # Status responses link short-lived signed URLs instead of API downloads
+    ARTIFACT_URL_TTL_SECONDS: int = 900
+    ARTIFACT_BASE_URL: str = "/files"  # Where the signed file server is reachable (local storage)
+    ARTIFACT_SIGNING_KEY: Optional[str] = None  # None: JWT_SECRET_KEY (nothing is signed while that is the sample value)
+    
+    # Local artifact garbage collection (least recently accessed tasks are evicted first)
+    ARTIFACT_DISK_BUDGET_MB: Optional[int] = None  # None: no size limit
+    ARTIFACT_TTL_HOURS: Optional[float] = None  # None: keep until over budget
+    ARTIFACT_GC_INTERVAL_SECONDS: int = 600
     
     # Security
     JWT_SECRET_KEY: str = "your-secret-key-here"
@@ -41,10 +61,30 @@ class Settings(BaseSettings):
     
     # 3D Generation
     GENERATION_TIMEOUT_SECONDS: int = 300
+    MAX_CONCURRENT_GENERATIONS: int = 3  # Pipeline runs sharing the GPU, the rest wait in the queue
+    MAX_QUEUED_GENERATIONS: Optional[int] = 100  # Waiting tasks before new ones are rejected (None: unbounded)
+    PREMIUM_LATENCY_SLO_SECONDS: Optional[float] = 120.0  # Submit-to-finish target for premium tasks (None: no SLO)
+    FREE_LATENCY_SLO_SECONDS: Optional[float] = None
+    QUEUE_USER_WEIGHTS: Dict[str, int] = {}  # user_id -> jobs per round-robin turn within its class (default 1)
+    TASK_STORE: str = "database"  # "database" (shared by every API process / replica) or "memory" (single process)
+    TASK_MEMORY_LIMIT: Optional[int] = 10000  # Memory store: oldest finished tasks are dropped beyond this
+    TASK_RETENTION_HOURS: Optional[float] = 168  # Finished tasks are purged after this (None: keep)
+    TASK_PURGE_INTERVAL_SECONDS: int = 3600
+    JOB_LEASE_SECONDS: float = 60.0  # Jobs of a replica silent this long are claimed by another one
+    JOB_MAX_ATTEMPTS: int = 3  # Interrupted jobs are retried until this many attempts
+    GLB_LOD_RATIOS: List[float] = [1.0, 0.25, 0.05]  # Triangle fraction per GLB level of detail
+    
+    # Preview video (rendered and encoded frame by frame)
+    PREVIEW_FORMAT: str = "mp4"  # "mp4" (H.264) or "webp" (animated WebP)
+    PREVIEW_FRAMES: int = 120
+    PREVIEW_RESOLUTION: int = 512
+    PREVIEW_FPS: int = 15
+    PREVIEW_QUALITY: Optional[int] = None  # CRF for mp4, 0-100 for webp; None: encoder default
     
     class Config:
         env_file = ".env"
         case_sensitive = True
+        extra = "ignore"  # .env also carries settings of the worker and the ASGI apps
 
 # Global settings instance
 settings = Settings()
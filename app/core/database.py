@@ -1,27 +1,58 @@
 """
 Database configuration and initialization
 """
+import threading
+from typing import Dict
+
 import structlog
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config_v1 import settings
 
 logger = structlog.get_logger(__name__)
 
 # Database engine with SQLite support
-if settings.DATABASE_URL.startswith("sqlite"):
+if settings.DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # One shared connection, otherwise every thread would see its own empty database
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+elif settings.DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         settings.DATABASE_URL, 
         connect_args={"check_same_thread": False}
     )
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_wal(dbapi_connection, connection_record):
+        """Readers do not block the writer when several API processes share the file"""
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
 else:
     engine = create_engine(settings.DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# SQLite has a single writer (and in-memory databases a single shared
+# connection), so calls through one SQLite engine are serialized
+_sqlite_locks: Dict[int, threading.Lock] = {}
+
+def _call_serialized(bind, fn, *args):
+    if bind.dialect.name != "sqlite":
+        return fn(*args)
+    with _sqlite_locks.setdefault(id(bind), threading.Lock()):
+        return fn(*args)
+
+async def run_db(bind, fn, *args):
+    """Run a blocking database call in the threadpool, off the event loop"""
+    return await run_in_threadpool(_call_serialized, bind, fn, *args)
+
 async def init_db():
     """Initialize database"""
     try:
@@ -0,0 +1,49 @@
+"""
+Background artifact sweeper for the API
+
+Runs ml_server/disk_gc.py passes over the local artifact directory in a
+worker thread on a fixed interval, and clears scratch directories left
+behind by a previous process at startup.
+"""
+import asyncio
+import tempfile
+from typing import Optional
+import structlog
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config_v1 import settings
+from ml_server.disk_gc import DiskSweeper, sweep_orphans
+
+logger = structlog.get_logger(__name__)
+
+def create_sweeper() -> Optional[DiskSweeper]:
+    """Sweeper for OUTPUT_DIR, None when no limit is configured or storage is remote"""
+    if settings.STORAGE_BACKEND != "local":
+        return None
+    if settings.ARTIFACT_DISK_BUDGET_MB is None and settings.ARTIFACT_TTL_HOURS is None:
+        return None
+    return DiskSweeper(
+        settings.OUTPUT_DIR,
+        max_bytes=settings.ARTIFACT_DISK_BUDGET_MB * 1024 * 1024 if settings.ARTIFACT_DISK_BUDGET_MB is not None else None,
+        ttl_seconds=settings.ARTIFACT_TTL_HOURS * 3600 if settings.ARTIFACT_TTL_HOURS is not None else None
+    )
+
+async def run_sweeper(sweeper: Optional[DiskSweeper], interval: Optional[float] = None):
+    """Sweep forever (cancel the task to stop); orphaned scratch dirs are removed first"""
+    orphans = await run_in_threadpool(sweep_orphans, tempfile.gettempdir())
+    if orphans["removed"]:
+        logger.info("Removed orphaned scratch files", **orphans)
+
+    interval = interval or settings.ARTIFACT_GC_INTERVAL_SECONDS
+    while sweeper is not None:
+        try:
+            stats = await run_in_threadpool(sweeper.sweep)
+            if stats["groups_evicted"] or stats["orphans_removed"]:
+                logger.info("Artifact sweep", **stats)
+        except Exception as e:
+            logger.error("Artifact sweep failed", error=str(e))
+        await asyncio.sleep(interval)
+
+def start_sweeper() -> asyncio.Task:
+    """Start the background sweeper task"""
+    return asyncio.create_task(run_sweeper(create_sweeper()))
@@ -0,0 +1,189 @@
+"""
+Artifact download responses
+
+Serves stored artifacts with ETag / If-None-Match revalidation, single
+byte-range requests and long-lived Cache-Control headers. Compressible
+artifacts are served from their precompressed zstd / brotli / gzip variant
+when the client accepts one. Local files are sent with the ASGI zero-copy
+extension when the server offers it and read in chunks otherwise; remote
+backends are streamed.
+"""
+from email.utils import formatdate
+from typing import Optional, Tuple
+import anyio
+import structlog
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config_v1 import settings
+from app.core.storage import get_storage
+from ml_server.artifact_encoding import available_encodings, ensure_variant, is_compressible, negotiate
+from ml_server.artifact_storage import ArtifactInfo, ArtifactStorage
+from ml_server.disk_gc import touch_access
+
+logger = structlog.get_logger(__name__)
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the artifact"""
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range
+
+    Returns:
+        (start, length), or None to serve the whole artifact (malformed or
+        multi-range headers are ignored, as RFC 9110 allows)
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the artifact
+    """
+    unit, _, spec = header.partition("=")
+    first, sep, last = spec.partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not sep:
+        return None
+    try:
+        if first.strip():
+            start = int(first)
+            end = int(last) if last.strip() else size - 1
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1) - start + 1
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if header.strip() == "*":
+        return True
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+    return opaque(etag) in (opaque(tag) for tag in header.split(","))
+
+class ArtifactResponse(Response):
+    """Stream a stored artifact (or a byte range of it)"""
+
+    def __init__(
+        self,
+        storage: ArtifactStorage,
+        info: ArtifactInfo,
+        byte_range: Optional[Tuple[int, int]] = None,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None
+    ):
+        self.storage = storage
+        self.info = info
+        self.start, self.length = byte_range or (0, info.size)
+        super().__init__(status_code=206 if byte_range else 200, headers=headers, media_type=media_type)
+        self.headers["content-length"] = str(self.length)
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.start}-{self.start + self.length - 1}/{info.size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        local_path = self.storage.local_path(self.info.key)
+        if local_path and ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            # Kernel-level sendfile, the server copies straight from the file (the extension takes the file object)
+            with open(local_path, "rb") as f:
+                await send({"type": ZEROCOPY_EXTENSION, "file": f, "offset": self.start, "count": self.length, "more_body": False})
+            await run_in_threadpool(touch_access, local_path)
+            return
+
+        if local_path:
+            chunk_size = self.storage.chunk_size
+            async with await anyio.open_file(local_path, "rb") as f:
+                await f.seek(self.start)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            # Downloads keep artifacts warm for the LRU sweeper
+            await run_in_threadpool(touch_access, local_path)
+        else:
+            chunks = self.storage.get_stream(self.info.key, self.start, self.length)
+            async for chunk in iterate_in_threadpool(chunks):
+                await send({"type": "http.response.body", "body": bytes(chunk), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def select_variant(storage: ArtifactStorage, info: ArtifactInfo, accept_encoding: Optional[str]) -> Tuple[ArtifactInfo, Optional[str]]:
+    """
+    Pick the representation to send for an Accept-Encoding header
+
+    The encoded variant is created on first use and reused afterwards; it is
+    only sent when it is actually smaller than the original.
+
+    Returns:
+        (artifact info, content coding or None for identity)
+    """
+    encoding = negotiate(accept_encoding, available_encodings(settings.ARTIFACT_ENCODINGS))
+    if encoding is None:
+        return info, None
+    try:
+        variant = ensure_variant(storage, info.key, encoding)
+    except Exception as e:
+        logger.warning("Could not create encoded variant", key=info.key, encoding=encoding, error=str(e))
+        return info, None
+    if variant.size >= info.size:
+        return info, None
+    return variant, encoding
+
+async def artifact_response(request: Request, key: str, filename: str, media_type: str) -> Response:
+    """
+    Build the response for an artifact download
+
+    Raises:
+        FileNotFoundError: If the key is not stored
+    """
+    storage = get_storage()
+    info = await run_in_threadpool(storage.stat, key)
+    headers = {
+        "cache-control": f"public, max-age={settings.ARTIFACT_CACHE_MAX_AGE}, immutable",
+        "accept-ranges": "bytes",
+    }
+
+    range_header = request.headers.get("range")
+    if is_compressible(key):
+        headers["vary"] = "accept-encoding"
+    if is_compressible(key) and not range_header:
+        # Ranges address the identity bytes (viewers fetch GLB / PLY parts), so they skip the variants
+        info, encoding = await run_in_threadpool(select_variant, storage, info, request.headers.get("accept-encoding"))
+        if encoding:
+            headers["content-encoding"] = encoding
+
+    # Validators describe the selected representation, so each variant has its own ETag
+    headers["etag"] = info.etag
+    headers["last-modified"] = formatdate(info.modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, info.etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["content-disposition"] = f'attachment; filename="{filename}"'
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == info.etag):
+        try:
+            byte_range = parse_range(range_header, info.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"content-range": f"bytes */{info.size}"})
+
+    return ArtifactResponse(storage, info, byte_range, headers=headers, media_type=media_type)
@@ -0,0 +1,55 @@
+"""
+Who is asking
+
+Identifies the user behind a request for scheduling: the ``sub`` and
+``premium`` claims of a bearer token signed with JWT_SECRET_KEY (the token
+mirrors ``User.is_premium``), else the client address, so anonymous clients
+still get their own fair share of the generation queue. Tokens are ignored
+while JWT_SECRET_KEY is a sample value anyone could sign with, so every
+requester is then anonymous and free.
+"""
+from typing import NamedTuple, Optional
+from fastapi import Request
+import structlog
+
+from app.core.config_v1 import settings
+from app.services.generation_scheduler import FREE, PREMIUM
+from ml_server.artifact_storage import usable_secret
+
+try:
+    from jose import JWTError, jwt
+    JOSE_AVAILABLE = True
+except ImportError:
+    JOSE_AVAILABLE = False
+
+logger = structlog.get_logger(__name__)
+
+class Requester(NamedTuple):
+    """The user a generation is queued for"""
+    user_id: str
+    is_premium: bool = False
+
+    @property
+    def priority(self) -> str:
+        """Scheduler priority class"""
+        return PREMIUM if self.is_premium else FREE
+
+def _token_claims(authorization: Optional[str]) -> Optional[dict]:
+    """Claims of a valid bearer token, None if absent, invalid or signed with a sample secret"""
+    scheme, _, token = (authorization or "").partition(" ")
+    secret = usable_secret(settings.JWT_SECRET_KEY)
+    if scheme.lower() != "bearer" or not token or not JOSE_AVAILABLE or secret is None:
+        return None
+    try:
+        return jwt.decode(token, secret, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError as e:
+        logger.warning("Ignoring invalid bearer token", error=str(e))
+        return None
+
+async def get_requester(request: Request) -> Requester:
+    """FastAPI dependency: the requesting user (anonymous clients by address)"""
+    claims = _token_claims(request.headers.get("authorization"))
+    if claims and claims.get("sub"):
+        return Requester(user_id=str(claims["sub"]), is_premium=bool(claims.get("premium", False)))
+    host = request.client.host if request.client else "unknown"
+    return Requester(user_id=f"anonymous:{host}")
@@ -0,0 +1,17 @@
+"""
+JSON responses for the API
+
+Routes and exception handlers render through ml_server/json_codec.py
+(orjson / msgspec when installed, the stdlib otherwise) instead of
+Starlette's ``json.dumps``.
+"""
+from typing import Any
+from fastapi.responses import JSONResponse
+
+from ml_server.json_codec import dumps
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fastest available encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,55 @@
+"""
+Service registry
+
+One warm TrellisService and one GenerationService per process. The
+application lifespan creates them at startup; request handlers receive them
+through ``Depends(get_trellis_service)`` / ``Depends(get_generation_service)``
+and never construct or initialize services themselves. When the lifespan
+did not run (scripts, tests) the first dependency call initializes them once.
+Shutdown hands the process's unfinished generation jobs back to the queue.
+"""
+import asyncio
+from typing import Optional
+
+from app.services.generation_service import GenerationService
+from app.services.trellis_service import TrellisService
+
+_trellis_service: Optional[TrellisService] = None
+_generation_service: Optional[GenerationService] = None
+_lock = asyncio.Lock()  # Concurrent first requests load the pipeline once
+
+async def init_services() -> GenerationService:
+    """Create and warm up the process-wide services (idempotent)"""
+    global _trellis_service, _generation_service
+    if _generation_service is not None:
+        return _generation_service
+    async with _lock:
+        if _generation_service is None:
+            trellis_service = TrellisService()
+            await trellis_service.initialize()
+            _trellis_service = trellis_service
+            _generation_service = GenerationService(trellis_service)
+            _generation_service.start()
+    return _generation_service
+
+async def shutdown_services():
+    """Release the pipeline; the next dependency call initializes again"""
+    global _trellis_service, _generation_service
+    trellis_service, generation_service = _trellis_service, _generation_service
+    _trellis_service = _generation_service = None
+    if generation_service is not None:
+        await generation_service.shutdown()
+    if trellis_service is not None:
+        await trellis_service.cleanup()
+
+def services_ready() -> bool:
+    return _trellis_service is not None and _trellis_service.is_initialized
+
+async def get_trellis_service() -> TrellisService:
+    """FastAPI dependency: the process-wide TrellisService"""
+    await init_services()
+    return _trellis_service
+
+async def get_generation_service() -> GenerationService:
+    """FastAPI dependency: the process-wide GenerationService"""
+    return await init_services()
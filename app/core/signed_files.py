@@ -0,0 +1,80 @@
+"""
+Signed artifact file server
+
+Serves local artifacts behind the HMAC-signed URLs that
+``LocalStorage.presigned_url`` hands out, with the same Range / ETag / cache
+handling as the API downloads, and accepts the direct uploads signed by
+``LocalStorage.presigned_upload``. It holds no task state and touches no
+service, so it can be mounted into the API (``ARTIFACT_BASE_URL="/files"``)
+or run as its own process next to the artifact directory:
+
+    uvicorn app.core.signed_files:app --port 8080
+"""
+import os
+import tempfile
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.core.downloads import artifact_response
+from app.core.storage import get_storage, signing_key
+from app.core.uploads import UPLOAD_PREFIX
+from ml_server.artifact_storage import content_type_for, verify_signature
+
+async def serve_signed_file(request: Request) -> Response:
+    """Send an artifact if the URL signature is valid and not expired"""
+    key = request.path_params["key"]
+    params = request.query_params
+    filename = params.get("filename", "")
+    if not verify_signature(signing_key(), "GET", key, params.get("expires"), params.get("signature"), filename):
+        return PlainTextResponse("Invalid or expired signature", status_code=403)
+    try:
+        return await artifact_response(request, key, filename or os.path.basename(key), content_type_for(key))
+    except (FileNotFoundError, ValueError):
+        return PlainTextResponse("Not found", status_code=404)
+
+async def receive_signed_upload(request: Request) -> Response:
+    """
+    Store a PUT body under a signed key
+
+    Only photo upload keys (``uploads/``) are writable, so even a valid
+    signature cannot overwrite artifacts or control markers. The body is
+    spooled to a temporary file (in memory up to one storage chunk) while
+    its size is checked, then handed to the storage backend.
+    """
+    key = request.path_params["key"]
+    if not key.startswith(UPLOAD_PREFIX):
+        return PlainTextResponse("Only uploads can be written", status_code=403)
+    params = request.query_params
+    content_type = params.get("content_type", "")
+    max_bytes = params.get("max_bytes", "")
+    if not verify_signature(signing_key(), "PUT", key, params.get("expires"), params.get("signature"), content_type, max_bytes):
+        return PlainTextResponse("Invalid or expired signature", status_code=403)
+    if request.headers.get("content-type", "").split(";")[0].strip() != content_type:
+        return PlainTextResponse(f"Content-Type must be {content_type}", status_code=400)
+
+    storage = get_storage()
+    limit = int(max_bytes)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        return PlainTextResponse("Upload too large", status_code=413)
+
+    with tempfile.SpooledTemporaryFile(max_size=storage.chunk_size) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > limit:
+                return PlainTextResponse("Upload too large", status_code=413)
+            spool.write(chunk)
+        if size == 0:
+            return PlainTextResponse("Empty upload", status_code=400)
+        spool.seek(0)
+        info = await run_in_threadpool(storage.put_stream, key, spool, content_type)
+    return Response(status_code=201, headers={"etag": info.etag})
+
+app = Starlette(routes=[
+    Route("/{key:path}", serve_signed_file, methods=["GET", "HEAD"]),
+    Route("/{key:path}", receive_signed_upload, methods=["PUT"]),
+])
@@ -0,0 +1,45 @@
+"""
+Artifact storage for the API
+
+The backends live in ml_server/artifact_storage.py and are shared with the
+RunPod worker; this module configures one from the application settings.
+"""
+from typing import Optional
+import structlog
+
+from app.core.config_v1 import settings
+from ml_server.artifact_storage import ArtifactStorage, create_storage, usable_secret
+
+logger = structlog.get_logger(__name__)
+
+_storage: Optional[ArtifactStorage] = None
+
+def signing_key() -> Optional[str]:
+    """
+    Secret for signed local artifact URLs
+
+    None while only the sample JWT_SECRET_KEY is configured: nothing is
+    signed (downloads go through the API) and no signed URL is accepted.
+    """
+    return usable_secret(settings.ARTIFACT_SIGNING_KEY, settings.JWT_SECRET_KEY)
+
+def get_storage() -> ArtifactStorage:
+    """Get the configured artifact storage backend"""
+    global _storage
+    if _storage is None:
+        options = {}
+        if settings.STORAGE_BACKEND == "local":
+            options = {"base_url": settings.ARTIFACT_BASE_URL, "signing_key": signing_key()}
+            if options["signing_key"] is None:
+                logger.warning("No artifact signing key configured, signed URLs and direct uploads are disabled")
+        _storage = create_storage(
+            settings.STORAGE_BACKEND,
+            root=settings.OUTPUT_DIR,
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            **options
+        )
+        logger.info("Artifact storage initialized", backend=settings.STORAGE_BACKEND)
+    return _storage
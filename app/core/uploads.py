@@ -0,0 +1,58 @@
+"""
+Direct-to-storage photo uploads
+
+Clients ask for an upload intent, send the photo straight to the artifact
+store with the presigned target it contains, and then start a generation
+with the returned key. The photo bytes never pass through the API process.
+"""
+import uuid
+from typing import Optional
+
+from app.core.config_v1 import settings
+from app.core.storage import get_storage
+from ml_server.artifact_storage import ArtifactInfo
+
+UPLOAD_PREFIX = "uploads/"
+IMAGE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+}
+
+def max_upload_bytes() -> int:
+    return settings.MAX_FILE_SIZE_MB * 1024 * 1024
+
+def create_upload_intent(content_type: str) -> Optional[dict]:
+    """
+    Reserve a key for a photo upload and sign a target for it
+
+    Returns:
+        Dict with the ``image_key``, the presigned ``upload`` target and its
+        lifetime, or None if the storage backend cannot sign uploads
+
+    Raises:
+        ValueError: If the content type is not an accepted image type
+    """
+    if content_type not in settings.ALLOWED_IMAGE_TYPES or content_type not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Unsupported file type. Allowed: {settings.ALLOWED_IMAGE_TYPES}")
+    key = f"{UPLOAD_PREFIX}{uuid.uuid4().hex}{IMAGE_EXTENSIONS[content_type]}"
+    upload = get_storage().presigned_upload(key, content_type, max_upload_bytes(), settings.UPLOAD_URL_TTL_SECONDS)
+    if upload is None:
+        return None
+    return {"image_key": key, "upload": upload, "expires_in": settings.UPLOAD_URL_TTL_SECONDS}
+
+def check_upload(key: str) -> ArtifactInfo:
+    """
+    Validate an uploaded photo key before a generation uses it
+
+    Raises:
+        ValueError: If the key was not issued by ``create_upload_intent`` or the upload is too large
+        FileNotFoundError: If nothing was uploaded under the key
+    """
+    name = key[len(UPLOAD_PREFIX):] if key.startswith(UPLOAD_PREFIX) else ""
+    if not name or "/" in name or ".." in name:
+        raise ValueError(f"Invalid upload key: {key}")
+    info = get_storage().stat(key)
+    if info.size > max_upload_bytes():
+        raise ValueError(f"File too large. Max size: {settings.MAX_FILE_SIZE_MB}MB")
+    return info
@@ -2,12 +2,12 @@
 Photo to 3D - Main FastAPI application
 """
 import os
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
 # Optional imports for Railway
 try:
     import structlog
@@ -30,8 +30,12 @@ except ImportError:
 from app.api.v1.api import api_router
 from app.core.config_v1 import settings
 from app.core.database import init_db
+from app.core.disk_gc import start_sweeper
 from app.core.redis_client import init_redis
-from app.services.trellis_service import TrellisService
+from app.core.responses import FastJSONResponse
+from app.core.services import init_services, services_ready, shutdown_services
+from app.core.signed_files import app as signed_files_app
+from app.services.task_store import get_task_store, run_purge
 
 # Configure structured logging if available
 if STRUCTLOG_AVAILABLE:
@@ -55,30 +59,30 @@ if STRUCTLOG_AVAILABLE:
 
 logger = structlog.get_logger(__name__)
 
-# Global services
-trellis_service = None
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global trellis_service
-    
     # Startup
     logger.info("Starting Photo to 3D application - Railway mode")
     
     # Skip database and Redis for Railway deployment
     logger.info("Skipping database and Redis initialization for Railway")
     
-    # Initialize TRELLIS service in mock mode
+    # One warm TRELLIS / generation service per process, injected into routes with Depends
     try:
-        trellis_service = TrellisService()
-        await trellis_service.initialize()
-        app.state.trellis_service = trellis_service
-        logger.info("TRELLIS service initialized in mock mode")
+        generation_service = await init_services()
+        app.state.trellis_service = generation_service.trellis_service
+        app.state.generation_service = generation_service
+        logger.info("TRELLIS service initialized", mock=generation_service.trellis_service.pipeline == "mock")
     except Exception as e:
         logger.warning("Failed to initialize TRELLIS service, continuing without it", error=str(e))
-        # Don't raise - continue without TRELLIS
-        trellis_service = None
+        # Don't raise - the first request retries the initialization
+    
+    # Artifact garbage collection (disk budget / TTL) runs in the background
+    sweeper_task = start_sweeper()
+    
+    # Finished tasks are dropped from the task store after TASK_RETENTION_HOURS
+    purge_task = asyncio.create_task(run_purge(get_task_store()))
     
     logger.info("Application startup complete")
     
@@ -86,8 +90,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Photo to 3D application")
-    if trellis_service:
-        await trellis_service.cleanup()
+    sweeper_task.cancel()
+    purge_task.cancel()
+    await shutdown_services()
 
 # Create FastAPI app
 app = FastAPI(
@@ -95,6 +100,7 @@ app = FastAPI(
     version=settings.VERSION,
     description="AI-powered photo to 3D model generation service",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -116,6 +122,10 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Signed artifact URLs resolve here unless a separate file server is configured
+if settings.STORAGE_BACKEND == "local" and settings.ARTIFACT_BASE_URL.startswith("/"):
+    app.mount(settings.ARTIFACT_BASE_URL, signed_files_app)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -124,7 +134,7 @@ async def health_check():
             "status": "healthy",
             "version": settings.VERSION,
             "mode": "railway_demo",
-            "trellis_loaded": trellis_service is not None
+            "trellis_loaded": services_ready()
         }
     except Exception as e:
         logger.error("Health check failed", error=str(e))
@@ -142,7 +152,7 @@ async def http_exception_handler(request, exc):
         detail=exc.detail,
         path=request.url.path
     )
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail}
     )
@@ -156,7 +166,7 @@ async def general_exception_handler(request, exc):
         path=request.url.path,
         exc_info=True
     )
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -0,0 +1,83 @@
+"""
+3D Generation models
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+class GenerationStatus(str, Enum):
+    """Generation task status"""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class GenerationRequest(BaseModel):
+    """Generation parameters"""
+    seed: int = 42
+    ss_guidance_strength: float = 7.5
+    ss_sampling_steps: int = 12
+    slat_guidance_strength: float = 3.0
+    slat_sampling_steps: int = 12
+
+class GenerationTask(BaseModel):
+    """Generation task state"""
+    task_id: str
+    status: GenerationStatus = GenerationStatus.PENDING
+    image_key: Optional[str] = None
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+
+    # Scheduling
+    owner: Optional[str] = None  # Replica (host:pid) whose scheduler queued the task
+    user_id: str = "anonymous"
+    priority: str = "free"  # Scheduler priority class
+    slo_seconds: Optional[float] = None  # Latency target of the class
+
+    # Output files (artifact storage keys)
+    glb_key: Optional[str] = None
+    glb_lod_keys: List[str] = Field(default_factory=list)  # [1:] are decimated LODs
+    ply_key: Optional[str] = None
+    video_key: Optional[str] = None
+    glb_stats: Optional[Dict[str, Any]] = None  # vertex/face counts, bounds, size (from the GLB header)
+
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    deadline_at: Optional[datetime] = None  # created_at + GENERATION_TIMEOUT_SECONDS
+
+    # Error handling
+    error_message: Optional[str] = None
+    error_code: Optional[str] = None
+
+class GenerationResponse(BaseModel):
+    """Generation status response"""
+    task_id: str
+    status: GenerationStatus
+    message: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    deadline_at: Optional[datetime] = None  # The task fails with error_code "timeout" after it
+    glb_url: Optional[str] = None
+    glb_lod_urls: List[str] = Field(default_factory=list)
+    ply_url: Optional[str] = None
+    preview_url: Optional[str] = None
+    queue_position: Optional[int] = None  # 1-based, while the task waits for a worker
+    priority: Optional[str] = None
+    slo_seconds: Optional[float] = None  # Latency target, submit to finish
+    glb_stats: Optional[Dict[str, Any]] = None
+    parameters: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    error_code: Optional[str] = None
+
+class UploadRequest(BaseModel):
+    """Direct upload request"""
+    content_type: str = "image/jpeg"
+
+class UploadIntent(BaseModel):
+    """Presigned target for a direct-to-storage photo upload"""
+    image_key: str  # Pass to /generate once the upload is done
+    upload: Dict[str, Any]  # method, url, fields (POST form), headers
+    expires_in: int
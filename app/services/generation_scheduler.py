@@ -0,0 +1,351 @@
+"""
+Generation Scheduler
+
+Runs generation jobs on a fixed pool of workers so at most
+MAX_CONCURRENT_GENERATIONS pipeline runs share the GPU; everything else
+waits in a bounded queue. Premium jobs are served before free ones, and
+users of the same class take turns, so one bulk uploader cannot starve the
+others. Queue positions, per-class wait-time percentiles and latency SLO
+attainment are reported for status responses and the queue endpoint.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Sequence
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+WAIT_SAMPLES = 1000  # Recent queue waits kept per priority class for the metrics
+
+Job = Callable[[], Awaitable[None]]
+
+class QueueFull(Exception):
+    """The generation queue is at capacity"""
+
+PREMIUM = "premium"
+FREE = "free"
+PRIORITY_CLASSES = (PREMIUM, FREE)  # Highest priority first
+
+class QueuedJob(NamedTuple):
+    """A job waiting for a worker"""
+    task_id: str
+    run: Job
+    enqueued_at: float  # time.monotonic()
+    priority: str = FREE
+    user_id: str = "anonymous"
+    slo_seconds: Optional[float] = None  # Latency target, submit to finish
+
+class UserQueue:
+    """One user's waiting jobs and their round-robin share"""
+
+    def __init__(self, weight: int):
+        self.jobs: Deque[QueuedJob] = deque()
+        self.weight = weight
+        self.credit = weight  # Jobs still to take before the next user's turn
+
+    def served_within(self, turns: int) -> int:
+        """How many of the user's jobs are taken in its next ``turns`` turns"""
+        if turns <= 0:
+            return 0
+        return min(len(self.jobs), self.credit + (turns - 1) * self.weight)
+
+    def turn_of(self, index: int) -> int:
+        """0-based turn (from now) in which the user's ``index``-th waiting job is taken"""
+        if index < self.credit:
+            return 0
+        return 1 + (index - self.credit) // self.weight
+
+class FairShareQueue:
+    """
+    Jobs ordered by priority class, then fairly across users
+
+    Classes are served in strict priority order. Within a class users take
+    turns (weighted round-robin): the user at the head of the rotation gets
+    ``weight`` jobs (1 unless configured), then moves to the back, so a user
+    with many queued jobs cannot hold back everyone else in the class.
+    """
+
+    def __init__(self, classes: Sequence[str] = PRIORITY_CLASSES, weights: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            classes: Priority classes, highest first
+            weights: Jobs per turn by user id (default 1)
+        """
+        self.classes: Dict[str, "OrderedDict[str, UserQueue]"] = {name: OrderedDict() for name in classes}
+        self.weights = dict(weights or {})
+        self.jobs: Dict[str, QueuedJob] = {}
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def depth(self, priority: str) -> int:
+        return sum(len(user.jobs) for user in self.classes[priority].values())
+
+    def push(self, job: QueuedJob):
+        users = self.classes[job.priority]
+        if job.user_id not in users:
+            users[job.user_id] = UserQueue(max(1, self.weights.get(job.user_id, 1)))
+        users[job.user_id].jobs.append(job)
+        self.jobs[job.task_id] = job
+
+    def pop(self) -> QueuedJob:
+        for users in self.classes.values():
+            if not users:
+                continue
+            user_id, user = next(iter(users.items()))
+            job = user.jobs.popleft()
+            user.credit -= 1
+            if not user.jobs:
+                del users[user_id]
+            elif user.credit <= 0:
+                user.credit = user.weight
+                users.move_to_end(user_id)
+            del self.jobs[job.task_id]
+            return job
+        raise IndexError("pop from an empty queue")
+
+    def remove(self, task_id: str) -> Optional[QueuedJob]:
+        """Take a waiting job out of the queue, None if it is not queued"""
+        job = self.jobs.pop(task_id, None)
+        if job is None:
+            return None
+        users = self.classes[job.priority]
+        user = users[job.user_id]
+        user.jobs.remove(job)
+        if not user.jobs:
+            del users[job.user_id]
+        return job
+
+    def order(self) -> Iterator[QueuedJob]:
+        """Waiting jobs in the order ``pop`` would return them (without removing them)"""
+        for users in self.classes.values():
+            rotation = deque((iter(user.jobs), user.credit, user.weight) for user in users.values())
+            while rotation:
+                jobs, credit, weight = rotation.popleft()
+                taken = list(islice(jobs, credit))
+                yield from taken
+                if len(taken) == credit:
+                    rotation.append((jobs, weight, weight))
+
+    def position(self, task_id: str) -> Optional[int]:
+        """
+        1-based position of a waiting job, None if it is not queued
+
+        Computed from the rotation instead of walking ``order()``: a job
+        its user reaches in turn t waits for everything in higher classes,
+        and for what every other user of its class takes in its next t + 1
+        turns (t for users behind it in the rotation). Linear in the user's
+        jobs and the class's users, so status polls stay cheap behind a bulk
+        uploader.
+        """
+        job = self.jobs.get(task_id)
+        if job is None:
+            return None
+        ahead = 0
+        for name in self.classes:
+            if name == job.priority:
+                break
+            ahead += self.depth(name)
+        users = self.classes[job.priority]
+        index = users[job.user_id].jobs.index(job)
+        turn = users[job.user_id].turn_of(index)
+        behind = False
+        for user_id, user in users.items():
+            if user_id == job.user_id:
+                behind = True
+                continue
+            ahead += user.served_within(turn if behind else turn + 1)
+        return ahead + index + 1
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class GenerationScheduler:
+    """Bounded worker pool with a priority, fair-share queue in front of it"""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queued: Optional[int] = None,
+        slo_seconds: Optional[Dict[str, float]] = None,
+        user_weights: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            max_concurrent: Jobs running at the same time (worker count)
+            max_queued: Jobs allowed to wait; submissions beyond it raise QueueFull (None: unbounded)
+            slo_seconds: Latency target (submit to finish) per priority class, e.g. {"premium": 120}
+            user_weights: Jobs per round-robin turn by user id, e.g. {"partner-42": 3} (default 1)
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max_queued
+        self.slo_seconds = dict(slo_seconds or {})
+        self.queue = FairShareQueue(weights=user_weights)
+        self.running: Dict[str, float] = {}  # task_id -> started_at
+        self.waits: Dict[str, Deque[float]] = {
+            name: deque(maxlen=WAIT_SAMPLES) for name in self.queue.classes
+        }
+        self.slo_results: Dict[str, Dict[str, int]] = {
+            name: {"met": 0, "missed": 0} for name in self.queue.classes
+        }
+        self.counters = {
+            "submitted": 0, "rejected": 0, "cancelled": 0, "expired": 0, "lost": 0, "completed": 0, "failed": 0
+        }
+        self._available: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _start(self):
+        """Start the workers on the running event loop (first submit)"""
+        loop = asyncio.get_running_loop()
+        if self._workers and self._loop is loop:
+            return
+        self._loop = loop
+        self._available = asyncio.Condition()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_concurrent)]
+
+    async def submit(
+        self,
+        task_id: str,
+        run: Job,
+        priority: str = FREE,
+        user_id: str = "anonymous"
+    ) -> int:
+        """
+        Queue a job
+
+        Args:
+            task_id: Job identifier
+            run: Coroutine function doing the work
+            priority: Priority class (see PRIORITY_CLASSES)
+            user_id: Owner; users of a class take turns of their configured weight
+
+        Returns:
+            The job's 1-based queue position
+
+        Raises:
+            QueueFull: If max_queued jobs are already waiting
+            ValueError: If the priority class is unknown
+        """
+        if priority not in self.queue.classes:
+            raise ValueError(f"Unknown priority class: {priority}")
+        self._start()
+        if self.max_queued is not None and len(self.queue) >= self.max_queued:
+            self.counters["rejected"] += 1
+            raise QueueFull(f"Generation queue is full ({self.max_queued} waiting)")
+        job = QueuedJob(task_id, run, time.monotonic(), priority, user_id, self.slo_seconds.get(priority))
+        self.queue.push(job)
+        self.counters["submitted"] += 1
+        async with self._available:
+            self._available.notify()
+        return self.queue.position(task_id)
+
+    def position(self, task_id: str) -> Optional[int]:
+        """
+        Current 1-based queue position
+
+        Later submissions of a higher class, or of users whose turn comes
+        first, can still move a waiting job back.
+        """
+        return self.queue.position(task_id)
+
+    def cancel(self, task_id: str, reason: str = "cancelled") -> bool:
+        """
+        Drop a waiting job
+
+        Args:
+            task_id: Job identifier
+            reason: Counter to increment: "cancelled", "expired" or "lost" (taken over by another replica)
+
+        Returns:
+            False if the job is not queued (already running or finished)
+        """
+        if self.queue.remove(task_id) is None:
+            return False
+        self.counters[reason] += 1
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            async with self._available:
+                await self._available.wait_for(lambda: len(self.queue) > 0)
+                job = self.queue.pop()
+            started = time.monotonic()
+            self.waits[job.priority].append(started - job.enqueued_at)
+            self.running[job.task_id] = started
+            try:
+                await job.run()
+                self.counters["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["failed"] += 1
+                logger.error("Scheduled job failed", task_id=job.task_id, worker=index, error=str(e))
+            finally:
+                self.running.pop(job.task_id, None)
+            if job.slo_seconds is not None:
+                self._record_slo(job, time.monotonic() - job.enqueued_at)
+
+    def _record_slo(self, job: QueuedJob, latency: float):
+        if latency <= job.slo_seconds:
+            self.slo_results[job.priority]["met"] += 1
+            return
+        self.slo_results[job.priority]["missed"] += 1
+        logger.warning(
+            "Generation latency SLO missed",
+            task_id=job.task_id,
+            priority=job.priority,
+            latency_seconds=round(latency, 3),
+            slo_seconds=job.slo_seconds
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, utilization, and wait-time and SLO statistics per priority class"""
+        now = time.monotonic()
+        oldest = min((job.enqueued_at for job in self.queue.jobs.values()), default=None)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "queue_depth": len(self.queue),
+            "running": len(self.running),
+            "oldest_wait_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "wait_seconds": _wait_stats([wait for waits in self.waits.values() for wait in waits]),
+            "classes": {
+                name: {
+                    "queue_depth": self.queue.depth(name),
+                    "waiting_users": len(self.queue.classes[name]),
+                    "wait_seconds": _wait_stats(list(self.waits[name])),
+                    "slo_seconds": self.slo_seconds.get(name),
+                    "slo": dict(self.slo_results[name]) if name in self.slo_seconds else None,
+                }
+                for name in self.queue.classes
+            },
+            **self.counters,
+        }
+
+    async def shutdown(self):
+        """Stop the workers; running jobs are cancelled"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+def _wait_stats(waits: List[float]) -> Dict[str, Any]:
+    return {
+        "samples": len(waits),
+        "mean": round(sum(waits) / len(waits), 3) if waits else None,
+        "p50": _rounded(percentile(waits, 0.50)),
+        "p95": _rounded(percentile(waits, 0.95)),
+        "p99": _rounded(percentile(waits, 0.99)),
+        "max": _rounded(max(waits, default=None)),
+    }
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
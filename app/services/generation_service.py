@@ -1,48 +1,107 @@
 """
 3D Generation Service
 """
+import io
 import os
 import asyncio
+import tempfile
 import uuid
-from typing import Dict, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Set
+from datetime import datetime, timedelta
 import structlog
 
+from app.core.config_v1 import settings
+from app.core.storage import get_storage
 from app.models.generation import GenerationTask, GenerationStatus, GenerationResponse
+from app.services.generation_scheduler import FREE, PREMIUM, GenerationScheduler, QueueFull
+from app.services.job_queue import JobQueue, LeasedJob, LeaseLost, get_job_queue
+from app.services.task_store import ACTIVE_STATUSES, TaskStore, get_task_store
 from app.services.trellis_service import TrellisService
+from ml_server.artifact_encoding import ENCODING_SUFFIXES, precompress, variant_key
+from ml_server.artifact_storage import ArtifactStorage
+from ml_server.disk_gc import TEMP_PREFIX
+from ml_server.glb_inspect import inspect_glb
+from ml_server.job_control import DeadlineExceeded, JobCancelled
+from ml_server.preview_video import VIDEO_FORMATS
 
 logger = structlog.get_logger(__name__)
 
+MAX_GLB_LOD = len(settings.GLB_LOD_RATIOS) - 1  # Coarsest GLB level of detail generated
+
 class GenerationService:
     """Service for managing 3D generation tasks"""
     
-    def __init__(self, trellis_service: TrellisService):
+    def __init__(
+        self,
+        trellis_service: TrellisService,
+        storage: Optional[ArtifactStorage] = None,
+        scheduler: Optional[GenerationScheduler] = None,
+        store: Optional[TaskStore] = None,
+        jobs: Optional[JobQueue] = None
+    ):
         self.trellis_service = trellis_service
-        self.tasks: Dict[str, GenerationTask] = {}
-        self.output_dir = "outputs"
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.store = store or get_task_store()  # Task state, shared with the other API processes
+        self.jobs = jobs or get_job_queue()  # Leases on this process's jobs (None: not durable)
+        self._lease_task: Optional[asyncio.Task] = None
+        self._lost_leases: Set[str] = set()  # Running here, but another replica took the job over
+        self.storage = storage or get_storage()
+        self.scheduler = scheduler or GenerationScheduler(
+            settings.MAX_CONCURRENT_GENERATIONS,
+            settings.MAX_QUEUED_GENERATIONS,
+            slo_seconds=self._slo_targets(),
+            user_weights=settings.QUEUE_USER_WEIGHTS
+        )
+    
+    @staticmethod
+    def _slo_targets() -> Dict[str, float]:
+        """Configured latency SLO per priority class"""
+        targets = {PREMIUM: settings.PREMIUM_LATENCY_SLO_SECONDS, FREE: settings.FREE_LATENCY_SLO_SECONDS}
+        return {name: seconds for name, seconds in targets.items() if seconds is not None}
     
     async def start_generation(
         self,
         task_id: str,
-        image,
+        image=None,
         seed: int = 42,
         ss_guidance_strength: float = 7.5,
         ss_sampling_steps: int = 12,
         slat_guidance_strength: float = 3.0,
-        slat_sampling_steps: int = 12
+        slat_sampling_steps: int = 12,
+        image_key: Optional[str] = None,
+        user_id: str = "anonymous",
+        priority: str = FREE
     ):
-        """Start 3D generation task"""
+        """
+        Queue a 3D generation task
+        
+        The input is either a PIL ``image`` or the ``image_key`` of a photo
+        already uploaded to storage, which is then read straight from there.
+        The task waits as PENDING until the scheduler has a free worker;
+        ``priority`` (the user's class) and ``user_id`` decide its turn.
+        It fails with error code "timeout" once GENERATION_TIMEOUT_SECONDS
+        have passed since admission, queued or running.
+        
+        Raises:
+            QueueFull: If MAX_QUEUED_GENERATIONS tasks are already waiting
+        """
         try:
-            # Save image
-            image_path = os.path.join(self.output_dir, f"{task_id}_input.png")
-            image.save(image_path)
+            if image_key is None:
+                # Save image
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                image_key = self.input_key(task_id)
+                await self._in_thread(self.storage.put_bytes, image_key, buffer.getvalue(), "image/png")
             
-            # Create task
+            # Create task; the deadline is stamped at admission
+            created_at = datetime.utcnow()
             task = GenerationTask(
                 task_id=task_id,
-                status=GenerationStatus.PROCESSING,
-                image_path=image_path,
+                status=GenerationStatus.PENDING,
+                image_key=image_key,
+                owner=self.store.owner,
+                user_id=user_id,
+                priority=priority,
+                slo_seconds=self.scheduler.slo_seconds.get(priority),
                 parameters={
                     "seed": seed,
                     "ss_guidance_strength": ss_guidance_strength,
@@ -50,34 +109,84 @@ class GenerationService:
                     "slat_guidance_strength": slat_guidance_strength,
                     "slat_sampling_steps": slat_sampling_steps
                 },
-                created_at=datetime.utcnow()
+                created_at=created_at,
+                deadline_at=created_at + timedelta(seconds=settings.GENERATION_TIMEOUT_SECONDS)
             )
             
-            self.tasks[task_id] = task
+            await self.store.add(task)
+            if self.jobs is not None:
+                # Leased to this replica; another one takes it over if we stop renewing the lease
+                await self.jobs.enqueue(task_id, priority, user_id, worker=self.store.owner)
             
-            # Start generation in background
-            asyncio.create_task(self._process_generation(task_id))
+            # Run on this process's bounded worker pool, by priority class and the user's turn
+            position = await self.scheduler.submit(
+                task_id, lambda: self._process_generation(task_id), priority=priority, user_id=user_id
+            )
             
-            logger.info("Generation task started", task_id=task_id)
+            logger.info(
+                "Generation task queued", task_id=task_id, priority=priority, user_id=user_id, queue_position=position
+            )
             
+        except QueueFull:
+            logger.warning("Generation queue full, task rejected", task_id=task_id)
+            await self.store.delete(task_id)
+            await self._finish_job(task_id)
+            raise
         except Exception as e:
             logger.error("Failed to start generation", task_id=task_id, error=str(e))
-            if task_id in self.tasks:
-                self.tasks[task_id].status = GenerationStatus.FAILED
-                self.tasks[task_id].error_message = str(e)
+            task = await self.store.get(task_id)
+            if task is not None:
+                task.status = GenerationStatus.FAILED
+                task.error_message = str(e)
+                await self.store.save(task)
+            await self._finish_job(task_id)
             raise
     
     async def _process_generation(self, task_id: str):
-        """Process 3D generation task"""
+        """
+        Process 3D generation task (runs on a scheduler worker)
+        
+        The job is done afterwards, whatever the outcome, unless another
+        replica took it over; a worker cancelled at shutdown leaves it to be
+        claimed again.
+        """
+        try:
+            await self._run_generation(task_id)
+        except LeaseLost as e:
+            logger.warning("Generation job taken over by another replica", task_id=task_id, stage=e.stage)
+            return
+        finally:
+            self._lost_leases.discard(task_id)
+        await self._finish_job(task_id)
+    
+    async def _run_generation(self, task_id: str):
+        """
+        Run the pipeline for a task
+        
+        A cancelled or expired task stops at the next stage boundary and its
+        stored outputs are removed.
+        """
+        task = await self.store.get(task_id)
+        if task is None:
+            return
+        owner = self.store.owner
         try:
-            task = self.tasks[task_id]
+            await self._checkpoint(task, "start")
+            task.status = GenerationStatus.PROCESSING
+            task.updated_at = datetime.utcnow()
+            if not await self.store.save(task, expected=(GenerationStatus.PENDING,), owner=owner):
+                # Cancelled or expired through another request or replica while queued
+                logger.info("Generation task no longer pending, skipped", task_id=task_id)
+                return
             
             # Load image
             from PIL import Image
-            image = Image.open(task.image_path)
+            image = Image.open(io.BytesIO(await self._in_thread(self.storage.get_bytes, task.image_key)))
+            if image.mode != "RGB":
+                image = image.convert("RGB")
             
             # Generate 3D model
-            outputs = await self.trellis_service.generate_3d_model(
+            outputs = await self._before_deadline(task, "generation", self.trellis_service.generate_3d_model(
                 image=image,
                 seed=task.parameters["seed"],
                 ss_guidance_strength=task.parameters["ss_guidance_strength"],
@@ -85,56 +194,312 @@ class GenerationService:
                 slat_guidance_strength=task.parameters["slat_guidance_strength"],
                 slat_sampling_steps=task.parameters["slat_sampling_steps"],
                 formats=["gaussian", "mesh"]
-            )
+            ))
+            await self._checkpoint(task, "GLB export")
             
-            # Generate GLB file
-            glb_bytes = await self.trellis_service.generate_glb(
+            # Generate GLB file with its levels of detail
+            glb_lods = await self._before_deadline(task, "GLB export", self.trellis_service.generate_glb_lods(
                 outputs['gaussian'][0],
                 outputs['mesh'][0]
-            )
+            ))
             
-            # Save GLB file
-            glb_path = os.path.join(self.output_dir, f"{task_id}.glb")
-            with open(glb_path, 'wb') as f:
-                f.write(glb_bytes)
+            # Save GLB files
+            glb_lod_keys = []
+            for lod, glb_bytes in enumerate(glb_lods):
+                lod_key = self.glb_lod_key(task_id, lod)
+                await self._in_thread(self.storage.put_bytes, lod_key, glb_bytes, "model/gltf-binary")
+                glb_lod_keys.append(lod_key)
+            glb_key = glb_lod_keys[0]
+            glb_stats = self._inspect_glb(glb_lods[0])
+            await self._checkpoint(task, "PLY export")
             
-            # Save PLY file
-            ply_path = os.path.join(self.output_dir, f"{task_id}.ply")
-            outputs['gaussian'][0].save_ply(ply_path)
+            with tempfile.TemporaryDirectory(prefix=TEMP_PREFIX) as scratch_dir:
+                # Save PLY file
+                ply_key = self.output_key(task_id, "ply")
+                ply_path = os.path.join(scratch_dir, ply_key)
+                await self._in_thread(outputs['gaussian'][0].save_ply, ply_path)
+                await self._in_thread(self.storage.put_file, ply_key, ply_path)
+                
+                # Render and encode the preview video frame by frame (a failure only drops the preview)
+                await self._checkpoint(task, "preview")
+                video_key = self.output_key(task_id, VIDEO_FORMATS[settings.PREVIEW_FORMAT]["extension"])
+                video_path = os.path.join(scratch_dir, video_key)
+                try:
+                    await self._before_deadline(
+                        task, "preview", self.trellis_service.render_preview_video(outputs['gaussian'][0], video_path)
+                    )
+                    await self._in_thread(self.storage.put_file, video_key, video_path)
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning("Preview video skipped", task_id=task_id, error=str(e))
+                    video_key = None
             
-            # Generate preview video
-            video_frames = await self.trellis_service.generate_preview_video(
-                outputs['gaussian'][0]
-            )
-            
-            # Save video
-            video_path = os.path.join(self.output_dir, f"{task_id}.mp4")
-            import imageio
-            imageio.mimsave(video_path, video_frames, fps=15)
+            if settings.ARTIFACT_PRECOMPRESS:
+                await self._in_thread(self._precompress, glb_lod_keys + [ply_key])
             
             # Update task status
+            await self._checkpoint(task, "completion")
             task.status = GenerationStatus.COMPLETED
             task.completed_at = datetime.utcnow()
-            task.glb_path = glb_path
-            task.ply_path = ply_path
-            task.video_path = video_path
+            task.glb_key = glb_key
+            task.glb_lod_keys = glb_lod_keys
+            task.glb_stats = glb_stats
+            task.ply_key = ply_key
+            task.video_key = video_key
             task.updated_at = datetime.utcnow()
+            if not await self.store.save(task, expected=(GenerationStatus.PROCESSING,), owner=owner):
+                await self._checkpoint(task, "completion")
+                raise JobCancelled(task_id, "completion")
             
             logger.info("Generation task completed", task_id=task_id)
             
+        except LeaseLost:
+            # The outputs and the task now belong to the replica running it
+            raise
+        except JobCancelled as e:
+            logger.info("Generation task stopped", task_id=task_id, stage=e.stage)
+            await self._in_thread(self._discard_outputs, task)
+        except DeadlineExceeded as e:
+            logger.warning("Generation task timed out", task_id=task_id, stage=e.stage)
+            self._fail_timeout(task)
+            await self.store.save(task, expected=ACTIVE_STATUSES, owner=owner)
+            await self._in_thread(self._discard_outputs, task)
         except Exception as e:
             logger.error("Generation task failed", task_id=task_id, error=str(e))
-            if task_id in self.tasks:
-                self.tasks[task_id].status = GenerationStatus.FAILED
-                self.tasks[task_id].error_message = str(e)
-                self.tasks[task_id].updated_at = datetime.utcnow()
+            task.status = GenerationStatus.FAILED
+            task.error_message = str(e)
+            task.updated_at = datetime.utcnow()
+            await self.store.save(task, expected=ACTIVE_STATUSES, owner=owner)
+    
+    async def cancel_generation(self, task_id: str) -> GenerationResponse:
+        """
+        Cancel a queued or running task
+        
+        A queued task leaves the queue right away (the owning replica skips
+        it if another one handles the request); a running one stops at the
+        next stage boundary of the pipeline.
+        
+        Raises:
+            KeyError: If the task does not exist
+            ValueError: If the task already finished
+        """
+        task = await self.store.get(task_id)
+        if task is None:
+            raise KeyError("Task not found")
+        if task.status not in ACTIVE_STATUSES:
+            raise ValueError(f"Task already {task.status.value}")
+        
+        was_pending = task.status == GenerationStatus.PENDING
+        task.status = GenerationStatus.CANCELLED
+        task.error_code = "cancelled"
+        task.updated_at = datetime.utcnow()
+        if not await self.store.save(task, expected=ACTIVE_STATUSES):
+            raise ValueError("Task already finished")
+        
+        dequeued = task.owner == self.store.owner and self.scheduler.cancel(task_id)
+        if dequeued:
+            await self._finish_job(task_id)
+        if was_pending and task.image_key == self.input_key(task_id):
+            await self._in_thread(self.storage.delete, task.image_key)
+        
+        logger.info("Generation task cancelled", task_id=task_id, dequeued=dequeued)
+        return await self.get_status(task_id)
+    
+    async def _checkpoint(self, task: GenerationTask, stage: str):
+        """
+        Stop the pipeline here if the task was cancelled (through any
+        replica), is past its deadline, or was taken over by another replica
+        """
+        stored = await self.store.get(task.task_id)
+        if stored is None or stored.status == GenerationStatus.CANCELLED:
+            raise JobCancelled(task.task_id, stage)
+        if stored.owner != self.store.owner or task.task_id in self._lost_leases:
+            raise LeaseLost(task.task_id, stage)
+        if task.deadline_at is not None and datetime.utcnow() >= task.deadline_at:
+            raise DeadlineExceeded(task.task_id, stage)
+    
+    @staticmethod
+    async def _before_deadline(task: GenerationTask, stage: str, stage_run):
+        """
+        Await a pipeline stage for at most the time left until the task's deadline
+        
+        The stage is cancelled when the deadline passes; work it handed to a
+        thread finishes there, but the task fails right away.
+        
+        Raises:
+            DeadlineExceeded: If the deadline passes first
+        """
+        if task.deadline_at is None:
+            return await stage_run
+        remaining = (task.deadline_at - datetime.utcnow()).total_seconds()
+        try:
+            return await asyncio.wait_for(stage_run, max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(task.task_id, stage)
+    
+    @staticmethod
+    def _fail_timeout(task: GenerationTask):
+        task.status = GenerationStatus.FAILED
+        task.error_code = "timeout"
+        task.error_message = f"Generation timed out after {settings.GENERATION_TIMEOUT_SECONDS}s"
+        task.updated_at = datetime.utcnow()
+    
+    @staticmethod
+    async def _in_thread(fn, *args):
+        """Run blocking work (storage I/O, file writes) off the event loop"""
+        return await asyncio.get_event_loop().run_in_executor(None, fn, *args)
+    
+    def _discard_outputs(self, task: GenerationTask):
+        """Remove whatever a stopped task already stored, with its download variants and input photo"""
+        task_id = task.task_id
+        keys = [self.glb_lod_key(task_id, lod) for lod in range(MAX_GLB_LOD + 1)]
+        keys += [self.output_key(task_id, "ply")]
+        keys += [variant_key(key, encoding) for key in keys for encoding in ENCODING_SUFFIXES]
+        keys += [self.output_key(task_id, video["extension"]) for video in VIDEO_FORMATS.values()]
+        if task.image_key == self.input_key(task_id):
+            # Uploaded photos (uploads/) stay, the client may start another generation with them
+            keys.append(task.image_key)
+        for key in keys:
+            try:
+                self.storage.delete(key)
+            except Exception as e:
+                logger.warning("Could not remove output of stopped task", key=key, error=str(e))
+    
+    @staticmethod
+    def _fail_interrupted(task: GenerationTask, attempts: int):
+        task.status = GenerationStatus.FAILED
+        task.error_code = "interrupted"
+        task.error_message = f"Generation interrupted {attempts} times"
+        task.updated_at = datetime.utcnow()
+    
+    async def _finish_job(self, task_id: str):
+        """Drop the task's job from the durable queue (while this replica holds it)"""
+        if self.jobs is None:
+            return
+        try:
+            await self.jobs.finish(task_id, worker=self.store.owner)
+        except Exception as e:
+            # Left behind, it is claimed once the lease runs out and finished then
+            logger.warning("Could not finish generation job", task_id=task_id, error=str(e))
+    
+    async def recover_jobs(self) -> int:
+        """
+        Take over abandoned jobs while this replica has idle workers
+        
+        Jobs whose replica stopped renewing their leases (crashed, restarted,
+        shut down) are claimed and run here again from the start; after
+        JOB_MAX_ATTEMPTS the task fails with error code "interrupted".
+        
+        Returns:
+            Number of tasks queued again
+        """
+        if self.jobs is None:
+            return 0
+        busy = len(self.scheduler.running) + len(self.scheduler.queue)
+        recovered = 0
+        for job in await self.jobs.claim(self.store.owner, self.scheduler.max_concurrent - busy):
+            recovered += await self._readmit(job)
+        return recovered
+    
+    async def _readmit(self, job: LeasedJob) -> bool:
+        if job.task_id in self.scheduler.running or job.task_id in self.scheduler.queue.jobs:
+            # Our own job, its lease ran out while it was still here: the claim renewed it
+            return False
+        task = await self.store.get(job.task_id)
+        if task is None or task.status not in ACTIVE_STATUSES:
+            # Finished (or purged) after its job was left behind
+            await self._finish_job(job.task_id)
+            return False
+        if job.attempts > settings.JOB_MAX_ATTEMPTS:
+            logger.error("Generation job gave up after interruptions", task_id=job.task_id, attempts=job.attempts - 1)
+            self._fail_interrupted(task, job.attempts - 1)
+            await self.store.save(task, expected=ACTIVE_STATUSES)
+            await self._finish_job(job.task_id)
+            return False
+        
+        previous_owner = task.owner
+        task.status = GenerationStatus.PENDING
+        task.owner = self.store.owner
+        task.updated_at = datetime.utcnow()
+        if not await self.store.save(task, expected=ACTIVE_STATUSES):
+            await self._finish_job(job.task_id)
+            return False
+        await self.scheduler.submit(
+            job.task_id, lambda: self._process_generation(job.task_id), priority=task.priority, user_id=task.user_id
+        )
+        logger.warning(
+            "Generation job taken over", task_id=job.task_id, attempt=job.attempts, previous_owner=previous_owner
+        )
+        return True
+    
+    async def renew_leases(self) -> Set[str]:
+        """
+        Renew the leases of the jobs queued or running here
+        
+        Jobs another replica took over meanwhile are dropped from the local
+        queue, or stop at the next stage boundary when already running.
+        
+        Returns:
+            The task ids whose leases were lost
+        """
+        local = set(self.scheduler.running) | set(self.scheduler.queue.jobs)
+        lost = local - await self.jobs.heartbeat(self.store.owner, local)
+        for task_id in lost:
+            if not self.scheduler.cancel(task_id, reason="lost"):
+                self._lost_leases.add(task_id)
+        if lost:
+            logger.warning("Generation job leases lost", task_ids=sorted(lost))
+        return lost
+    
+    async def run_job_leases(self, interval: Optional[float] = None):
+        """Renew this replica's leases and take over abandoned jobs, forever (cancel the task to stop)"""
+        interval = interval or self.jobs.lease.total_seconds() / 3
+        while True:
+            try:
+                await self.renew_leases()
+                await self.recover_jobs()
+            except Exception as e:
+                logger.error("Generation job lease renewal failed", error=str(e))
+            await asyncio.sleep(interval)
+    
+    def start(self):
+        """Start renewing leases and recovering jobs (on the running event loop)"""
+        if self.jobs is not None and self._lease_task is None:
+            self._lease_task = asyncio.create_task(self.run_job_leases())
+    
+    async def shutdown(self):
+        """Stop the workers and hand this replica's unfinished jobs back to the queue"""
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            self._lease_task = None
+        await self.scheduler.shutdown()
+        if self.jobs is not None:
+            released = await self.jobs.release(self.store.owner, "Replica shut down")
+            if released:
+                logger.info("Generation jobs released", count=released)
     
     async def get_status(self, task_id: str) -> GenerationResponse:
-        """Get generation task status"""
-        if task_id not in self.tasks:
+        """Get generation task status (any replica can answer for any task)"""
+        task = await self.store.get(task_id)
+        if task is None:
             raise KeyError("Task not found")
         
-        task = self.tasks[task_id]
+        if (
+            task.status in ACTIVE_STATUSES
+            and task.deadline_at is not None
+            and datetime.utcnow() >= task.deadline_at
+        ):
+            # Expired while queued (it never gets a worker) or while running,
+            # e.g. on a replica that died or hung; a live run stops at its next checkpoint
+            was_pending = task.status == GenerationStatus.PENDING
+            self._fail_timeout(task)
+            if await self.store.save(task, expected=ACTIVE_STATUSES):
+                logger.warning("Generation task timed out", task_id=task_id, queued=was_pending)
+                if was_pending and task.owner == self.store.owner and self.scheduler.cancel(task_id, reason="expired"):
+                    await self._finish_job(task_id)
+            else:
+                task = await self.store.get(task_id)
         
         return GenerationResponse(
             task_id=task.task_id,
@@ -142,18 +507,71 @@ class GenerationService:
             message=self._get_status_message(task.status),
             created_at=task.created_at,
             updated_at=task.updated_at,
-            glb_url=f"/api/v1/generation/download/{task_id}/glb" if task.glb_path else None,
-            ply_url=f"/api/v1/generation/download/{task_id}/ply" if task.ply_path else None,
-            preview_url=f"/api/v1/generation/preview/{task_id}" if task.video_path else None,
+            deadline_at=task.deadline_at,
+            glb_url=self._artifact_url(
+                task.glb_key, f"/api/v1/generation/download/{task_id}/glb", f"model_{task_id}.glb"
+            ) if task.glb_key else None,
+            glb_lod_urls=[
+                self._artifact_url(
+                    key,
+                    f"/api/v1/generation/download/{task_id}/glb?lod={lod}",
+                    f"model_{task_id}_lod{lod}.glb" if lod else f"model_{task_id}.glb"
+                )
+                for lod, key in enumerate(task.glb_lod_keys)
+            ],
+            ply_url=self._artifact_url(
+                task.ply_key, f"/api/v1/generation/download/{task_id}/ply", f"model_{task_id}.ply"
+            ) if task.ply_key else None,
+            preview_url=self._artifact_url(
+                task.video_key, f"/api/v1/generation/preview/{task_id}"
+            ) if task.video_key else None,
+            queue_position=await self._queue_position(task) if task.status == GenerationStatus.PENDING else None,
+            priority=task.priority,
+            slo_seconds=task.slo_seconds,
+            glb_stats=task.glb_stats,
             parameters=task.parameters,
             error_message=task.error_message,
             error_code=task.error_code
         )
     
+    def _artifact_url(self, key: str, api_url: str, filename: Optional[str] = None) -> str:
+        """
+        Download URL of a stored artifact
+
+        A short-lived signed URL to the artifact store when enabled and the
+        backend can sign one (the bytes then never pass through the API),
+        otherwise the API download route.
+        """
+        if settings.ARTIFACT_SIGNED_URLS:
+            try:
+                url = self.storage.presigned_url(key, settings.ARTIFACT_URL_TTL_SECONDS, filename)
+                if url:
+                    return url
+            except Exception as e:
+                logger.warning("Could not sign artifact URL", key=key, error=str(e))
+        return api_url
+    
+    async def _queue_position(self, task: GenerationTask) -> Optional[int]:
+        """Exact from the local scheduler for own tasks, estimated from the store for other replicas' tasks"""
+        if task.owner == self.store.owner:
+            return self.scheduler.position(task.task_id)
+        return await self.store.queued_ahead(task) + 1
+    
+    async def queue_metrics(self) -> Dict:
+        """
+        This process's queue depth, running count, and wait-time and SLO
+        statistics per priority class, plus task counts of all replicas
+        """
+        return {
+            **self.scheduler.metrics(),
+            "replica": self.store.owner,
+            "tasks": await self.store.counts(),
+        }
+    
     def _get_status_message(self, status: GenerationStatus) -> str:
         """Get human-readable status message"""
         messages = {
-            GenerationStatus.PENDING: "Task is pending",
+            GenerationStatus.PENDING: "Task is queued",
             GenerationStatus.PROCESSING: "3D model is being generated",
             GenerationStatus.COMPLETED: "3D model generation completed",
             GenerationStatus.FAILED: "3D model generation failed",
@@ -161,35 +579,38 @@ class GenerationService:
         }
         return messages.get(status, "Unknown status")
     
-    async def get_glb_path(self, task_id: str) -> str:
-        """Get GLB file path"""
-        if task_id not in self.tasks:
-            raise KeyError("Task not found")
-        
-        task = self.tasks[task_id]
-        if not task.glb_path or not os.path.exists(task.glb_path):
-            raise FileNotFoundError("GLB file not found")
-        
-        return task.glb_path
+    @staticmethod
+    def _inspect_glb(glb_bytes: bytes) -> Optional[Dict]:
+        """Read model stats from the GLB header, None if the data is not a GLB (mock mode)"""
+        try:
+            return inspect_glb(glb_bytes)
+        except ValueError as e:
+            logger.warning("Could not inspect GLB", error=str(e))
+            return None
     
-    async def get_ply_path(self, task_id: str) -> str:
-        """Get PLY file path"""
-        if task_id not in self.tasks:
-            raise KeyError("Task not found")
-        
-        task = self.tasks[task_id]
-        if not task.ply_path or not os.path.exists(task.ply_path):
-            raise FileNotFoundError("PLY file not found")
-        
-        return task.ply_path
+    def _precompress(self, keys: List[str]):
+        """Store the encoded download variants so no request has to compress"""
+        for key in keys:
+            try:
+                sizes = precompress(self.storage, key, settings.ARTIFACT_ENCODINGS)
+                logger.info("Artifact precompressed", key=key, sizes=sizes)
+            except Exception as e:
+                # Downloads fall back to creating the variant on first request
+                logger.warning("Artifact precompression failed", key=key, error=str(e))
     
-    async def get_video_path(self, task_id: str) -> str:
-        """Get preview video path"""
-        if task_id not in self.tasks:
-            raise KeyError("Task not found")
-        
-        task = self.tasks[task_id]
-        if not task.video_path or not os.path.exists(task.video_path):
-            raise FileNotFoundError("Preview video not found")
-        
-        return task.video_path
+    @staticmethod
+    def input_key(task_id: str) -> str:
+        """Get storage key of the input photo received with the request"""
+        return f"{task_id}_input.png"
+    
+    @staticmethod
+    def output_key(task_id: str, extension: str) -> str:
+        """Get storage key of a task output ("ply", "mp4", ...)"""
+        return f"{task_id}.{extension}"
+    
+    @staticmethod
+    def glb_lod_key(task_id: str, lod: int = 0) -> str:
+        """Get GLB storage key for a level of detail (0 is full resolution)"""
+        if lod == 0:
+            return f"{task_id}.glb"
+        return f"{task_id}_lod{lod}.glb"
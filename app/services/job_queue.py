@@ -0,0 +1,254 @@
+"""
+Durable generation job queue
+
+Every admitted generation also has a row here until it finishes, leased to
+the API process (replica) running it. The lease is renewed by heartbeats;
+when a process dies or restarts, its leases run out and any replica claims
+the jobs again (``claim``), so in-flight generations are retried instead of
+lost. A job is attempted at most JOB_MAX_ATTEMPTS times.
+
+Claims are atomic across processes: ``SELECT ... FOR UPDATE SKIP LOCKED``
+on Postgres (concurrent claimers skip each other's rows instead of waiting),
+and a single conditional UPDATE on SQLite, whose one writer at a time makes
+it atomic. A job is therefore held by one replica at a time. Lease times
+are the replicas' UTC clocks, so they should be NTP-synchronized.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Collection, List, NamedTuple, Optional, Set
+
+import structlog
+from sqlalchemy import Column, DateTime, Integer, String, Text, and_, inspect, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config_v1 import settings
+from app.core.database import Base, SessionLocal, engine, run_db
+from app.services.generation_scheduler import FREE, PRIORITY_CLASSES
+from ml_server.job_control import JobStopped
+
+logger = structlog.get_logger(__name__)
+
+QUEUED = "queued"
+CLAIMED = "claimed"
+
+class LeaseLost(JobStopped):
+    """Another worker claimed the job after this one's lease ran out"""
+
+    reason = "taken over by another worker"
+    error_code = "lease_lost"
+
+class LeasedJob(NamedTuple):
+    """A job claimed by this worker"""
+    task_id: str
+    attempts: int  # Including this one
+    priority: str = FREE
+    user_id: str = "anonymous"
+    last_error: Optional[str] = None
+
+class JobRecord(Base):
+    """One unfinished generation job"""
+    __tablename__ = "api_generation_jobs"
+
+    task_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, index=True)  # queued / claimed
+    priority = Column(String, nullable=False)
+    priority_rank = Column(Integer, nullable=False)  # Index in PRIORITY_CLASSES, claimed lowest first
+    user_id = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+    # Claim and lease
+    claimed_by = Column(String, nullable=True, index=True)  # Worker (replica id) holding the lease
+    claim_id = Column(String, nullable=True, index=True)  # Identifies one claim
+    claimed_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    # Retries
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+def _claimable(now: datetime):
+    """Unclaimed jobs, and claimed ones whose lease ran out"""
+    return or_(
+        JobRecord.status == QUEUED,
+        and_(JobRecord.status == CLAIMED, JobRecord.lease_expires_at < now)
+    )
+
+class JobQueue:
+    """Generation jobs in the application database, shared by every process using it"""
+
+    def __init__(
+        self,
+        lease_seconds: Optional[float] = None,
+        session_factory=SessionLocal,
+        bind=engine
+    ):
+        """
+        Args:
+            lease_seconds: How long a claim holds without a heartbeat (default JOB_LEASE_SECONDS)
+            session_factory: SQLAlchemy session factory
+            bind: Engine the table lives in
+        """
+        self.lease = timedelta(seconds=lease_seconds or settings.JOB_LEASE_SECONDS)
+        self.session_factory = session_factory
+        self.bind = bind
+        self.skip_locked = bind.dialect.name == "postgresql"
+        try:
+            JobRecord.__table__.create(bind=bind, checkfirst=True)
+        except SQLAlchemyError:
+            # Another process may have created it between the check and the CREATE
+            if not inspect(bind).has_table(JobRecord.__tablename__):
+                raise
+
+    def _enqueue(self, task_id: str, priority: str, user_id: str, worker: Optional[str]):
+        now = datetime.utcnow()
+        record = JobRecord(
+            task_id=task_id,
+            status=QUEUED,
+            priority=priority,
+            priority_rank=PRIORITY_CLASSES.index(priority),
+            user_id=user_id,
+            created_at=now,
+            attempts=0
+        )
+        if worker is not None:
+            record.status = CLAIMED
+            record.claimed_by = worker
+            record.claim_id = uuid.uuid4().hex
+            record.claimed_at = record.heartbeat_at = now
+            record.lease_expires_at = now + self.lease
+            record.attempts = 1
+        with self.session_factory() as db:
+            db.add(record)
+            db.commit()
+
+    def _claim(self, worker: str, limit: int) -> List[LeasedJob]:
+        now = datetime.utcnow()
+        claim_id = uuid.uuid4().hex
+        with self.session_factory() as db:
+            candidates = select(JobRecord.task_id).where(_claimable(now)).order_by(
+                JobRecord.priority_rank, JobRecord.created_at
+            ).limit(limit)
+            if self.skip_locked:
+                # Rows another claimer has locked are skipped, not waited for
+                task_ids = db.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+                if not task_ids:
+                    db.rollback()
+                    return []
+                claimed = JobRecord.task_id.in_(task_ids)
+            else:
+                # One UPDATE: SQLite runs it under its single write lock
+                claimed = and_(JobRecord.task_id.in_(candidates), _claimable(now))
+            db.query(JobRecord).filter(claimed).update({
+                JobRecord.status: CLAIMED,
+                JobRecord.claimed_by: worker,
+                JobRecord.claim_id: claim_id,
+                JobRecord.claimed_at: now,
+                JobRecord.heartbeat_at: now,
+                JobRecord.lease_expires_at: now + self.lease,
+                JobRecord.attempts: JobRecord.attempts + 1,
+            }, synchronize_session=False)
+            db.commit()
+            records = db.query(JobRecord).filter(JobRecord.claim_id == claim_id).order_by(
+                JobRecord.priority_rank, JobRecord.created_at
+            ).all()
+            return [
+                LeasedJob(record.task_id, record.attempts, record.priority, record.user_id, record.last_error)
+                for record in records
+            ]
+
+    def _heartbeat(self, worker: str, task_ids: List[str]) -> Set[str]:
+        now = datetime.utcnow()
+        held = and_(JobRecord.status == CLAIMED, JobRecord.claimed_by == worker, JobRecord.task_id.in_(task_ids))
+        with self.session_factory() as db:
+            db.query(JobRecord).filter(held).update({
+                JobRecord.heartbeat_at: now,
+                JobRecord.lease_expires_at: now + self.lease,
+            }, synchronize_session=False)
+            db.commit()
+            return {task_id for task_id, in db.query(JobRecord.task_id).filter(held).all()}
+
+    def _finish(self, task_id: str, worker: Optional[str]) -> bool:
+        with self.session_factory() as db:
+            query = db.query(JobRecord).filter(JobRecord.task_id == task_id)
+            if worker is not None:
+                query = query.filter(JobRecord.claimed_by == worker)
+            removed = query.delete(synchronize_session=False)
+            db.commit()
+            return removed == 1
+
+    def _release(self, worker: str, error: Optional[str]) -> int:
+        with self.session_factory() as db:
+            released = db.query(JobRecord).filter(
+                JobRecord.status == CLAIMED, JobRecord.claimed_by == worker
+            ).update({
+                JobRecord.status: QUEUED,
+                JobRecord.claimed_by: None,
+                JobRecord.claim_id: None,
+                JobRecord.lease_expires_at: None,
+                JobRecord.last_error: error,
+            }, synchronize_session=False)
+            db.commit()
+            return released
+
+    async def enqueue(self, task_id: str, priority: str = FREE, user_id: str = "anonymous", worker: Optional[str] = None):
+        """
+        Add a job
+
+        Args:
+            task_id: The generation task
+            priority: Priority class; claims take higher classes, then older jobs first
+            user_id: Owner of the task
+            worker: Claim it for this worker right away (None: leave it for ``claim``)
+        """
+        await run_db(self.bind, self._enqueue, task_id, priority, user_id, worker)
+
+    async def claim(self, worker: str, limit: int = 1) -> List[LeasedJob]:
+        """
+        Lease up to ``limit`` unclaimed or abandoned (lease expired) jobs
+
+        Every claim counts as an attempt; callers give up on a job past its
+        last attempt (``finish`` it and fail the task).
+        """
+        if limit <= 0:
+            return []
+        return await run_db(self.bind, self._claim, worker, limit)
+
+    async def heartbeat(self, worker: str, task_ids: Collection[str]) -> Set[str]:
+        """
+        Renew the worker's leases on the jobs it is still queuing or running
+
+        Rows it holds but no longer works on (e.g. a ``finish`` that failed)
+        are not renewed, so their leases run out and they are claimed again.
+
+        Returns:
+            The task ids among ``task_ids`` the worker still holds; the others were taken over
+        """
+        if not task_ids:
+            return set()
+        return await run_db(self.bind, self._heartbeat, worker, list(task_ids))
+
+    async def finish(self, task_id: str, worker: Optional[str] = None) -> bool:
+        """
+        Remove a finished (or cancelled) job
+
+        Args:
+            task_id: The generation task
+            worker: Only while this worker holds it (None: whoever does)
+
+        Returns:
+            False if the job is gone or held by another worker
+        """
+        return await run_db(self.bind, self._finish, task_id, worker)
+
+    async def release(self, worker: str, error: Optional[str] = None) -> int:
+        """Hand all of the worker's jobs back to the queue (shutdown), returns how many"""
+        return await run_db(self.bind, self._release, worker, error)
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> Optional[JobQueue]:
+    """The durable job queue, None with TASK_STORE=memory (nothing to share or recover)"""
+    global _job_queue
+    if _job_queue is None and settings.TASK_STORE == "database":
+        _job_queue = JobQueue()
+        logger.info("Job queue initialized", lease_seconds=_job_queue.lease.total_seconds())
+    return _job_queue
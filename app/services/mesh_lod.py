@@ -0,0 +1,205 @@
+"""
+Mesh decimation and LOD chain generation
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Grid resolution bounds for the clustering search (cells along the longest axis)
+MIN_GRID_RESOLUTION = 2
+MAX_GRID_RESOLUTION = 2048
+
+def _face_quadrics(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Area-weighted plane quadrics, packed as the 10 unique entries of each 4x4 matrix"""
+    v0 = vertices[faces[:, 0]]
+    cross = np.cross(vertices[faces[:, 1]] - v0, vertices[faces[:, 2]] - v0)
+    double_area = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(double_area, 1e-12)[:, None]
+    d = -np.einsum("ij,ij->i", normals, v0)
+    a, b, c = normals[:, 0], normals[:, 1], normals[:, 2]
+    w = 0.5 * double_area
+    return np.stack([
+        a * a, a * b, a * c, a * d,
+        b * b, b * c, b * d,
+        c * c, c * d,
+        d * d,
+    ], axis=1) * w[:, None]
+
+def _cluster(
+    vertices: np.ndarray,
+    uvs: Optional[np.ndarray],
+    resolution: int
+) -> Tuple[np.ndarray, int, np.ndarray, float]:
+    """Assign every vertex to a grid cell; UV cells keep texture seams apart"""
+    vmin = vertices.min(axis=0)
+    extent = np.maximum(vertices.max(axis=0) - vmin, 1e-9)
+    cell = extent.max() / resolution
+    dims = np.maximum(np.ceil(extent / cell).astype(np.int64), 1)
+    idx = np.minimum(((vertices - vmin) / cell).astype(np.int64), dims - 1)
+    keys = (idx[:, 0] * dims[1] + idx[:, 1]) * dims[2] + idx[:, 2]
+
+    if uvs is not None:
+        uv_idx = np.clip((uvs * resolution).astype(np.int64), 0, resolution - 1)
+        keys = keys * (resolution * resolution) + uv_idx[:, 0] * resolution + uv_idx[:, 1]
+
+    _, labels = np.unique(keys, return_inverse=True)
+    labels = labels.reshape(-1)
+    num_clusters = int(labels.max()) + 1
+
+    cell_origin = np.empty((num_clusters, 3))
+    cell_origin[labels] = vmin + idx * cell
+    return labels, num_clusters, cell_origin, cell
+
+def _collapse(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    quadrics: np.ndarray,
+    clusters: Tuple[np.ndarray, int, np.ndarray, float],
+    uvs: Optional[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """Merge each cluster into its quadric-optimal representative"""
+    labels, num_clusters, cell_origin, cell = clusters
+    counts = np.bincount(labels, minlength=num_clusters).astype(np.float64)
+    mean = np.stack([
+        np.bincount(labels, weights=vertices[:, k], minlength=num_clusters)
+        for k in range(3)
+    ], axis=1) / counts[:, None]
+
+    # Every face contributes its quadric to the clusters of its three corners
+    corner_labels = labels[faces].reshape(-1)
+    corner_quadrics = np.repeat(quadrics, 3, axis=0)
+    q = np.stack([
+        np.bincount(corner_labels, weights=corner_quadrics[:, k], minlength=num_clusters)
+        for k in range(10)
+    ], axis=1)
+
+    A = np.empty((num_clusters, 3, 3))
+    A[:, 0, 0], A[:, 0, 1], A[:, 0, 2] = q[:, 0], q[:, 1], q[:, 2]
+    A[:, 1, 0], A[:, 1, 1], A[:, 1, 2] = q[:, 1], q[:, 4], q[:, 5]
+    A[:, 2, 0], A[:, 2, 1], A[:, 2, 2] = q[:, 2], q[:, 5], q[:, 7]
+    b = -q[:, [3, 6, 8]]
+
+    # Tikhonov term pulls under-determined clusters (flat or linear) towards the mean
+    reg = 1e-3 * np.maximum(np.trace(A, axis1=1, axis2=2), 1e-12) / 3.0
+    A += reg[:, None, None] * np.eye(3)
+    b += reg[:, None] * mean
+    optimal = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+
+    # Reject solutions that escape the cluster's grid cell
+    outside = np.any((optimal < cell_origin) | (optimal > cell_origin + cell), axis=1)
+    optimal[outside] = mean[outside]
+
+    new_faces = labels[faces]
+    keep = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 2] != new_faces[:, 0])
+    )
+    new_faces = new_faces[keep]
+    _, first = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+    new_faces = new_faces[np.sort(first)]
+
+    used, remap = np.unique(new_faces, return_inverse=True)
+    new_faces = remap.reshape(-1, 3)
+
+    new_uvs = None
+    if uvs is not None:
+        new_uvs = np.stack([
+            np.bincount(labels, weights=uvs[:, k], minlength=num_clusters)
+            for k in range(2)
+        ], axis=1) / counts[:, None]
+        new_uvs = new_uvs[used]
+
+    return optimal[used], new_faces, new_uvs
+
+def quadric_decimate(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    target_faces: int,
+    uvs: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Decimate a triangle mesh by quadric-error vertex clustering
+
+    Vertices are snapped to a uniform grid and every cell collapses to the
+    point minimising the summed plane quadrics of its incident faces. The grid
+    resolution is binary-searched so the result has at most ``target_faces``.
+
+    Args:
+        vertices: (V, 3) float vertex positions
+        faces: (F, 3) int triangle indices
+        target_faces: Maximum number of faces in the result
+        uvs: Optional (V, 2) texture coordinates, carried through decimation
+
+    Returns:
+        Tuple of (vertices, faces, uvs) for the decimated mesh
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    if uvs is not None:
+        uvs = np.asarray(uvs, dtype=np.float64)
+
+    if target_faces >= len(faces) or len(faces) == 0:
+        return vertices, faces, uvs
+
+    quadrics = _face_quadrics(vertices, faces)
+    best = None
+    lo, hi = MIN_GRID_RESOLUTION, MAX_GRID_RESOLUTION
+    while lo <= hi:
+        resolution = (lo + hi) // 2
+        clusters = _cluster(vertices, uvs, resolution)
+        result = _collapse(vertices, faces, quadrics, clusters, uvs)
+        if len(result[1]) <= target_faces:
+            best = result
+            lo = resolution + 1
+        else:
+            hi = resolution - 1
+
+    if best is None:
+        clusters = _cluster(vertices, uvs, MIN_GRID_RESOLUTION)
+        best = _collapse(vertices, faces, quadrics, clusters, uvs)
+
+    return best
+
+def generate_lod_chain(mesh, lod_ratios: List[float]) -> List[bytes]:
+    """
+    Export a textured trimesh as a chain of GLB levels of detail
+
+    Args:
+        mesh: trimesh.Trimesh as returned by ``postprocessing_utils.to_glb``
+        lod_ratios: Fraction of the original triangles kept per level, e.g. [1.0, 0.25, 0.05]
+
+    Returns:
+        GLB bytes for every level, in the order of ``lod_ratios``
+    """
+    import trimesh
+
+    visual = getattr(mesh, "visual", None)
+    uvs = getattr(visual, "uv", None)
+    material = getattr(visual, "material", None)
+
+    lods = []
+    for ratio in lod_ratios:
+        if ratio >= 1.0:
+            lods.append(mesh.export(file_type="glb"))
+            continue
+
+        target_faces = max(int(len(mesh.faces) * ratio), 4)
+        vertices, faces, lod_uvs = quadric_decimate(mesh.vertices, mesh.faces, target_faces, uvs)
+        lod_visual = None
+        if lod_uvs is not None:
+            lod_visual = trimesh.visual.TextureVisuals(uv=lod_uvs, material=material)
+
+        lod_mesh = trimesh.Trimesh(vertices=vertices, faces=faces, visual=lod_visual, process=False)
+        lods.append(lod_mesh.export(file_type="glb"))
+
+        logger.info(
+            "GLB LOD generated",
+            ratio=ratio,
+            faces=len(faces),
+            size_bytes=len(lods[-1])
+        )
+
+    return lods
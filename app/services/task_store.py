@@ -0,0 +1,297 @@
+"""
+Generation task store
+
+Task state lives here instead of in a per-process dict, so any API process
+or replica can answer status for any task and N uvicorn workers can share
+one deployment. The database store keeps each task as one row (indexed
+status / owner columns plus the task as JSON) in the application database;
+the memory store is for single-process development and tests.
+
+Status changes are compare-and-set on the current status (``save(...,
+expected=...)``): a task cancelled or expired through one replica is never
+flipped back to PROCESSING or COMPLETED by the replica running it.
+"""
+import asyncio
+import os
+import socket
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+import structlog
+from sqlalchemy import Column, DateTime, String, Text, func, inspect, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config_v1 import settings
+from app.core.database import Base, SessionLocal, engine, run_db
+from app.models.generation import GenerationStatus, GenerationTask
+from app.services.generation_scheduler import PRIORITY_CLASSES
+
+logger = structlog.get_logger(__name__)
+
+# Identifies this process among the replicas; tasks are owned by the process that queued them
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+ACTIVE_STATUSES = (GenerationStatus.PENDING, GenerationStatus.PROCESSING)
+
+class TaskStore:
+    """Base class for task stores"""
+
+    def __init__(self, owner: str = REPLICA_ID):
+        self.owner = owner
+
+    async def get(self, task_id: str) -> Optional[GenerationTask]:
+        raise NotImplementedError
+
+    async def add(self, task: GenerationTask):
+        raise NotImplementedError
+
+    async def save(
+        self,
+        task: GenerationTask,
+        expected: Sequence[GenerationStatus] = (),
+        owner: Optional[str] = None
+    ) -> bool:
+        """
+        Store a task's new state
+
+        Args:
+            task: The task
+            expected: Only store it while the stored status is one of these (empty: always)
+            owner: Only store it while the stored owner is this replica (None: any)
+
+        Returns:
+            False if the stored status or owner did not match (or the task is gone)
+        """
+        raise NotImplementedError
+
+    async def delete(self, task_id: str):
+        raise NotImplementedError
+
+    async def queued_ahead(self, task: GenerationTask) -> int:
+        """Pending tasks of the same owner that run before ``task`` (earlier or higher class)"""
+        raise NotImplementedError
+
+    async def counts(self) -> Dict[str, int]:
+        """Tasks per status, across all replicas"""
+        raise NotImplementedError
+
+    async def purge(self, before: datetime) -> int:
+        """Remove finished tasks last updated before ``before``, returns how many"""
+        raise NotImplementedError
+
+def _runs_before(other: GenerationTask, task: GenerationTask) -> bool:
+    rank = PRIORITY_CLASSES.index
+    if other.priority != task.priority:
+        return rank(other.priority) < rank(task.priority)
+    return other.created_at < task.created_at
+
+class MemoryTaskStore(TaskStore):
+    """Tasks in a dict of this process (single process only)"""
+
+    def __init__(self, owner: str = REPLICA_ID, max_tasks: Optional[int] = None):
+        """
+        Args:
+            owner: Replica id stamped on new tasks
+            max_tasks: Oldest finished tasks are dropped beyond this many (None: unbounded)
+        """
+        super().__init__(owner)
+        self.max_tasks = max_tasks
+        self.tasks: "OrderedDict[str, GenerationTask]" = OrderedDict()
+
+    async def get(self, task_id: str) -> Optional[GenerationTask]:
+        task = self.tasks.get(task_id)
+        # Copies, so callers only change the stored state through save()
+        return task.model_copy(deep=True) if task is not None else None
+
+    async def add(self, task: GenerationTask):
+        self.tasks[task.task_id] = task.model_copy(deep=True)
+        if self.max_tasks is not None and len(self.tasks) > self.max_tasks:
+            finished = [task_id for task_id, stored in self.tasks.items() if stored.status not in ACTIVE_STATUSES]
+            for task_id in finished[:len(self.tasks) - self.max_tasks]:
+                del self.tasks[task_id]
+
+    async def save(
+        self,
+        task: GenerationTask,
+        expected: Sequence[GenerationStatus] = (),
+        owner: Optional[str] = None
+    ) -> bool:
+        stored = self.tasks.get(task.task_id)
+        if stored is None or (expected and stored.status not in expected):
+            return False
+        if owner is not None and stored.owner != owner:
+            return False
+        self.tasks[task.task_id] = task.model_copy(deep=True)
+        return True
+
+    async def delete(self, task_id: str):
+        self.tasks.pop(task_id, None)
+
+    async def queued_ahead(self, task: GenerationTask) -> int:
+        return sum(
+            1 for other in self.tasks.values()
+            if other.status == GenerationStatus.PENDING and other.owner == task.owner
+            and other.task_id != task.task_id and _runs_before(other, task)
+        )
+
+    async def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for task in self.tasks.values():
+            counts[task.status.value] = counts.get(task.status.value, 0) + 1
+        return counts
+
+    async def purge(self, before: datetime) -> int:
+        expired = [
+            task_id for task_id, task in self.tasks.items()
+            if task.status not in ACTIVE_STATUSES and (task.updated_at or task.created_at) < before
+        ]
+        for task_id in expired:
+            del self.tasks[task_id]
+        return len(expired)
+
+class TaskRecord(Base):
+    """One generation task (GenerationTask as JSON, queried columns alongside)"""
+    __tablename__ = "api_generation_tasks"
+
+    task_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, index=True)
+    owner = Column(String, nullable=True, index=True)  # Replica running the task (queued it or took it over)
+    priority = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime, nullable=True)
+    data = Column(Text, nullable=False)
+
+def _record_values(task: GenerationTask) -> dict:
+    return {
+        "status": task.status.value,
+        "owner": task.owner,
+        "priority": task.priority,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at or task.created_at,
+        "data": task.model_dump_json(),
+    }
+
+class SqlTaskStore(TaskStore):
+    """Tasks in the application database, shared by every process using it"""
+
+    def __init__(self, owner: str = REPLICA_ID, session_factory=SessionLocal, bind=engine):
+        super().__init__(owner)
+        self.session_factory = session_factory
+        self.bind = bind
+        try:
+            TaskRecord.__table__.create(bind=bind, checkfirst=True)
+        except SQLAlchemyError:
+            # Another process may have created it between the check and the CREATE
+            if not inspect(bind).has_table(TaskRecord.__tablename__):
+                raise
+
+    def _get(self, task_id: str) -> Optional[GenerationTask]:
+        with self.session_factory() as db:
+            record = db.get(TaskRecord, task_id)
+            return GenerationTask.model_validate_json(record.data) if record is not None else None
+
+    def _add(self, task: GenerationTask):
+        with self.session_factory() as db:
+            db.add(TaskRecord(task_id=task.task_id, **_record_values(task)))
+            db.commit()
+
+    def _save(self, task: GenerationTask, expected: Sequence[GenerationStatus], owner: Optional[str]) -> bool:
+        with self.session_factory() as db:
+            query = db.query(TaskRecord).filter(TaskRecord.task_id == task.task_id)
+            if expected:
+                query = query.filter(TaskRecord.status.in_([status.value for status in expected]))
+            if owner is not None:
+                query = query.filter(TaskRecord.owner == owner)
+            updated = query.update(_record_values(task), synchronize_session=False)
+            db.commit()
+            return updated == 1
+
+    def _delete(self, task_id: str):
+        with self.session_factory() as db:
+            db.query(TaskRecord).filter(TaskRecord.task_id == task_id).delete(synchronize_session=False)
+            db.commit()
+
+    def _queued_ahead(self, task: GenerationTask) -> int:
+        higher = PRIORITY_CLASSES[:PRIORITY_CLASSES.index(task.priority)]
+        with self.session_factory() as db:
+            return db.query(func.count(TaskRecord.task_id)).filter(
+                TaskRecord.status == GenerationStatus.PENDING.value,
+                TaskRecord.owner == task.owner,
+                TaskRecord.task_id != task.task_id,
+                or_(
+                    TaskRecord.priority.in_(higher),
+                    (TaskRecord.priority == task.priority) & (TaskRecord.created_at < task.created_at)
+                )
+            ).scalar()
+
+    def _counts(self) -> Dict[str, int]:
+        with self.session_factory() as db:
+            rows = db.query(TaskRecord.status, func.count(TaskRecord.task_id)).group_by(TaskRecord.status).all()
+            return {status: count for status, count in rows}
+
+    def _purge(self, before: datetime) -> int:
+        with self.session_factory() as db:
+            removed = db.query(TaskRecord).filter(
+                TaskRecord.status.notin_([status.value for status in ACTIVE_STATUSES]),
+                TaskRecord.updated_at < before
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+
+    async def _run(self, fn, *args):
+        return await run_db(self.bind, fn, *args)
+
+    async def get(self, task_id: str) -> Optional[GenerationTask]:
+        return await self._run(self._get, task_id)
+
+    async def add(self, task: GenerationTask):
+        await self._run(self._add, task)
+
+    async def save(
+        self,
+        task: GenerationTask,
+        expected: Sequence[GenerationStatus] = (),
+        owner: Optional[str] = None
+    ) -> bool:
+        return await self._run(self._save, task, expected, owner)
+
+    async def delete(self, task_id: str):
+        await self._run(self._delete, task_id)
+
+    async def queued_ahead(self, task: GenerationTask) -> int:
+        return await self._run(self._queued_ahead, task)
+
+    async def counts(self) -> Dict[str, int]:
+        return await self._run(self._counts)
+
+    async def purge(self, before: datetime) -> int:
+        return await self._run(self._purge, before)
+
+_task_store: Optional[TaskStore] = None
+
+def get_task_store() -> TaskStore:
+    """Get the configured task store (TASK_STORE: "database" or "memory")"""
+    global _task_store
+    if _task_store is None:
+        if settings.TASK_STORE == "database":
+            _task_store = SqlTaskStore()
+        elif settings.TASK_STORE == "memory":
+            _task_store = MemoryTaskStore(max_tasks=settings.TASK_MEMORY_LIMIT)
+        else:
+            raise ValueError(f"Unknown task store: {settings.TASK_STORE}")
+        logger.info("Task store initialized", store=type(_task_store).__name__, replica=REPLICA_ID)
+    return _task_store
+
+async def run_purge(store: TaskStore, interval: Optional[float] = None):
+    """Remove finished tasks older than TASK_RETENTION_HOURS, forever (cancel the task to stop)"""
+    interval = interval or settings.TASK_PURGE_INTERVAL_SECONDS
+    while settings.TASK_RETENTION_HOURS is not None:
+        try:
+            before = datetime.utcnow() - timedelta(hours=settings.TASK_RETENTION_HOURS)
+            removed = await store.purge(before)
+            if removed:
+                logger.info("Purged finished tasks", removed=removed)
+        except Exception as e:
+            logger.error("Task purge failed", error=str(e))
+        await asyncio.sleep(interval)
@@ -207,88 +207,6 @@ class TrellisService:
             },
         )
     
-    async def generate_glb(
-        self,
-        gaussian_output,
-        mesh_output,
-        simplify: float = 0.95,
-        texture_size: int = 1024
-    ) -> bytes:
-        """
-        Generate GLB file from 3D outputs
-        
-        Args:
-            gaussian_output: Gaussian representation
-            mesh_output: Mesh representation
-            simplify: Mesh simplification ratio
-            texture_size: Texture resolution
-            
-        Returns:
-            GLB file as bytes
-        """
-        try:
-            from trellis.utils import postprocessing_utils
-            
-            logger.info("Generating GLB file", simplify=simplify, texture_size=texture_size)
-            
-            # Generate GLB in executor
-            loop = asyncio.get_event_loop()
-            glb = await loop.run_in_executor(
-                None,
-                postprocessing_utils.to_glb,
-                gaussian_output,
-                mesh_output,
-                simplify,
-                texture_size,
-                False  # verbose
-            )
-            
-            # Export to bytes
-            glb_bytes = glb.export()
-            
-            logger.info("GLB file generated successfully", size_bytes=len(glb_bytes))
-            return glb_bytes
-            
-        except Exception as e:
-            logger.error("GLB generation failed", error=str(e))
-            raise
-    
-    async def generate_preview_video(
-        self,
-        gaussian_output,
-        num_frames: int = 120
-    ) -> np.ndarray:
-        """
-        Generate preview video from 3D output
-        
-        Args:
-            gaussian_output: Gaussian representation
-            num_frames: Number of frames in video
-            
-        Returns:
-            Video frames as numpy array
-        """
-        try:
-            from trellis.utils import render_utils
-            
-            logger.info("Generating preview video", num_frames=num_frames)
-            
-            # Generate video in executor
-            loop = asyncio.get_event_loop()
-            video = await loop.run_in_executor(
-                None,
-                render_utils.render_video,
-                gaussian_output,
-                num_frames
-            )
-            
-            logger.info("Preview video generated successfully")
-            return video['color']
-            
-        except Exception as e:
-            logger.error("Preview video generation failed", error=str(e))
-            raise
-    
     def _create_mock_outputs(self, formats: List[str]) -> Dict[str, Any]:
         """Create mock outputs for development"""
         class MockGaussian:
@@ -322,69 +240,132 @@ class TrellisService:
         """
         Generate GLB file from 3D outputs
         """
+        lods = await self.generate_glb_lods(
+            gaussian_output,
+            mesh_output,
+            lod_ratios=[1.0],
+            simplify=simplify,
+            texture_size=texture_size
+        )
+        return lods[0]
+    
+    async def generate_glb_lods(
+        self,
+        gaussian_output,
+        mesh_output,
+        lod_ratios: Optional[List[float]] = None,
+        simplify: float = 0.95,
+        texture_size: int = 1024
+    ) -> List[bytes]:
+        """
+        Generate a chain of GLB levels of detail from 3D outputs
+        
+        Args:
+            gaussian_output: Gaussian representation
+            mesh_output: Mesh representation
+            lod_ratios: Fraction of triangles kept per level (defaults to settings.GLB_LOD_RATIOS)
+            simplify: Mesh simplification ratio
+            texture_size: Texture resolution
+            
+        Returns:
+            GLB files as bytes, full resolution first
+        """
+        if lod_ratios is None:
+            lod_ratios = settings.GLB_LOD_RATIOS
+        
         if self.pipeline == "mock":
             # Return mock GLB data
-            logger.info("Generating mock GLB file")
-            return b"mock_glb_data"
+            logger.info("Generating mock GLB file", lods=len(lod_ratios))
+            return [b"mock_glb_data" for _ in lod_ratios]
         
-        # Real GLB generation code would go here
         try:
-            from trellis.utils import postprocessing_utils
+            from app.services.mesh_lod import generate_lod_chain
             
-            logger.info("Generating GLB file", simplify=simplify, texture_size=texture_size)
+            logger.info("Generating GLB file", simplify=simplify, texture_size=texture_size, lod_ratios=lod_ratios)
             
-            # Generate GLB in executor
+            # Bake and decimate in executor
             loop = asyncio.get_event_loop()
             glb = await loop.run_in_executor(
                 None,
-                postprocessing_utils.to_glb,
+                self._build_glb_mesh,
                 gaussian_output,
                 mesh_output,
                 simplify,
-                texture_size,
-                False  # verbose
+                texture_size
             )
+            lods = await loop.run_in_executor(None, generate_lod_chain, glb, lod_ratios)
             
-            # Export to bytes
-            glb_bytes = glb.export()
-            
-            logger.info("GLB file generated successfully", size_bytes=len(glb_bytes))
-            return glb_bytes
+            logger.info("GLB file generated successfully", size_bytes=[len(lod) for lod in lods])
+            return lods
             
         except Exception as e:
             logger.error("GLB generation failed", error=str(e))
             raise
     
-    async def generate_preview_video(
+    def _build_glb_mesh(self, gaussian_output, mesh_output, simplify: float, texture_size: int):
+        """Bake textured mesh with TRELLIS postprocessing (runs in executor)"""
+        from trellis.utils import postprocessing_utils
+        
+        return postprocessing_utils.to_glb(
+            gaussian_output,
+            mesh_output,
+            simplify=simplify,
+            texture_size=texture_size,
+            verbose=False
+        )
+    
+    async def render_preview_video(
         self,
         gaussian_output,
-        num_frames: int = 120
-    ) -> np.ndarray:
+        path: str,
+        num_frames: Optional[int] = None,
+        resolution: Optional[int] = None,
+        fps: Optional[int] = None,
+        video_format: Optional[str] = None,
+        quality: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Generate preview video from 3D output
+        Render the orbit preview and encode it to a file
+        
+        Frames are rendered and piped into the encoder one at a time in a
+        worker thread, so neither the event loop nor memory holds the video.
+        
+        Args:
+            gaussian_output: Gaussian representation
+            path: Output file
+            num_frames / resolution / fps / video_format / quality:
+                Default to the PREVIEW_* settings; video_format is "mp4" or "webp"
+            
+        Returns:
+            Encoder stats (format, frames, size, bytes, seconds)
         """
+        from ml_server.preview_video import encode_frames, orbit_frames
+        
+        num_frames = num_frames or settings.PREVIEW_FRAMES
+        resolution = resolution or settings.PREVIEW_RESOLUTION
+        
         if self.pipeline == "mock":
-            # Return mock video data
             logger.info("Generating mock preview video")
-            return np.zeros((num_frames, 256, 256, 3), dtype=np.uint8)
+            frames = (np.zeros((resolution, resolution, 3), dtype=np.uint8) for _ in range(num_frames))
+        else:
+            logger.info("Generating preview video", num_frames=num_frames, resolution=resolution)
+            frames = orbit_frames(gaussian_output, num_frames=num_frames, resolution=resolution)
         
-        # Real video generation code would go here
         try:
-            from trellis.utils import render_utils
-            
-            logger.info("Generating preview video", num_frames=num_frames)
-            
-            # Generate video in executor
             loop = asyncio.get_event_loop()
-            video = await loop.run_in_executor(
+            stats = await loop.run_in_executor(
                 None,
-                render_utils.render_video,
-                gaussian_output,
-                num_frames
+                lambda: encode_frames(
+                    frames,
+                    path,
+                    fps=fps or settings.PREVIEW_FPS,
+                    video_format=video_format or settings.PREVIEW_FORMAT,
+                    quality=quality if quality is not None else settings.PREVIEW_QUALITY
+                )
             )
             
-            logger.info("Preview video generated successfully")
-            return video['color']
+            logger.info("Preview video generated successfully", **stats)
+            return stats
             
         except Exception as e:
             logger.error("Preview video generation failed", error=str(e))
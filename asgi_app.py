@@ -1,13 +1,17 @@
 """
 ASGI приложение с поддержкой базы данных и RunPod интеграции
 """
-import json
 import uuid
 import os
 import base64
 import asyncio
-from datetime import datetime
-from typing import Dict, Any
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from urllib.parse import parse_qs
+from asgi_router import Router, send_json
+from ml_server.job_control import deadline_after
+from ml_server.json_codec import dumps, loads
 from database import SessionLocal, GenerationTask, GenerationStatus, init_database
 
 try:
@@ -21,16 +25,22 @@ except ImportError:
 RUNPOD_ENDPOINT_ID = os.getenv("RUNPOD_ENDPOINT_ID")
 RUNPOD_API_KEY = os.getenv("RUNPOD_API_KEY") 
 RUNPOD_ENABLED = os.getenv("RUNPOD_ENABLED", "false").lower() == "true"
+GENERATION_TIMEOUT_SECONDS = int(os.getenv("GENERATION_TIMEOUT_SECONDS", "300"))  # Admission to result
 
-async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
+async def call_runpod(image_data: bytes, task_id: str, deadline: Optional[float] = None) -> Dict[str, Any]:
     """
     Вызов RunPod для генерации 3D модели
+    
+    deadline: Unix time, stamped at admission; the worker abandons the job
+    after it and we stop waiting for it
     """
     if not RUNPOD_ENABLED or not HTTPX_AVAILABLE:
         return {
             "status": "failed",
             "error": "RunPod не настроен или httpx недоступен"
         }
+    if deadline is None:
+        deadline = deadline_after(GENERATION_TIMEOUT_SECONDS)
     
     try:
         # Кодируем изображение
@@ -41,8 +51,11 @@ async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
             "input": {
                 "image_data": image_b64,
                 "image_format": "jpg",
-                "task_id": task_id
-            }
+                "task_id": task_id,
+                "deadline": deadline
+            },
+            # RunPod drops the job from its queue once the deadline has passed
+            "policy": {"ttl": max(int((deadline - time.time()) * 1000), 1000)}
         }
         
         # Headers
@@ -54,14 +67,15 @@ async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
         url = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/run"
         
         async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
+            response = await client.post(url, content=dumps(payload), headers=headers)
             response.raise_for_status()
-            result = response.json()
+            result = loads(response.content)
             
             if result.get("status") == "IN_QUEUE":
-                # Ждем выполнения
+                # Ждем выполнения (job_id сохраняем, чтобы задачу можно было отменить)
                 job_id = result["id"]
-                return await wait_runpod_completion(job_id, task_id)
+                set_runpod_job(task_id, job_id)
+                return await wait_runpod_completion(job_id, task_id, deadline)
             
             return result
             
@@ -71,27 +85,85 @@ async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
             "error": f"RunPod error: {str(e)}"
         }
 
-async def wait_runpod_completion(job_id: str, task_id: str) -> Dict[str, Any]:
+def set_runpod_job(task_id: str, job_id: str):
+    """Запоминаем RunPod job_id задачи"""
+    db = SessionLocal()
+    try:
+        db.query(GenerationTask).filter(GenerationTask.id == task_id).update(
+            {GenerationTask.runpod_job_id: job_id, GenerationTask.status: GenerationStatus.PROCESSING.value}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def complete_task(task_id: str, result: Dict[str, Any]):
+    """Сохраняем результат: ссылки на файлы и статистику GLB (по ней фильтрует /api/v1/tasks)"""
+    db = SessionLocal()
+    try:
+        task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+        if task is None or task.status not in ACTIVE_STATUSES:
+            return
+        task.status = GenerationStatus.COMPLETED.value
+        task.completed_at = datetime.utcnow()
+        task.processing_time_seconds = (task.completed_at - (task.started_at or task.created_at)).total_seconds()
+        task.glb_file_url = result.get("glb_path_url", task.glb_file_url)
+        task.ply_file_url = result.get("ply_path_url", task.ply_file_url)
+        task.preview_video_url = result.get("preview_path_url", task.preview_video_url)
+        if result.get("glb_stats"):
+            task.apply_glb_stats(result["glb_stats"])
+        db.commit()
+    finally:
+        db.close()
+
+async def cancel_runpod(job_id: str) -> Dict[str, Any]:
     """
-    Ждем завершения задачи в RunPod
+    Отмена задачи в RunPod
+    """
+    headers = {"Authorization": f"Bearer {RUNPOD_API_KEY}"}
+    url = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/cancel/{job_id}"
+    
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(url, headers=headers)
+            response.raise_for_status()
+            return loads(response.content)
+    except Exception as e:
+        return {
+            "status": "failed",
+            "error": f"RunPod cancel error: {str(e)}"
+        }
+
+async def wait_runpod_completion(job_id: str, task_id: str, deadline: float) -> Dict[str, Any]:
+    """
+    Ждем завершения задачи в RunPod (до deadline, потом отменяем её)
     """
     headers = {"Authorization": f"Bearer {RUNPOD_API_KEY}"}
     status_url = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/status/{job_id}"
     
     async with httpx.AsyncClient() as client:
-        for _ in range(300):  # 5 минут максимум
+        while time.time() < deadline:
             try:
                 response = await client.get(status_url, headers=headers)
                 response.raise_for_status()
-                result = response.json()
+                result = loads(response.content)
                 
                 status = result.get("status", "unknown")
                 
                 if status == "COMPLETED":
+                    output = result.get("output") or {}
+                    if output.get("status") in ("failed", "cancelled"):
+                        # The handler stopped the job itself (deadline, cancellation)
+                        return {
+                            "status": output["status"],
+                            "error": output.get("error"),
+                            "error_code": output.get("error_code"),
+                            "job_id": job_id
+                        }
+                    complete_task(task_id, output.get("result") or {})
                     return {
                         "status": "completed",
                         "job_id": job_id,
-                        "result": result.get("output", {})
+                        "result": output
                     }
                 elif status == "FAILED":
                     return {
@@ -99,6 +171,11 @@ async def wait_runpod_completion(job_id: str, task_id: str) -> Dict[str, Any]:
                         "error": result.get("error", "RunPod task failed"),
                         "job_id": job_id
                     }
+                elif status == "CANCELLED":
+                    return {
+                        "status": "cancelled",
+                        "job_id": job_id
+                    }
                 
                 await asyncio.sleep(1)
                 
@@ -108,232 +185,200 @@ async def wait_runpod_completion(job_id: str, task_id: str) -> Dict[str, Any]:
                     "error": f"Status check error: {str(e)}"
                 }
     
+    await cancel_runpod(job_id)
+    expire_task(task_id)
     return {
         "status": "failed",
-        "error": "Timeout waiting for completion"
+        "error": f"Generation timed out after {GENERATION_TIMEOUT_SECONDS}s",
+        "error_code": "timeout",
+        "job_id": job_id
     }
 
-async def app(scope: Dict[str, Any], receive, send):
-    """ASGI приложение"""
-    
-    if scope["type"] == "http":
-        path = scope["path"]
-        method = scope["method"]
+ACTIVE_STATUSES = (GenerationStatus.PENDING.value, GenerationStatus.PROCESSING.value)
+
+def mark_expired(task: GenerationTask) -> bool:
+    """FAILED с кодом timeout, если задача еще активна, а deadline прошел"""
+    if task.status not in ACTIVE_STATUSES or task.deadline_at is None or datetime.utcnow() < task.deadline_at:
+        return False
+    task.status = GenerationStatus.FAILED.value
+    task.error_code = "timeout"
+    task.error_message = f"Generation timed out after {GENERATION_TIMEOUT_SECONDS}s"
+    task.completed_at = datetime.utcnow()
+    return True
+
+def expire_task(task_id: str):
+    db = SessionLocal()
+    try:
+        task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+        if task is not None and mark_expired(task):
+            db.commit()
+    finally:
+        db.close()
+
+router = Router()
+
+# Constant endpoints are encoded once at import
+router.constant("GET", "/health", {
+    "status": "healthy",
+    "version": "1.0.0",
+    "mode": "railway_demo"
+})
+router.constant("GET", "/", {"message": "Photo to 3D API is running"})
+router.constant("GET", "/api/v1/status", {
+    "api": "v1",
+    "status": "operational",
+    "endpoints": ["/health", "/api/v1/status", "/api/v1/generate"]
+})
+
+# Generate endpoint - теперь с реальной БД
+@router.route("POST", "/api/v1/generate")
+async def create_task(scope, receive, send):
+    try:
+        # Создаем новую задачу в БД
+        db = SessionLocal()
+        task_id = str(uuid.uuid4())
+        created_time = datetime.utcnow()
         
-        # Health check endpoint
-        if path == "/health" and method == "GET":
-            response = {
-                "status": "healthy",
-                "version": "1.0.0",
-                "mode": "railway_demo"
-            }
-            body = json.dumps(response).encode()
-            
-            await send({
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
-            return
+        task = GenerationTask(
+            id=task_id,
+            original_image_url="demo-image.jpg",  # TODO: получать из POST данных
+            status=GenerationStatus.PENDING.value,
+            created_at=created_time,
+            deadline_at=created_time + timedelta(seconds=GENERATION_TIMEOUT_SECONDS)
+        )
         
-        # Root endpoint
-        if path == "/" and method == "GET":
-            response = {"message": "Photo to 3D API is running"}
-            body = json.dumps(response).encode()
-            
-            await send({
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
-            return
+        db.add(task)
+        db.commit()
+        db.close()
+        
+        response = {
+            "task_id": task_id,
+            "status": "pending",
+            "message": "3D generation task created successfully",
+            "created_at": created_time.isoformat(),
+            "deadline_at": (created_time + timedelta(seconds=GENERATION_TIMEOUT_SECONDS)).isoformat()
+        }
         
-        # API status endpoint
-        if path == "/api/v1/status" and method == "GET":
+    except Exception as e:
+        response = {
+            "error": "Failed to create generation task",
+            "details": str(e)
+        }
+    
+    await send_json(send, response)
+
+# Task status endpoint
+@router.route("GET", "/api/v1/task/{task_id}")
+async def get_task(scope, receive, send, task_id: str):
+    try:
+        db = SessionLocal()
+        task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+        if task is not None and mark_expired(task):
+            db.commit()
+            db.refresh(task)
+        db.close()
+        
+        if task:
             response = {
-                "api": "v1",
-                "status": "operational",
-                "endpoints": ["/health", "/api/v1/status", "/api/v1/generate"]
+                "task_id": task.id,
+                "status": task.status,
+                "created_at": task.created_at.isoformat(),
+                "glb_url": task.glb_file_url,
+                "ply_url": task.ply_file_url,
+                "preview_url": task.preview_video_url,
+                "glb_stats": task.glb_stats(),
+                "error_message": task.error_message,
+                "error_code": task.error_code
             }
-            body = json.dumps(response).encode()
+        else:
+            response = {"error": "Task not found"}
             
-            await send({
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
+    except Exception as e:
+        response = {
+            "error": "Failed to get task status", 
+            "details": str(e)
+        }
+    
+    await send_json(send, response, 200 if "error" not in response else 404)
+
+# Cancel task endpoint
+FINISHED_STATUSES = {GenerationStatus.COMPLETED.value, GenerationStatus.FAILED.value, GenerationStatus.CANCELLED.value}
+
+@router.route("DELETE", "/api/v1/task/{task_id}")
+async def cancel_task(scope, receive, send, task_id: str):
+    db = SessionLocal()
+    try:
+        task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+        if task is None:
+            await send_json(send, {"error": "Task not found"}, 404)
             return
-        
-        # Generate endpoint - теперь с реальной БД
-        if path == "/api/v1/generate" and method == "POST":
-            try:
-                # Создаем новую задачу в БД
-                db = SessionLocal()
-                task_id = str(uuid.uuid4())
-                created_time = datetime.utcnow()
-                
-                task = GenerationTask(
-                    id=task_id,
-                    original_image_url="demo-image.jpg",  # TODO: получать из POST данных
-                    status=GenerationStatus.PENDING.value,
-                    created_at=created_time
-                )
-                
-                db.add(task)
-                db.commit()
-                db.close()
-                
-                response = {
-                    "task_id": task_id,
-                    "status": "pending",
-                    "message": "3D generation task created successfully",
-                    "created_at": created_time.isoformat()
-                }
-                
-            except Exception as e:
-                response = {
-                    "error": "Failed to create generation task",
-                    "details": str(e)
-                }
-            
-            body = json.dumps(response).encode()
-            
-            await send({
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
+        if task.status in FINISHED_STATUSES:
+            await send_json(send, {"error": f"Task already {task.status}", "status": task.status}, 409)
             return
         
-        # Task status endpoint
-        if path.startswith("/api/v1/task/") and method == "GET":
-            task_id = path.split("/")[-1]
-            
-            try:
-                db = SessionLocal()
-                task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                db.close()
-                
-                if task:
-                    response = {
-                        "task_id": task.id,
-                        "status": task.status,
-                        "created_at": task.created_at.isoformat(),
-                        "glb_url": task.glb_file_url,
-                        "ply_url": task.ply_file_url,
-                        "preview_url": task.preview_video_url,
-                        "error_message": task.error_message
-                    }
-                else:
-                    response = {"error": "Task not found"}
-                    
-            except Exception as e:
-                response = {
-                    "error": "Failed to get task status", 
-                    "details": str(e)
-                }
-            
-            body = json.dumps(response).encode()
-            
-            await send({
-                "type": "http.response.start",
-                "status": 200 if "error" not in response else 404,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
-            return
+        # Queued tasks are never picked up once cancelled; submitted ones are cancelled in RunPod too
+        task.status = GenerationStatus.CANCELLED.value
+        task.error_code = "cancelled"
+        task.completed_at = datetime.utcnow()
+        db.commit()
+        job_id = task.runpod_job_id
+    except Exception as e:
+        await send_json(send, {"error": "Failed to cancel task", "details": str(e)}, 500)
+        return
+    finally:
+        db.close()
+    
+    response = {"task_id": task_id, "status": GenerationStatus.CANCELLED.value}
+    if job_id and RUNPOD_ENABLED and HTTPX_AVAILABLE:
+        result = await cancel_runpod(job_id)
+        response.update(job_id=job_id, runpod_status=result.get("status"), error=result.get("error"))
+    
+    await send_json(send, response)
+
+# List all tasks endpoint
+@router.route("GET", "/api/v1/tasks")
+async def list_tasks(scope, receive, send):
+    try:
+        # Filters use the stored model stats, artifact files are never read
+        params = parse_qs(scope.get("query_string", b"").decode())
         
-        # List all tasks endpoint
-        if path == "/api/v1/tasks" and method == "GET":
-            try:
-                db = SessionLocal()
-                tasks = db.query(GenerationTask).order_by(GenerationTask.created_at.desc()).limit(10).all()
-                db.close()
-                
-                response = {
-                    "tasks": [
-                        {
-                            "task_id": task.id,
-                            "status": task.status,
-                            "created_at": task.created_at.isoformat(),
-                            "original_filename": task.original_filename
-                        }
-                        for task in tasks
-                    ]
-                }
-                
-            except Exception as e:
-                response = {
-                    "error": "Failed to get tasks",
-                    "details": str(e)
-                }
-            
-            body = json.dumps(response).encode()
-            
-            await send({
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
-            return
+        db = SessionLocal()
+        query = db.query(GenerationTask)
+        if "status" in params:
+            query = query.filter(GenerationTask.status == params["status"][0])
+        if "min_faces" in params:
+            query = query.filter(GenerationTask.face_count >= int(params["min_faces"][0]))
+        if "max_faces" in params:
+            query = query.filter(GenerationTask.face_count <= int(params["max_faces"][0]))
+        if "max_size_mb" in params:
+            query = query.filter(GenerationTask.file_size_mb <= float(params["max_size_mb"][0]))
+        limit = min(int(params.get("limit", ["10"])[0]), 100)
+        tasks = query.order_by(GenerationTask.created_at.desc()).limit(limit).all()
+        db.close()
         
-        # 404 for other paths
-        response = {"error": "Not found"}
-        body = json.dumps(response).encode()
+        response = {
+            "tasks": [
+                {
+                    "task_id": task.id,
+                    "status": task.status,
+                    "created_at": task.created_at.isoformat(),
+                    "original_filename": task.original_filename,
+                    "glb_stats": task.glb_stats()
+                }
+                for task in tasks
+            ]
+        }
         
-        await send({
-            "type": "http.response.start",
-            "status": 404,
-            "headers": [
-                [b"content-type", b"application/json"],
-                [b"content-length", str(len(body)).encode()],
-            ],
-        })
-        await send({
-            "type": "http.response.body",
-            "body": body,
-        })
+    except Exception as e:
+        response = {
+            "error": "Failed to get tasks",
+            "details": str(e)
+        }
+    
+    await send_json(send, response)
+
+# ASGI приложение: static routes by dict lookup, /api/v1/task/{id} by a precompiled pattern, 404 otherwise
+app = router
 
 if __name__ == "__main__":
     import uvicorn
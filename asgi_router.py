@@ -0,0 +1,96 @@
+"""
+Minimal routing and response helpers for the raw ASGI apps
+
+Static routes are resolved with a single dict lookup on (method, path);
+parametric routes such as ``/api/v1/task/{task_id}`` are compiled to regular
+expressions once, at registration, and only tried when no static route
+matches. Constant JSON responses are encoded once, including their
+``http.response.start`` header list, and replayed as-is on every request.
+"""
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ml_server.json_codec import dumps
+
+Handler = Callable[..., Awaitable[None]]
+
+JSON_CONTENT_TYPE = [b"content-type", b"application/json"]
+_PARAM = re.compile(r"{(\w+)}")
+
+def encode_json(data: Any) -> bytes:
+    return dumps(data)
+
+def start_message(status: int, body: bytes, content_type: List[bytes] = JSON_CONTENT_TYPE) -> Dict[str, Any]:
+    return {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [content_type, [b"content-length", str(len(body)).encode()]],
+    }
+
+async def send_json(send, data: Any, status: int = 200):
+    """Encode and send a JSON response"""
+    body = encode_json(data)
+    await send(start_message(status, body))
+    await send({"type": "http.response.body", "body": body})
+
+class StaticResponse:
+    """A JSON response encoded once and replayed for every request"""
+
+    def __init__(self, data: Any, status: int = 200):
+        self.body = encode_json(data)
+        self.start = start_message(status, self.body)
+        self.message = {"type": "http.response.body", "body": self.body}
+
+    async def __call__(self, scope, receive, send, **params):
+        await send(self.start)
+        await send(self.message)
+
+NOT_FOUND = StaticResponse({"error": "Not found"}, status=404)
+
+class Router:
+    """ASGI app dispatching HTTP requests to handlers by method and path"""
+
+    def __init__(self, not_found: Handler = NOT_FOUND):
+        self.static: Dict[Tuple[str, str], Handler] = {}
+        self.patterns: Dict[str, List[Tuple[re.Pattern, Handler]]] = {}
+        self.not_found = not_found
+
+    def add(self, method: str, path: str, handler: Handler):
+        """
+        Register a handler
+
+        Handlers are called as ``handler(scope, receive, send, **params)``
+        with the ``{name}`` segments of parametric paths as string params.
+        """
+        if _PARAM.search(path) is None:
+            self.static[(method, path)] = handler
+            return
+        regex = "^" + _PARAM.sub(r"(?P<\1>[^/]+)", re.escape(path).replace(r"\{", "{").replace(r"\}", "}")) + "$"
+        self.patterns.setdefault(method, []).append((re.compile(regex), handler))
+
+    def route(self, method: str, path: str) -> Callable[[Handler], Handler]:
+        """Decorator form of ``add``"""
+        def register(handler: Handler) -> Handler:
+            self.add(method, path, handler)
+            return handler
+        return register
+
+    def constant(self, method: str, path: str, data: Any, status: int = 200):
+        """Register a precomputed JSON response"""
+        self.add(method, path, StaticResponse(data, status))
+
+    def resolve(self, method: str, path: str) -> Tuple[Optional[Handler], Dict[str, str]]:
+        handler = self.static.get((method, path))
+        if handler is not None:
+            return handler, {}
+        for pattern, handler in self.patterns.get(method, ()):
+            match = pattern.match(path)
+            if match:
+                return handler, match.groupdict()
+        return None, {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        handler, params = self.resolve(scope["method"], scope["path"])
+        await (handler or self.not_found)(scope, receive, send, **params)
@@ -1,13 +1,19 @@
 """
 Упрощенное ASGI приложение с RunPod интеграцией
 """
-import json
 import uuid
 import os
 import base64
 import asyncio
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
+
+from asgi_router import Router, send_json
+from ml_server.job_control import (
+    PENDING_JOB, cancel_requested, deadline_after, forget_job, lookup_job, record_job, request_cancel
+)
+from ml_server.json_codec import dumps, loads
 
 try:
     import httpx
@@ -19,25 +25,113 @@ except ImportError:
 RUNPOD_ENDPOINT_ID = os.getenv("RUNPOD_ENDPOINT_ID")
 RUNPOD_API_KEY = os.getenv("RUNPOD_API_KEY") 
 RUNPOD_ENABLED = os.getenv("RUNPOD_ENABLED", "false").lower() == "true"
+GENERATION_TIMEOUT_SECONDS = int(os.getenv("GENERATION_TIMEOUT_SECONDS", "300"))  # Admission to result
+
+# Direct-to-storage uploads (optional): S3 when S3_BUCKET is set, or STORAGE_BACKEND=local|s3
+UPLOAD_PREFIX = "uploads/"
+UPLOAD_MAX_BYTES = int(os.getenv("MAX_FILE_SIZE_MB", "10")) * 1024 * 1024
+UPLOAD_URL_TTL_SECONDS = int(os.getenv("UPLOAD_URL_TTL_SECONDS", "600"))
+UPLOAD_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+upload_storage = None  # Also carries the cancellation markers the worker checks
+if os.getenv("STORAGE_BACKEND") or os.getenv("S3_BUCKET"):
+    try:
+        from ml_server.artifact_storage import storage_from_env
+        upload_storage = storage_from_env()
+    except Exception as e:
+        print(f"Artifact storage not available: {e}")
+
+# RunPod jobs in flight: task_id -> job_id (for DELETE /api/v1/task/{id}).
+# With artifact storage the mapping is also kept there, so a DELETE reaching
+# another worker process or replica finds the job too. PENDING_JOB until
+# RunPod returns the job id; a DELETE meanwhile is kept in cancel_requests.
+active_jobs: Dict[str, str] = {}
+cancel_requests: Set[str] = set()
+
+def remember_job(task_id: str, job_id: str):
+    active_jobs[task_id] = job_id
+    if upload_storage is not None:
+        try:
+            record_job(upload_storage, task_id, job_id)
+        except Exception as e:
+            print(f"Could not store job mapping: {e}")
+
+def release_job(task_id: str):
+    active_jobs.pop(task_id, None)
+    cancel_requests.discard(task_id)
+    if upload_storage is not None:
+        try:
+            forget_job(upload_storage, task_id)
+        except Exception as e:
+            print(f"Could not remove job mapping: {e}")
+
+def find_job(task_id: str) -> Optional[str]:
+    job_id = active_jobs.get(task_id)
+    if job_id is None and upload_storage is not None:
+        try:
+            job_id = lookup_job(upload_storage, task_id)
+        except Exception as e:
+            print(f"Could not read job mapping: {e}")
+    return job_id
+
+def was_cancelled(task_id: str) -> bool:
+    """Whether a DELETE arrived (here or at another process) before the job id was known"""
+    if task_id in cancel_requests:
+        return True
+    if upload_storage is not None:
+        try:
+            return cancel_requested(upload_storage, task_id)
+        except Exception as e:
+            print(f"Could not read cancellation marker: {e}")
+    return False
 
-async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
-    """Вызов RunPod для генерации 3D модели"""
+def runpod_policy(deadline: float) -> Dict[str, int]:
+    """RunPod drops the job from its queue once the deadline has passed"""
+    return {"ttl": max(int((deadline - time.time()) * 1000), 1000)}
+
+async def call_runpod(
+    image_data: Optional[bytes],
+    task_id: str,
+    image_key: Optional[str] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Вызов RunPod для генерации 3D модели (image_key: фото уже в хранилище)
+    
+    deadline: Unix time, stamped at admission; the worker abandons the job
+    after it and we stop waiting for it
+    """
     if not RUNPOD_ENABLED or not HTTPX_AVAILABLE:
         return {
             "status": "failed",
             "error": "RunPod не настроен или httpx недоступен"
         }
     
+    if deadline is None:
+        deadline = deadline_after(GENERATION_TIMEOUT_SECONDS)
+    
     try:
-        image_b64 = base64.b64encode(image_data).decode('utf-8')
-        
-        payload = {
-            "input": {
-                "image_data": image_b64,
-                "image_format": "jpg",
-                "task_id": task_id
+        if image_key:
+            # The worker reads the photo straight from storage
+            payload = {
+                "input": {
+                    "image_key": image_key,
+                    "task_id": task_id,
+                    "deadline": deadline
+                },
+                "policy": runpod_policy(deadline)
+            }
+        else:
+            image_b64 = base64.b64encode(image_data).decode('utf-8')
+            
+            payload = {
+                "input": {
+                    "image_data": image_b64,
+                    "image_format": "jpg",
+                    "task_id": task_id,
+                    "deadline": deadline
+                },
+                "policy": runpod_policy(deadline)
             }
-        }
         
         headers = {
             "Authorization": f"Bearer {RUNPOD_API_KEY}",
@@ -46,16 +140,26 @@ async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
         
         url = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/run"
         
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get("status") == "IN_QUEUE":
-                job_id = result["id"]
-                return await wait_runpod_completion(job_id, task_id)
-            
-            return result
+        # Known before RunPod answers, so a DELETE meanwhile is not a 404
+        remember_job(task_id, PENDING_JOB)
+        try:
+            async with httpx.AsyncClient(timeout=300.0) as client:
+                response = await client.post(url, content=dumps(payload), headers=headers)
+                response.raise_for_status()
+                result = loads(response.content)
+                
+                if result.get("status") == "IN_QUEUE":
+                    job_id = result["id"]
+                    remember_job(task_id, job_id)
+                    if was_cancelled(task_id):
+                        # Cancelled while the job was being submitted
+                        await cancel_runpod(job_id)
+                        return {"status": "cancelled", "job_id": job_id}
+                    return await wait_runpod_completion(job_id, task_id, deadline)
+                
+                return result
+        finally:
+            release_job(task_id)
             
     except Exception as e:
         return {
@@ -63,25 +167,50 @@ async def call_runpod(image_data: bytes, task_id: str) -> Dict[str, Any]:
             "error": f"RunPod error: {str(e)}"
         }
 
-async def wait_runpod_completion(job_id: str, task_id: str) -> Dict[str, Any]:
-    """Ждем завершения задачи в RunPod"""
+async def cancel_runpod(job_id: str) -> Dict[str, Any]:
+    """Отмена задачи в RunPod (queued задачи удаляются из очереди RunPod)"""
+    headers = {"Authorization": f"Bearer {RUNPOD_API_KEY}"}
+    url = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/cancel/{job_id}"
+    
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(url, headers=headers)
+            response.raise_for_status()
+            return loads(response.content)
+    except Exception as e:
+        return {
+            "status": "failed",
+            "error": f"RunPod cancel error: {str(e)}"
+        }
+
+async def wait_runpod_completion(job_id: str, task_id: str, deadline: float) -> Dict[str, Any]:
+    """Ждем завершения задачи в RunPod (до deadline, потом отменяем её)"""
     headers = {"Authorization": f"Bearer {RUNPOD_API_KEY}"}
     status_url = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/status/{job_id}"
     
     async with httpx.AsyncClient() as client:
-        for _ in range(300):  # 5 минут максимум
+        while time.time() < deadline:
             try:
                 response = await client.get(status_url, headers=headers)
                 response.raise_for_status()
-                result = response.json()
+                result = loads(response.content)
                 
                 status = result.get("status", "unknown")
                 
                 if status == "COMPLETED":
+                    output = result.get("output") or {}
+                    if output.get("status") in ("failed", "cancelled"):
+                        # The handler stopped the job itself (deadline, cancellation)
+                        return {
+                            "status": output["status"],
+                            "error": output.get("error"),
+                            "error_code": output.get("error_code"),
+                            "job_id": job_id
+                        }
                     return {
                         "status": "completed",
                         "job_id": job_id,
-                        "result": result.get("output", {}),
+                        "result": output,
                         "execution_time": result.get("executionTime", 0)
                     }
                 elif status == "FAILED":
@@ -90,6 +219,11 @@ async def wait_runpod_completion(job_id: str, task_id: str) -> Dict[str, Any]:
                         "error": result.get("error", "RunPod task failed"),
                         "job_id": job_id
                     }
+                elif status == "CANCELLED":
+                    return {
+                        "status": "cancelled",
+                        "job_id": job_id
+                    }
                 
                 await asyncio.sleep(1)
                 
@@ -99,11 +233,37 @@ async def wait_runpod_completion(job_id: str, task_id: str) -> Dict[str, Any]:
                     "error": f"Status check error: {str(e)}"
                 }
     
+    await cancel_runpod(job_id)
     return {
         "status": "failed",
-        "error": "Timeout waiting for completion"
+        "error": f"Generation timed out after {GENERATION_TIMEOUT_SECONDS}s",
+        "error_code": "timeout",
+        "job_id": job_id
     }
 
+async def read_json_body(receive, limit: int = 64 * 1024) -> Dict[str, Any]:
+    """Читаем небольшое JSON тело запроса"""
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.request":
+            body += message.get("body", b"")
+            if len(body) > limit:
+                raise ValueError("Request body too large")
+            if not message.get("more_body", False):
+                break
+    return loads(body) if body else {}
+
+def create_upload_intent(content_type: str) -> Dict[str, Any]:
+    """Presigned target для загрузки фото напрямую в хранилище"""
+    if content_type not in UPLOAD_EXTENSIONS:
+        raise ValueError(f"Unsupported file type. Allowed: {list(UPLOAD_EXTENSIONS)}")
+    image_key = f"{UPLOAD_PREFIX}{uuid.uuid4().hex}{UPLOAD_EXTENSIONS[content_type]}"
+    upload = upload_storage.presigned_upload(image_key, content_type, UPLOAD_MAX_BYTES, UPLOAD_URL_TTL_SECONDS)
+    if upload is None:
+        raise ValueError("Direct uploads are not supported by the storage backend")
+    return {"image_key": image_key, "upload": upload, "expires_in": UPLOAD_URL_TTL_SECONDS}
+
 async def parse_multipart_data(receive):
     """Упрощенный парсер multipart/form-data для изображений"""
     body = b""
@@ -143,120 +303,136 @@ async def parse_multipart_data(receive):
     
     return None
 
-async def app(scope: Dict[str, Any], receive, send):
-    """ASGI приложение"""
+router = Router()
+
+# Health check (constant for the lifetime of the process, encoded once)
+router.constant("GET", "/health", {
+    "status": "healthy",
+    "version": "1.0.0",
+    "runpod_enabled": RUNPOD_ENABLED,
+    "httpx_available": HTTPX_AVAILABLE
+})
+
+# Presigned direct-to-storage upload
+@router.route("POST", "/api/v1/upload")
+async def create_upload(scope, receive, send):
+    try:
+        if upload_storage is None:
+            response = {"error": "Direct uploads need artifact storage"}
+            status_code = 501
+        else:
+            request = await read_json_body(receive)
+            response = create_upload_intent(request.get("content_type", "image/jpeg"))
+            status_code = 200
+    except ValueError as e:
+        response = {"error": str(e)}
+        status_code = 400
     
-    if scope["type"] == "http":
-        path = scope["path"]
-        method = scope["method"]
+    await send_json(send, response, status_code)
+
+# Generate 3D model
+@router.route("POST", "/api/v1/generate")
+async def generate(scope, receive, send):
+    try:
+        headers = dict(scope.get("headers", []))
+        image_key = None
+        if headers.get(b"content-type", b"").startswith(b"application/json"):
+            # Фото уже загружено в хранилище через /api/v1/upload
+            image_key = (await read_json_body(receive)).get("image_key")
+            image_data = None
+            if not image_key or not image_key.startswith(UPLOAD_PREFIX) or ".." in image_key:
+                image_key = None
+        else:
+            # Парсим изображение из multipart данных
+            image_data = await parse_multipart_data(receive)
         
-        # Health check
-        if path == "/health" and method == "GET":
+        if not image_data and not image_key:
             response = {
-                "status": "healthy",
-                "version": "1.0.0",
-                "runpod_enabled": RUNPOD_ENABLED,
-                "httpx_available": HTTPX_AVAILABLE
+                "error": "No image found in request"
             }
-            body = json.dumps(response).encode()
+            status_code = 400
+        else:
+            # Генерируем task_id; deadline ставим при приеме задачи
+            task_id = str(uuid.uuid4())
+            deadline = deadline_after(GENERATION_TIMEOUT_SECONDS)
             
-            await send({
-                "type": "http.response.start",
-                "status": 200,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
-            return
-        
-        # Generate 3D model
-        if path == "/api/v1/generate" and method == "POST":
-            try:
-                # Парсим изображение из multipart данных
-                image_data = await parse_multipart_data(receive)
+            if RUNPOD_ENABLED and HTTPX_AVAILABLE:
+                # Вызываем RunPod
+                result = await call_runpod(image_data, task_id, image_key=image_key, deadline=deadline)
                 
-                if not image_data:
+                if result.get("status") == "completed":
+                    response = {
+                        "task_id": task_id,
+                        "status": "completed",
+                        "message": "3D model generated successfully",
+                        "job_id": result.get("job_id"),
+                        "execution_time": result.get("execution_time"),
+                        "result": result.get("result", {})
+                    }
+                    status_code = 200
+                elif result.get("status") == "cancelled":
                     response = {
-                        "error": "No image found in request"
+                        "task_id": task_id,
+                        "status": "cancelled",
+                        "error": "Task was cancelled",
+                        "job_id": result.get("job_id")
                     }
-                    status_code = 400
+                    status_code = 409
                 else:
-                    # Генерируем task_id
-                    task_id = str(uuid.uuid4())
-                    
-                    if RUNPOD_ENABLED and HTTPX_AVAILABLE:
-                        # Вызываем RunPod
-                        result = await call_runpod(image_data, task_id)
-                        
-                        if result.get("status") == "completed":
-                            response = {
-                                "task_id": task_id,
-                                "status": "completed",
-                                "message": "3D model generated successfully",
-                                "job_id": result.get("job_id"),
-                                "execution_time": result.get("execution_time"),
-                                "result": result.get("result", {})
-                            }
-                            status_code = 200
-                        else:
-                            response = {
-                                "task_id": task_id,
-                                "status": "failed",
-                                "error": result.get("error", "Generation failed"),
-                                "job_id": result.get("job_id")
-                            }
-                            status_code = 500
-                    else:
-                        # Demo режим
-                        response = {
-                            "task_id": task_id,
-                            "status": "demo",
-                            "message": "RunPod не настроен - демо режим",
-                            "image_size": len(image_data)
-                        }
-                        status_code = 200
-                
-            except Exception as e:
+                    response = {
+                        "task_id": task_id,
+                        "status": "failed",
+                        "error": result.get("error", "Generation failed"),
+                        "error_code": result.get("error_code"),
+                        "job_id": result.get("job_id")
+                    }
+                    status_code = 504 if result.get("error_code") == "timeout" else 500
+            else:
+                # Demo режим
                 response = {
-                    "error": f"Generation failed: {str(e)}"
+                    "task_id": task_id,
+                    "status": "demo",
+                    "message": "RunPod не настроен - демо режим",
+                    "image_size": len(image_data) if image_data else None
                 }
-                status_code = 500
-            
-            body = json.dumps(response).encode()
-            
-            await send({
-                "type": "http.response.start",
-                "status": status_code,
-                "headers": [
-                    [b"content-type", b"application/json"],
-                    [b"content-length", str(len(body)).encode()],
-                ],
-            })
-            await send({
-                "type": "http.response.body",
-                "body": body,
-            })
-            return
+                status_code = 200
         
-        # 404 для всех остальных путей
-        response = {"error": "Not found"}
-        body = json.dumps(response).encode()
-        
-        await send({
-            "type": "http.response.start",
-            "status": 404,
-            "headers": [
-                [b"content-type", b"application/json"],
-                [b"content-length", str(len(body)).encode()],
-            ],
-        })
-        await send({
-            "type": "http.response.body",
-            "body": body,
-        })
+    except Exception as e:
+        response = {
+            "error": f"Generation failed: {str(e)}"
+        }
+        status_code = 500
+    
+    await send_json(send, response, status_code)
+
+# Cancel a generation in flight
+@router.route("DELETE", "/api/v1/task/{task_id}")
+async def cancel_task(scope, receive, send, task_id: str):
+    job_id = find_job(task_id)
+    if job_id is None:
+        await send_json(send, {"error": "Task not found or already finished"}, 404)
         return
+    
+    cancel_requests.add(task_id)
+    if upload_storage is not None:
+        # The worker stops between pipeline stages once it sees the marker
+        try:
+            request_cancel(upload_storage, task_id)
+        except Exception as e:
+            print(f"Could not store cancellation marker: {e}")
+    if job_id == PENDING_JOB:
+        # Still submitting: the job is cancelled as soon as RunPod returns its id
+        await send_json(send, {"task_id": task_id, "status": "cancelling", "job_id": None}, 202)
+        return
+    result = await cancel_runpod(job_id)
+    
+    await send_json(send, {
+        "task_id": task_id,
+        "status": "cancelled",
+        "job_id": job_id,
+        "runpod_status": result.get("status"),
+        "error": result.get("error")
+    })
+
+# ASGI приложение (404 для всех остальных путей)
+app = router
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: requests/sec of the raw ASGI apps
+
+Drives asgi_app / asgi_simple in-process (no sockets), so the numbers are
+the app's own per-request cost: routing, JSON encoding and header building.
+The ``legacy`` rows replay the previous dispatch for comparison, an
+``if path == ... and method == ...`` chain that re-encodes every response.
+The task lookup runs against a temporary SQLite database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def legacy_app(routes: list):
+    """The previous dispatch: linear checks, json.dumps and a fresh header list per request"""
+    async def app(scope, receive, send):
+        path, method = scope["path"], scope["method"]
+        for route_method, route_path, payload in routes:
+            if route_path.endswith("/") and route_path != "/":
+                matched = path.startswith(route_path)
+            else:
+                matched = path == route_path
+            if matched and method == route_method:
+                response, status = payload, 200
+                break
+        else:
+            response, status = {"error": "Not found"}, 404
+        body = json.dumps(response).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                [b"content-type", b"application/json"],
+                [b"content-length", str(len(body)).encode()],
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+async def run(app, method: str, path: str, requests: int) -> float:
+    """Requests per second for one endpoint"""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return requests / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50000, help="Requests per constant endpoint")
+    parser.add_argument("--db-requests", type=int, default=2000, help="Requests per database endpoint")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    import asgi_app
+    import asgi_simple
+    from database import GenerationTask, SessionLocal, init_database
+
+    init_database()
+    db = SessionLocal()
+    db.add(GenerationTask(id="bench-task", original_image_url="bench.jpg"))
+    db.commit()
+    db.close()
+
+    health = {"status": "healthy", "version": "1.0.0", "mode": "railway_demo"}
+    status = {"api": "v1", "status": "operational", "endpoints": ["/health", "/api/v1/status", "/api/v1/generate"]}
+    # Same route order as the previous asgi_app, constant endpoints first
+    legacy = legacy_app([
+        ("GET", "/health", health),
+        ("GET", "/", {"message": "Photo to 3D API is running"}),
+        ("GET", "/api/v1/status", status),
+        ("POST", "/api/v1/generate", {}),
+        ("GET", "/api/v1/task/", {}),
+        ("GET", "/api/v1/tasks", {}),
+    ])
+
+    cases = [
+        ("asgi_app", asgi_app.app, "GET", "/health", args.requests),
+        ("asgi_app", asgi_app.app, "GET", "/", args.requests),
+        ("asgi_app", asgi_app.app, "GET", "/api/v1/status", args.requests),
+        ("asgi_app", asgi_app.app, "GET", "/missing", args.requests),
+        ("asgi_app", asgi_app.app, "GET", "/api/v1/task/bench-task", args.db_requests),
+        ("asgi_simple", asgi_simple.app, "GET", "/health", args.requests),
+        ("legacy", legacy, "GET", "/health", args.requests),
+        ("legacy", legacy, "GET", "/api/v1/status", args.requests),
+        ("legacy", legacy, "GET", "/missing", args.requests),
+    ]
+
+    print(f"{'app':<12} {'endpoint':<28} {'req/s':>12}")
+    for name, app, method, path, requests in cases:
+        rate = asyncio.run(run(app, method, path, requests))
+        print(f"{name:<12} {method + ' ' + path:<28} {rate:>12,.0f}")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: plain trimesh GLB export vs quantized / meshopt-compressed export
+"""
+import os
+import sys
+import gzip
+import time
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from glb_export import export_trimesh_glb
+
+def create_test_mesh(subdivisions: int = 7, texture_size: int = 1024):
+    """Noisy textured sphere, comparable to a baked TRELLIS mesh"""
+    rng = np.random.default_rng(42)
+    sphere = trimesh.creation.icosphere(subdivisions=subdivisions)
+    vertices = sphere.vertices * (1.0 + 0.02 * rng.standard_normal((len(sphere.vertices), 1)))
+    uvs = sphere.vertices[:, :2] * 0.5 + 0.5
+
+    texture = Image.fromarray(rng.integers(0, 255, (texture_size, texture_size, 3), dtype=np.uint8))
+    material = trimesh.visual.material.PBRMaterial(roughnessFactor=1.0, baseColorTexture=texture)
+    return trimesh.Trimesh(
+        vertices=vertices,
+        faces=sphere.faces,
+        visual=trimesh.visual.TextureVisuals(uv=uvs, material=material),
+        process=False
+    )
+
+def measure(name: str, export, repeat: int = 3):
+    """Time an export and report raw and gzip sizes"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = export()
+        timings.append(time.perf_counter() - start)
+
+    gzipped = len(gzip.compress(data, 6))
+    print(f"{name:<10} {len(data) / 1e6:>9.2f} MB {gzipped / 1e6:>9.2f} MB {min(timings) * 1000:>9.1f} ms")
+    return len(data)
+
+if __name__ == "__main__":
+    subdivisions = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    mesh = create_test_mesh(subdivisions)
+    # Drop the texture to compare geometry only
+    geometry = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces, process=False)
+
+    for label, source in (("textured", mesh), ("geometry", geometry)):
+        print(f"\n📊 {label}: {len(source.vertices)} vertices, {len(source.faces)} faces")
+        print(f"{'export':<10} {'raw':>12} {'gzip':>12} {'time':>12}")
+        plain = measure("plain", lambda: source.export(file_type="glb"))
+        quantized = measure("quantize", lambda: export_trimesh_glb(source, compress=False))
+        meshopt = measure("meshopt", lambda: export_trimesh_glb(source, compress=True))
+        print(f"✅ quantize: {quantized / plain:.0%} of plain, meshopt: {meshopt / plain:.0%} of plain")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON encoding / decoding of realistic response payloads
+
+Compares stdlib ``json`` with every fast backend that is installed (orjson,
+msgspec) on the payloads the services actually move: a RunPod handler
+result with base64-inlined GLB / PLY / preview files, the RunPod status
+response wrapping it, and a small task status body.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+MB = 1024 * 1024
+
+def handler_result(glb_mb: float, ply_mb: float, video_mb: float) -> dict:
+    """What ml_server/handler.py returns when artifacts are inlined as base64"""
+    result = {}
+    for key, size in (("glb_path", glb_mb), ("ply_path", ply_mb), ("preview_path", video_mb)):
+        data = os.urandom(int(size * MB))
+        result[key] = f"/tmp/trellis-job/{key}.bin"
+        result[f"{key}_base64"] = base64.b64encode(data).decode()
+        result[f"{key}_size"] = len(data)
+    result["glb_stats"] = {"vertex_count": 48211, "face_count": 96000, "bounds": [[-0.5, -0.5, -0.5], [0.5, 0.5, 0.5]]}
+    result["upload_timings"] = {"glb_path": 0.412, "ply_path": 0.981, "total": 1.204}
+    return {"task_id": "2b1f0c9e", "status": "completed", "result": result}
+
+def status_body() -> dict:
+    return {
+        "task_id": "2b1f0c9e",
+        "status": "completed",
+        "created_at": datetime(2024, 5, 1, 12, 0, 0).isoformat(),
+        "glb_url": "https://bucket.s3.amazonaws.com/generations/2b1f0c9e/model.glb?X-Amz-Signature=abc",
+        "glb_stats": {"vertex_count": 48211, "face_count": 96000},
+        "error_message": None,
+    }
+
+def backends() -> dict:
+    found = {"json": (lambda obj: json.dumps(obj).encode(), json.loads)}
+    try:
+        import orjson
+        found["orjson"] = (orjson.dumps, orjson.loads)
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        found["msgspec"] = (msgspec.json.encode, msgspec.json.decode)
+    except ImportError:
+        pass
+    return found
+
+def timed(fn, arg, repeat: int) -> float:
+    """Best of ``repeat`` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--glb-mb", type=float, default=8.0)
+    parser.add_argument("--ply-mb", type=float, default=24.0)
+    parser.add_argument("--video-mb", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml_server'))
+    from json_codec import JSON_BACKEND
+
+    result = handler_result(args.glb_mb, args.ply_mb, args.video_mb)
+    payloads = {
+        "handler result": result,
+        "runpod status": {"id": "job-1", "status": "COMPLETED", "executionTime": 41250, "output": result},
+        "task status": status_body(),
+    }
+    print(f"json_codec backend: {JSON_BACKEND}")
+    print(f"{'payload':<16} {'MB':>7} {'backend':<8} {'encode ms':>10} {'decode ms':>10}")
+    for name, payload in payloads.items():
+        encoded = json.dumps(payload).encode()
+        repeat = args.repeat if len(encoded) > MB else args.repeat * 2000
+        for backend, (dumps, loads) in backends().items():
+            encode_ms = timed(dumps, payload, repeat)
+            decode_ms = timed(loads, encoded, repeat)
+            print(f"{name:<16} {len(encoded) / MB:>7.2f} {backend:<8} {encode_ms:>10.3f} {decode_ms:>10.3f}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: status throughput of N API replicas sharing one task store
+
+Starts N processes, each standing in for one API worker / replica with its
+own SqlTaskStore and replica id. Every replica first queues its share of the
+tasks, then serves status reads for random tasks, most of them queued by the
+other replicas (the polling pattern behind GET /status/{task_id}), with an
+occasional status write. Reported: total reads/sec per N and the scaling
+efficiency against one replica.
+
+The store is a temporary SQLite file (WAL) unless --database-url points at
+the deployment's database; Postgres is what multi-replica deployments use.
+Scaling needs as many free cores as replicas.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def replica(index: int, url: str, tasks: int, replicas: int, seconds: float, start, results):
+    os.environ.setdefault("DATABASE_URL", url)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models.generation import GenerationStatus, GenerationTask
+    from app.services.task_store import SqlTaskStore
+
+    engine = create_engine(url)
+    store = SqlTaskStore(f"replica-{index}", sessionmaker(bind=engine), engine)
+
+    async def run():
+        for n in range(index, tasks, replicas):
+            await store.add(GenerationTask(
+                task_id=f"task-{n}",
+                status=GenerationStatus.PENDING,
+                created_at=datetime.utcnow(),
+                owner=store.owner
+            ))
+        start.wait()  # All tasks exist before anyone reads
+        rng = random.Random(index)
+        reads = foreign = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            task = await store.get(f"task-{rng.randrange(tasks)}")
+            reads += 1
+            foreign += task.owner != store.owner
+            if reads % 20 == 0:
+                task.status = GenerationStatus.PROCESSING
+                await store.save(task)
+        return reads, foreign
+
+    results.put((index, *asyncio.run(run())))
+
+def measure(url: str, replicas: int, tasks: int, seconds: float) -> tuple:
+    start = multiprocessing.Barrier(replicas)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=replica, args=(i, url, tasks, replicas, seconds, start, results))
+        for i in range(replicas)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    reads = sum(row[1] for row in rows)
+    foreign = sum(row[2] for row in rows)
+    return reads / seconds, foreign / max(reads, 1)
+
+def reset(url: str):
+    from sqlalchemy import create_engine
+    from app.services.task_store import TaskRecord
+    engine = create_engine(url)
+    TaskRecord.__table__.drop(bind=engine, checkfirst=True)
+    engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--database-url", help="Shared database (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-replicas-")
+    url = args.database_url or f"sqlite:///{os.path.join(workdir, 'tasks.db')}"
+    print(f"task store: {url.split('@')[-1]}, {os.cpu_count()} CPUs")
+    print(f"{'replicas':>8} {'reads/s':>10} {'foreign':>8} {'scaling':>8}")
+    baseline = None
+    for count in args.replicas:
+        reset(url)
+        rate, foreign = measure(url, count, args.tasks, args.seconds)
+        baseline = baseline or rate / count
+        print(f"{count:>8} {rate:>10.0f} {foreign:>7.0%} {rate / (baseline * count):>7.0%}")
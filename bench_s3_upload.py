@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs concurrent artifact uploads
+
+Runs against $S3_ENDPOINT_URL (e.g. a local MinIO) if set, otherwise against
+a local moto server (or moto's in-process mock if the server extras are missing).
+
+A local stand-in has no network cost, so ``--rtt-ms`` / ``--mbps`` add a
+simulated round trip and per-connection bandwidth to every request, which is
+what makes sequential uploads slow against real object storage.
+"""
+import argparse
+import os
+import sys
+import time
+import tempfile
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from artifact_storage import S3Storage, client_config
+from artifact_upload import upload_artifacts
+
+MB = 1024 * 1024
+ARTIFACTS = {"glb_path": 40 * MB, "ply_path": 60 * MB, "preview_path": 8 * MB}
+
+def create_client():
+    endpoint = os.environ.get("S3_ENDPOINT_URL")
+    server = None
+    if not endpoint:
+        try:
+            from moto.server import ThreadedMotoServer
+            server = ThreadedMotoServer(port=0)
+            server.start()
+            host, port = server.get_host_and_port()
+            endpoint = f"http://{host}:{port}"
+        except ImportError:
+            import moto
+            server = moto.mock_aws()
+            server.start()
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        region_name="us-east-1",
+        config=client_config(),
+        aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID", "test"),
+        aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY", "test")
+    )
+    return client, server
+
+def simulate_network(client, rtt_ms: float, mbps: float):
+    """Delay every request by one round trip plus its transfer time on a single connection"""
+    def delay(params, **kwargs):
+        body = params.get("body")
+        if hasattr(body, "seek"):
+            position = body.tell()
+            body.seek(0, os.SEEK_END)
+            size = body.tell() - position
+            body.seek(position)
+        else:
+            size = len(body or b"")
+        time.sleep(rtt_ms / 1000 + (size / (mbps * MB / 8) if mbps else 0))
+    # before-call fires for every operation, before any mock can short-circuit sending
+    client.meta.events.register("before-call.s3", delay)
+
+def upload_sequential(client, bucket: str, files: dict, prefix: str) -> float:
+    """Previous behaviour: default upload_file for each artifact in turn"""
+    start = time.perf_counter()
+    for name, path in files.items():
+        client.upload_file(path, bucket, f"{prefix}/{name}")
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rtt-ms", type=float, default=30.0, help="Simulated round trip per request")
+    parser.add_argument("--mbps", type=float, default=400.0, help="Simulated bandwidth per connection (0 = unlimited)")
+    args = parser.parse_args()
+    
+    bucket = os.environ.get("S3_BUCKET", "bench-artifacts")
+    client, server = create_client()
+    if args.rtt_ms or args.mbps:
+        simulate_network(client, args.rtt_ms, args.mbps)
+        print(f"🌐 Simulated network: {args.rtt_ms:.0f} ms RTT, {args.mbps or 'unlimited'} Mbit/s per connection")
+    try:
+        client.create_bucket(Bucket=bucket)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for name, size in ARTIFACTS.items():
+            files[name] = os.path.join(tmp, name)
+            with open(files[name], "wb") as f:
+                f.write(os.urandom(size))
+        
+        total = sum(ARTIFACTS.values()) / MB
+        print(f"📦 {len(files)} artifacts, {total:.0f} MB total")
+        
+        sequential = min(upload_sequential(client, bucket, files, f"seq/{i}") for i in range(3))
+        print(f"sequential  {sequential:>7.2f} s  {total / sequential:>7.1f} MB/s")
+        
+        storage = S3Storage(bucket, client=client)
+        concurrent = None
+        for i in range(3):
+            uploads = upload_artifacts(storage, files, prefix=f"concurrent/{i}")
+            if concurrent is None or uploads["seconds"] < concurrent:
+                concurrent, timings = uploads["seconds"], uploads["files"]
+        print(f"concurrent  {concurrent:>7.2f} s  {total / concurrent:>7.1f} MB/s")
+        for name, result in timings.items():
+            print(f"  {name:<14} {result['bytes'] / MB:>6.0f} MB {result['seconds']:>7.2f} s")
+        print(f"✅ concurrent upload: {sequential / concurrent:.2f}x faster")
+    
+    if server:
+        server.stop()
@@ -4,7 +4,7 @@ Database models and connection for Photo to 3D
 import os
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Text, Float, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.dialects.postgresql import UUID
@@ -35,6 +35,7 @@ class GenerationTask(Base):
     # Task info
     user_id = Column(String, nullable=True)  # For future auth
     status = Column(String, default=GenerationStatus.PENDING.value)
+    runpod_job_id = Column(String, nullable=True)  # Set once submitted, used to cancel the job
     
     # Input data
     original_image_url = Column(String, nullable=False)
@@ -56,6 +57,7 @@ class GenerationTask(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    deadline_at = Column(DateTime, nullable=True)  # created_at + GENERATION_TIMEOUT_SECONDS
     
     # Error handling
     error_message = Column(Text, nullable=True)
@@ -64,6 +66,40 @@ class GenerationTask(Base):
     # Metadata
     processing_time_seconds = Column(Float, nullable=True)
     file_size_mb = Column(Float, nullable=True)
+    
+    # Model stats (read from the GLB header, see ml_server/glb_inspect.py)
+    vertex_count = Column(Integer, nullable=True, index=True)
+    face_count = Column(Integer, nullable=True, index=True)
+    texture_count = Column(Integer, nullable=True)
+    bbox_min_x = Column(Float, nullable=True)
+    bbox_min_y = Column(Float, nullable=True)
+    bbox_min_z = Column(Float, nullable=True)
+    bbox_max_x = Column(Float, nullable=True)
+    bbox_max_y = Column(Float, nullable=True)
+    bbox_max_z = Column(Float, nullable=True)
+    
+    def apply_glb_stats(self, stats: dict):
+        """Store stats returned by ``inspect_glb``"""
+        self.vertex_count = stats.get("vertex_count")
+        self.face_count = stats.get("face_count")
+        self.texture_count = stats.get("texture_count")
+        if stats.get("file_size") is not None:
+            self.file_size_mb = round(stats["file_size"] / (1024 * 1024), 3)
+        if stats.get("bbox_min") and stats.get("bbox_max"):
+            self.bbox_min_x, self.bbox_min_y, self.bbox_min_z = stats["bbox_min"]
+            self.bbox_max_x, self.bbox_max_y, self.bbox_max_z = stats["bbox_max"]
+    
+    def glb_stats(self) -> dict:
+        """Model stats as stored in the columns"""
+        has_bbox = self.bbox_min_x is not None
+        return {
+            "vertex_count": self.vertex_count,
+            "face_count": self.face_count,
+            "texture_count": self.texture_count,
+            "file_size_mb": self.file_size_mb,
+            "bbox_min": [self.bbox_min_x, self.bbox_min_y, self.bbox_min_z] if has_bbox else None,
+            "bbox_max": [self.bbox_max_x, self.bbox_max_y, self.bbox_max_z] if has_bbox else None,
+        }
 
 class User(Base):
     """User model for future authentication"""
@@ -90,9 +126,27 @@ def get_db():
     finally:
         db.close()
 
+def _add_missing_columns():
+    """Add columns and indexes introduced after a table was created (create_all only creates tables)"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+
 def init_database():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
     print("✅ Database tables created successfully")
 
 if __name__ == "__main__":
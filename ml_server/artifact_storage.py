@@ -0,0 +1,558 @@
+"""
+Artifact storage backends
+
+One interface for every artifact read and write, with implementations for
+the local filesystem and S3-compatible object storage. Data moves in
+fixed-size chunks so GLB / PLY / MP4 files are never held in memory whole.
+Keys are either chosen by the caller or derived from the content hash.
+Downloads and client uploads can be handed out as short-lived presigned URLs
+(native presigning on S3, HMAC-signed URLs served by a static file endpoint
+for local disk), so artifact bytes never have to pass through the API process.
+
+Shared by the RunPod worker and the API (imported as ``ml_server.artifact_storage``),
+so this module must not import other worker modules.
+"""
+import hashlib
+import hmac
+import io
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Union
+from urllib.parse import quote, urlencode
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+MB = 1024 * 1024
+CHUNK_SIZE = 1 * MB
+S3_MAX_PARTS = 10000
+
+# Multipart tuning for S3 (files in flight are bounded by the caller's pool)
+UPLOAD_MAX_WORKERS = int(os.environ.get("S3_UPLOAD_MAX_WORKERS", "4"))
+UPLOAD_PART_CONCURRENCY = int(os.environ.get("S3_UPLOAD_PART_CONCURRENCY", "4"))
+MULTIPART_THRESHOLD = int(os.environ.get("S3_MULTIPART_THRESHOLD_MB", "8")) * MB
+MULTIPART_CHUNK_SIZE = int(os.environ.get("S3_MULTIPART_CHUNK_MB", "8")) * MB
+
+# Presigned download URLs
+URL_TTL_SECONDS = int(os.environ.get("ARTIFACT_URL_TTL_SECONDS", "900"))
+URL_EXPIRY_STEP = 300  # Local expiries are rounded up, so status polls return a stable (cacheable) URL
+
+CONTENT_TYPES = {
+    ".glb": "model/gltf-binary",
+    ".ply": "application/octet-stream",
+    ".mp4": "video/mp4",
+    ".webp": "image/webp",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+Source = Union[bytes, bytearray, memoryview, BinaryIO, Iterable[bytes]]
+
+class ArtifactInfo(NamedTuple):
+    """Metadata of a stored artifact"""
+    key: str
+    size: int
+    etag: str
+    content_type: str
+    modified: float  # Unix timestamp
+
+def content_type_for(key: str) -> str:
+    return CONTENT_TYPES.get(os.path.splitext(key)[1].lower(), "application/octet-stream")
+
+def iter_chunks(source: Source, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a bytes-like object, file object or chunk iterable in chunks"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), chunk_size):
+            yield view[offset:offset + chunk_size]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+def hash_key(digest: str, suffix: str = "", prefix: str = "objects") -> str:
+    """Content-addressed key, fanned out by the first digest byte"""
+    return f"{prefix}/{digest[:2]}/{digest}{suffix}"
+
+# Sample secrets from the config defaults, env.example and the docs; anyone can sign with them
+PLACEHOLDER_SECRETS = frozenset({
+    "your-secret-key-here",
+    "your-super-secret-jwt-key",
+    "your-super-secret-jwt-key-here",
+    "your-artifact-signing-key",
+    "your_secret",
+})
+
+def usable_secret(*candidates: Optional[str]) -> Optional[str]:
+    """First configured secret, None if there is none or it is a sample value"""
+    secret = next((candidate for candidate in candidates if candidate), None)
+    return None if secret in PLACEHOLDER_SECRETS else secret
+
+def sign_key(secret: str, method: str, key: str, expires: int, *params: str) -> str:
+    """
+    HMAC-SHA256 signature of a signed URL
+
+    Covers the HTTP method, key, expiry and the method's parameters
+    (download filename for GET; content type and size limit for PUT).
+    """
+    message = "\n".join([method, key, str(expires), *params]).encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+def verify_signature(
+    secret: str,
+    method: str,
+    key: str,
+    expires: Optional[str],
+    signature: Optional[str],
+    *params: str,
+    now: Optional[float] = None
+) -> bool:
+    """Check a signed URL's parameters: the signature matches and it has not expired"""
+    if not usable_secret(secret):
+        return False
+    try:
+        expires_at = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires_at < (now or time.time()):
+        return False
+    return hmac.compare_digest(sign_key(secret, method, key, expires_at, *params), signature or "")
+
+def file_digest(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter_chunks(f, chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of chunks"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+class ArtifactStorage:
+    """Base class for artifact storage backends"""
+
+    chunk_size = CHUNK_SIZE
+
+    def put_stream(self, key: str, source: Source, content_type: Optional[str] = None) -> ArtifactInfo:
+        """Write an artifact from bytes, a file object or an iterable of chunks"""
+        raise NotImplementedError
+
+    def get_stream(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """Read an artifact (or a byte range of it) in chunks"""
+        raise NotImplementedError
+
+    def stat(self, key: str) -> ArtifactInfo:
+        """Artifact metadata; raises FileNotFoundError for missing keys"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def url(self, key: str) -> Optional[str]:
+        """Public URL of the artifact, if the backend serves one"""
+        return None
+
+    def presigned_url(self, key: str, expires_in: int = URL_TTL_SECONDS, filename: Optional[str] = None) -> Optional[str]:
+        """
+        Short-lived download URL that bypasses the API
+
+        Args:
+            key: Artifact key
+            expires_in: Seconds the URL stays valid (at least)
+            filename: Download filename (Content-Disposition) baked into the URL
+
+        Returns:
+            The URL, or None if the backend cannot sign URLs
+        """
+        return None
+
+    def presigned_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_bytes: int,
+        expires_in: int = URL_TTL_SECONDS
+    ) -> Optional[dict]:
+        """
+        Target for a client to upload one object straight to the store
+
+        Args:
+            key: Key the object will be stored under
+            content_type: Content type the upload must declare
+            max_bytes: Largest accepted upload
+            expires_in: Seconds the target stays valid
+
+        Returns:
+            Dict with ``method`` ("PUT" or "POST"), ``url``, form ``fields``
+            (POST: send them before the file) and request ``headers``, or
+            None if the backend cannot sign uploads
+        """
+        return None
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of the artifact, if the backend keeps one"""
+        return None
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put_file(self, key: Optional[str], path: str, content_type: Optional[str] = None) -> ArtifactInfo:
+        """
+        Store a local file
+
+        ``key=None`` stores it under its content hash; identical content is
+        stored once.
+        """
+        if key is None:
+            key = hash_key(file_digest(path), os.path.splitext(path)[1].lower())
+            if self.exists(key):
+                return self.stat(key)
+        with open(path, "rb") as f:
+            return self.put_stream(key, f, content_type or content_type_for(path))
+
+    def put_bytes(self, key: Optional[str], data: bytes, content_type: Optional[str] = None, suffix: str = "") -> ArtifactInfo:
+        """Store bytes; ``key=None`` stores them under their content hash"""
+        if key is None:
+            key = hash_key(hashlib.sha256(data).hexdigest(), suffix)
+            if self.exists(key):
+                return self.stat(key)
+        return self.put_stream(key, data, content_type)
+
+    def get_bytes(self, key: str) -> bytes:
+        return b"".join(self.get_stream(key))
+
+class LocalStorage(ArtifactStorage):
+    """Artifacts as files below a root directory"""
+
+    def __init__(self, root: str, base_url: Optional[str] = None, signing_key: Optional[str] = None):
+        """
+        Args:
+            root: Artifact directory
+            base_url: URL prefix of the signed file endpoint (e.g. "https://files.example.com")
+            signing_key: HMAC secret shared with that endpoint; both are needed for presigned URLs
+        """
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.signing_key = signing_key
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid artifact key: {key}")
+        return path
+
+    def _write_atomic(self, key: str, write) -> ArtifactInfo:
+        """Write to a temporary file next to the target, then rename it into place"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return self.stat(key)
+
+    def put_stream(self, key: str, source: Source, content_type: Optional[str] = None) -> ArtifactInfo:
+        def write(f):
+            for chunk in iter_chunks(source, self.chunk_size):
+                f.write(chunk)
+        return self._write_atomic(key, write)
+
+    def put_file(self, key: Optional[str], path: str, content_type: Optional[str] = None) -> ArtifactInfo:
+        if key is None:
+            return super().put_file(key, path, content_type)
+
+        def write(f):
+            with open(path, "rb") as source:
+                shutil.copyfileobj(source, f, self.chunk_size)
+        return self._write_atomic(key, write)
+
+    def get_stream(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk = f.read(self.chunk_size if remaining is None else min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def stat(self, key: str) -> ArtifactInfo:
+        st = os.stat(self._path(key))
+        return ArtifactInfo(
+            key=key,
+            size=st.st_size,
+            etag=f'"{st.st_size:x}-{st.st_mtime_ns:x}"',
+            content_type=content_type_for(key),
+            modified=st.st_mtime
+        )
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.unlink(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.isfile(path) else None
+
+    def _signed_url(self, method: str, key: str, expires: int, params: dict) -> Optional[str]:
+        if self.base_url is None or not usable_secret(self.signing_key):
+            return None
+        self._path(key)  # Reject keys outside the root before signing them
+        signature = sign_key(self.signing_key, method, key, expires, *(str(value) for value in params.values()))
+        query = {"expires": expires, "signature": signature}
+        query.update((name, value) for name, value in params.items() if value)
+        return f"{self.base_url}/{quote(key)}?{urlencode(query)}"
+
+    def presigned_url(self, key: str, expires_in: int = URL_TTL_SECONDS, filename: Optional[str] = None) -> Optional[str]:
+        expires = -(-(int(time.time()) + expires_in) // URL_EXPIRY_STEP) * URL_EXPIRY_STEP
+        return self._signed_url("GET", key, expires, {"filename": filename or ""})
+
+    def presigned_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_bytes: int,
+        expires_in: int = URL_TTL_SECONDS
+    ) -> Optional[dict]:
+        expires = int(time.time()) + expires_in
+        url = self._signed_url("PUT", key, expires, {"content_type": content_type, "max_bytes": max_bytes})
+        if url is None:
+            return None
+        return {"method": "PUT", "url": url, "fields": {}, "headers": {"Content-Type": content_type}}
+
+def client_config() -> "Config":
+    """Client settings with enough pooled connections for every part in flight, SigV4 presigning"""
+    return Config(
+        max_pool_connections=max(10, UPLOAD_MAX_WORKERS * UPLOAD_PART_CONCURRENCY),
+        signature_version="s3v4"
+    )
+
+def transfer_config(
+    file_size: Optional[int] = None,
+    multipart_threshold: Optional[int] = None,
+    multipart_chunksize: Optional[int] = None
+) -> "TransferConfig":
+    """Transfer settings for one file; parts grow so the upload stays under the S3 part limit"""
+    chunksize = multipart_chunksize or MULTIPART_CHUNK_SIZE
+    if file_size:
+        chunksize = max(chunksize, -(-file_size // S3_MAX_PARTS))
+    return TransferConfig(
+        multipart_threshold=multipart_threshold or MULTIPART_THRESHOLD,
+        multipart_chunksize=chunksize,
+        max_concurrency=UPLOAD_PART_CONCURRENCY,
+        use_threads=True
+    )
+
+class S3Storage(ArtifactStorage):
+    """Artifacts as objects in an S3-compatible bucket"""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client=None,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        multipart_threshold: Optional[int] = None,
+        multipart_chunksize: Optional[int] = None
+    ):
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise RuntimeError("boto3 is required for S3 storage")
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=client_config())
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _transfer_config(self, file_size: Optional[int] = None) -> "TransferConfig":
+        return transfer_config(file_size, self.multipart_threshold, self.multipart_chunksize)
+
+    def put_stream(self, key: str, source: Source, content_type: Optional[str] = None) -> ArtifactInfo:
+        fileobj = source if hasattr(source, "read") else _ChunkReader(iter_chunks(source, self.chunk_size))
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            self._key(key),
+            ExtraArgs={"ContentType": content_type or content_type_for(key)},
+            Config=self._transfer_config()
+        )
+        return self.stat(key)
+
+    def put_file(self, key: Optional[str], path: str, content_type: Optional[str] = None) -> ArtifactInfo:
+        if key is None:
+            return super().put_file(key, path, content_type)
+        self.client.upload_file(
+            path,
+            self.bucket,
+            self._key(key),
+            ExtraArgs={"ContentType": content_type or content_type_for(path)},
+            Config=self._transfer_config(os.path.getsize(path))
+        )
+        return self.stat(key)
+
+    def get_stream(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        kwargs = {}
+        if start or length is not None:
+            end = "" if length is None else str(start + length - 1)
+            kwargs["Range"] = f"bytes={start}-{end}"
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(key), **kwargs)["Body"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        try:
+            yield from body.iter_chunks(self.chunk_size)
+        finally:
+            body.close()
+
+    def stat(self, key: str) -> ArtifactInfo:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        return ArtifactInfo(
+            key=key,
+            size=head["ContentLength"],
+            etag=head["ETag"],
+            content_type=head.get("ContentType") or content_type_for(key),
+            modified=head["LastModified"].timestamp()
+        )
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def url(self, key: str) -> Optional[str]:
+        return f"https://{self.bucket}.s3.amazonaws.com/{self._key(key)}"
+
+    def presigned_url(self, key: str, expires_in: int = URL_TTL_SECONDS, filename: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+    def presigned_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_bytes: int,
+        expires_in: int = URL_TTL_SECONDS
+    ) -> Optional[dict]:
+        # A POST policy (unlike a presigned PUT) lets S3 enforce the size limit
+        post = self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=self._key(key),
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_bytes]],
+            ExpiresIn=expires_in
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"], "headers": {}}
+
+def create_storage(
+    backend: str = "local",
+    root: str = "outputs",
+    bucket: Optional[str] = None,
+    prefix: str = "",
+    endpoint_url: Optional[str] = None,
+    region: Optional[str] = None,
+    **options
+) -> ArtifactStorage:
+    """
+    Create a storage backend
+
+    Args:
+        backend: "local" or "s3"
+        root: Root directory for local storage
+        bucket / prefix / endpoint_url / region: S3 settings
+        options: Extra backend arguments (e.g. an S3 ``client``, or the
+            ``base_url`` / ``signing_key`` for signed local URLs)
+    """
+    if backend == "local":
+        return LocalStorage(root, **options)
+    if backend == "s3":
+        if not bucket:
+            raise ValueError("S3 storage needs a bucket")
+        return S3Storage(bucket, prefix=prefix, endpoint_url=endpoint_url, region=region, **options)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def storage_from_env() -> ArtifactStorage:
+    """
+    Storage configured by environment variables, the same ones the API reads
+
+    STORAGE_BACKEND (defaults to "s3" when S3_BUCKET is set, else "local"),
+    OUTPUT_DIR, S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION;
+    ARTIFACT_BASE_URL and ARTIFACT_SIGNING_KEY (else JWT_SECRET_KEY) sign
+    local download / upload URLs.
+    """
+    bucket = os.environ.get("S3_BUCKET")
+    backend = os.environ.get("STORAGE_BACKEND") or ("s3" if bucket else "local")
+    options = {}
+    if backend == "local":
+        options = {
+            "base_url": os.environ.get("ARTIFACT_BASE_URL"),
+            "signing_key": usable_secret(os.environ.get("ARTIFACT_SIGNING_KEY"), os.environ.get("JWT_SECRET_KEY")),
+        }
+    return create_storage(
+        backend,
+        root=os.environ.get("OUTPUT_DIR", "./outputs"),
+        bucket=bucket,
+        prefix=os.environ.get("S3_PREFIX", ""),
+        endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+        region=os.environ.get("S3_REGION"),
+        **options
+    )
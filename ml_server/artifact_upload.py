@@ -0,0 +1,69 @@
+"""
+Concurrent artifact uploads
+
+All artifacts of a job are stored in parallel from a bounded thread pool;
+on S3 large files additionally use multipart uploads with tuned part sizes
+(see ``artifact_storage.S3Storage``).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from artifact_storage import UPLOAD_MAX_WORKERS, ArtifactStorage
+
+def upload_file(storage: ArtifactStorage, file_path: str, key: Optional[str]) -> Dict[str, Any]:
+    """
+    Store one file and time it
+
+    Returns:
+        Dict with key, url (presigned when the backend can sign), bytes and seconds
+    """
+    start = time.perf_counter()
+    info = storage.put_file(key, file_path)
+    return {
+        "key": info.key,
+        "url": storage.presigned_url(info.key) or storage.url(info.key),
+        "bytes": info.size,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def upload_artifacts(
+    storage: ArtifactStorage,
+    files: Dict[str, str],
+    prefix: str,
+    max_workers: Optional[int] = None,
+    content_hash: bool = False
+) -> Dict[str, Any]:
+    """
+    Upload several artifacts concurrently
+
+    Args:
+        storage: Target storage backend (S3 clients are thread-safe)
+        files: Mapping of artifact name to local path; the key is ``{prefix}/{name}``
+        prefix: Key prefix, e.g. ``generations/{task_id}``
+        max_workers: Files uploaded at once (default $S3_UPLOAD_MAX_WORKERS)
+        content_hash: Store under content-hash keys instead of ``{prefix}/{name}``
+
+    Returns:
+        Dict with per-artifact results under "files" (or an "error" entry)
+        and the total wall time under "seconds"
+    """
+    def upload(name: str) -> Dict[str, Any]:
+        key = None if content_hash else f"{prefix}/{name}"
+        try:
+            return upload_file(storage, files[name], key)
+        except Exception as e:
+            return {"key": key, "error": str(e)}
+
+    start = time.perf_counter()
+    results = {}
+    if files:
+        workers = max(1, min(max_workers or UPLOAD_MAX_WORKERS, len(files)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact-upload") as pool:
+            results = dict(zip(files, pool.map(upload, files)))
+
+    return {
+        "files": results,
+        "bytes": sum(result.get("bytes", 0) for result in results.values()),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
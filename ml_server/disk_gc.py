@@ -0,0 +1,194 @@
+"""
+Disk-budgeted artifact garbage collection
+
+Keeps a local artifact directory under a byte budget and a TTL by evicting
+whole artifact groups (every file of one task: LODs, encoded variants,
+input image) in least-recently-accessed order, and removes temp files
+orphaned by crashed writers. Directories are walked with ``os.scandir`` in
+batches that yield the GIL in between, so a sweep running in a worker thread
+never starves the event loop.
+
+Shared by the RunPod worker and the API (imported as ``ml_server.disk_gc``),
+so this module must not import other worker modules.
+"""
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+TEMP_PREFIX = "trellis-"  # Worker scratch files and job directories
+PARTIAL_PREFIX = ".tmp-"  # In-flight atomic writes of LocalStorage
+SCAN_BATCH = 512  # Directory entries handled between GIL yields
+ACCESS_RESOLUTION = 3600.0  # Access times are only refreshed when older than this
+
+class FileEntry(NamedTuple):
+    """One scanned file"""
+    path: str
+    name: str
+    size: int
+    accessed: float  # max(atime, mtime): last download or write
+
+def scan_files(root: str, batch_size: int = SCAN_BATCH) -> Iterator[FileEntry]:
+    """
+    Walk a directory tree with os.scandir
+
+    Yields every regular file below root; symlinks are not followed.
+    """
+    pending = [root]
+    seen = 0
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    seen += 1
+                    if seen % batch_size == 0:
+                        time.sleep(0)  # Let the event loop thread run
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            yield FileEntry(entry.path, entry.name, st.st_size, max(st.st_atime, st.st_mtime))
+                    except FileNotFoundError:
+                        continue  # Removed while scanning
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+def artifact_group(name: str) -> str:
+    """
+    Group key of an artifact file name: the task id
+
+    ``{id}.glb``, ``{id}_lod1.glb``, ``{id}.ply.zst`` and ``{id}_input.png``
+    all belong to ``{id}``.
+    """
+    return name.split(".", 1)[0].split("_", 1)[0]
+
+def touch_access(path: str, now: Optional[float] = None):
+    """
+    Record a read of an artifact for LRU eviction
+
+    Only the access time is set (mtime, and with it the ETag, is kept), and
+    only when the stored one is more than ACCESS_RESOLUTION old, so hot
+    files do not cost a metadata write per request.
+    """
+    now = now or time.time()
+    try:
+        st = os.stat(path)
+        if now - st.st_atime > ACCESS_RESOLUTION:
+            os.utime(path, ns=(int(now * 1e9), st.st_mtime_ns))
+    except OSError:
+        pass
+
+def _remove(path: str) -> int:
+    """Delete a file or directory tree, returns the bytes freed"""
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            size = sum(entry.size for entry in scan_files(path))
+            shutil.rmtree(path, ignore_errors=True)
+            return size
+        size = os.path.getsize(path)
+        os.unlink(path)
+        return size
+    except FileNotFoundError:
+        return 0
+
+def sweep_orphans(directory: str, prefix: str = TEMP_PREFIX, min_age: float = 3600.0) -> Dict[str, int]:
+    """
+    Remove leftover temp files / scratch directories of crashed jobs
+
+    Args:
+        directory: Directory holding the temp entries (e.g. tempfile.gettempdir())
+        prefix: Name prefix that marks entries as ours
+        min_age: Entries modified more recently are assumed to be in use
+
+    Returns:
+        Dict with removed entry count and bytes freed
+    """
+    cutoff = time.time() - min_age
+    removed = freed = 0
+    try:
+        with os.scandir(directory) as entries:
+            candidates = [
+                entry.path for entry in entries
+                if entry.name.startswith(prefix) and entry.stat(follow_symlinks=False).st_mtime < cutoff
+            ]
+    except FileNotFoundError:
+        candidates = []
+
+    for path in candidates:
+        freed += _remove(path)
+        removed += 1
+    return {"removed": removed, "bytes_freed": freed}
+
+class DiskSweeper:
+    """Keeps an artifact directory under a byte budget and a TTL"""
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        min_age: float = 600.0,
+        group: Callable[[str], str] = artifact_group
+    ):
+        """
+        Args:
+            root: Artifact directory (LocalStorage root)
+            max_bytes: Disk budget, least recently accessed groups go first (None: unlimited)
+            ttl_seconds: Evict groups not accessed for this long (None: keep)
+            min_age: Never evict groups written or read more recently (running tasks)
+            group: Maps a file name to its eviction group
+        """
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.min_age = min_age
+        self.group = group
+
+    def sweep(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run one collection pass (blocking, call from a thread)
+
+        Returns:
+            Stats dict: bytes before/after, evicted groups, orphans removed, seconds
+        """
+        start = time.perf_counter()
+        now = now or time.time()
+        groups: Dict[str, List[FileEntry]] = {}
+        orphans = []
+        for entry in scan_files(self.root):
+            if entry.name.startswith(PARTIAL_PREFIX):
+                if now - entry.accessed > self.min_age:
+                    orphans.append(entry)
+                continue
+            groups.setdefault(self.group(entry.name), []).append(entry)
+
+        total = sum(entry.size for files in groups.values() for entry in files)
+        bytes_before = total + sum(entry.size for entry in orphans)
+        orphans_freed = sum(_remove(entry.path) for entry in orphans)
+
+        # Least recently accessed first; a group counts as accessed when any of its files was
+        order = sorted(groups.items(), key=lambda item: max(entry.accessed for entry in item[1]))
+        evicted = 0
+        for _, files in order:
+            accessed = max(entry.accessed for entry in files)
+            if now - accessed < self.min_age:
+                break
+            expired = self.ttl_seconds is not None and now - accessed > self.ttl_seconds
+            over_budget = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or over_budget):
+                break
+            for entry in files:
+                total -= _remove(entry.path)
+            evicted += 1
+
+        return {
+            "bytes_before": bytes_before,
+            "bytes_after": total,
+            "groups": len(groups),
+            "groups_evicted": evicted,
+            "orphans_removed": len(orphans),
+            "orphan_bytes_freed": orphans_freed,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
@@ -0,0 +1,165 @@
+"""
+Zero-copy GLB inspector
+
+Reads the GLB header and JSON chunk straight from a memoryview or mmap and
+derives model statistics (vertex / face counts, world-space bounds, sizes)
+from accessor metadata only; buffers are never touched or decoded. Pure
+standard library, so the API side can use it without NumPy.
+"""
+import json
+import mmap
+import os
+import struct
+from itertools import product
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    from glb_io import CHUNK_JSON, GLB_MAGIC
+except ImportError:  # Imported from the API as a package module
+    from ml_server.glb_io import CHUNK_JSON, GLB_MAGIC
+
+# Divisors for normalized integer accessors (glTF 2.0 spec, 3.11)
+NORMALIZED_DIVISORS = {5120: 127.0, 5121: 255.0, 5122: 32767.0, 5123: 65535.0}
+
+TRIANGLES, TRIANGLE_STRIP, TRIANGLE_FAN = 4, 5, 6
+
+def read_glb_json(view: memoryview) -> Dict[str, Any]:
+    """Parse the JSON chunk of a GLB held in a memoryview (only the JSON bytes are copied)"""
+    if len(view) < 20:
+        raise ValueError("Not a GLB file")
+    magic, _, _ = struct.unpack_from("<III", view, 0)
+    json_length, json_type = struct.unpack_from("<II", view, 12)
+    if magic != GLB_MAGIC or json_type != CHUNK_JSON:
+        raise ValueError("Not a GLB file")
+    return json.loads(bytes(view[20:20 + json_length]))
+
+Matrix = List[List[float]]
+
+IDENTITY: Matrix = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+def _matmul(a: Matrix, b: Matrix) -> Matrix:
+    return [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+
+def _node_matrix(node: Dict[str, Any]) -> Matrix:
+    """Local transform of a node as a row-major 4x4 matrix"""
+    if "matrix" in node:
+        m = node["matrix"]  # column-major
+        return [[float(m[col * 4 + row]) for col in range(4)] for row in range(4)]
+
+    x, y, z, w = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    sx, sy, sz = node.get("scale", [1.0, 1.0, 1.0])
+    tx, ty, tz = node.get("translation", [0.0, 0.0, 0.0])
+    return [
+        [(1 - 2 * (y * y + z * z)) * sx, 2 * (x * y - z * w) * sy, 2 * (x * z + y * w) * sz, tx],
+        [2 * (x * y + z * w) * sx, (1 - 2 * (x * x + z * z)) * sy, 2 * (y * z - x * w) * sz, ty],
+        [2 * (x * z - y * w) * sx, 2 * (y * z + x * w) * sy, (1 - 2 * (x * x + y * y)) * sz, tz],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+
+def _accessor_bounds(accessor: Dict[str, Any]) -> Optional[List[List[float]]]:
+    """[min, max] of a POSITION accessor, dequantized if normalized"""
+    if "min" not in accessor or "max" not in accessor:
+        return None
+    bounds = [list(map(float, accessor["min"][:3])), list(map(float, accessor["max"][:3]))]
+    if accessor.get("normalized"):
+        divisor = NORMALIZED_DIVISORS.get(accessor.get("componentType"), 1.0)
+        bounds = [[max(value / divisor, -1.0) for value in bound] for bound in bounds]
+    return bounds
+
+def _primitive_faces(primitive: Dict[str, Any], accessors: list) -> int:
+    index = primitive.get("indices")
+    count = accessors[index]["count"] if index is not None else accessors[primitive["attributes"]["POSITION"]]["count"]
+    mode = primitive.get("mode", TRIANGLES)
+    if mode == TRIANGLES:
+        return count // 3
+    if mode in (TRIANGLE_STRIP, TRIANGLE_FAN):
+        return max(count - 2, 0)
+    return 0
+
+def gltf_stats(gltf: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Model statistics from a glTF JSON document
+
+    Counts are summed over every mesh instance of the default scene and
+    bounds are transformed to world space through the node hierarchy (the
+    accessor box is transformed, so bounds of rotated instances are conservative).
+    """
+    accessors = gltf.get("accessors", [])
+    meshes = gltf.get("meshes", [])
+    nodes = gltf.get("nodes", [])
+
+    # (mesh index, world matrix) for each instance in the scene
+    instances = []
+    scenes = gltf.get("scenes", [])
+    if scenes:
+        stack = [(root, IDENTITY) for root in scenes[gltf.get("scene", 0)].get("nodes", [])]
+        while stack:
+            node_index, parent = stack.pop()
+            node = nodes[node_index]
+            world = _matmul(parent, _node_matrix(node))
+            if "mesh" in node:
+                instances.append((node["mesh"], world))
+            stack.extend((child, world) for child in node.get("children", []))
+    else:
+        instances = [(index, IDENTITY) for index in range(len(meshes))]
+
+    vertex_count = face_count = primitive_count = 0
+    lo = [float("inf")] * 3
+    hi = [float("-inf")] * 3
+    for mesh_index, world in instances:
+        for primitive in meshes[mesh_index].get("primitives", []):
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None:
+                continue
+            primitive_count += 1
+            vertex_count += accessors[position]["count"]
+            face_count += _primitive_faces(primitive, accessors)
+
+            bounds = _accessor_bounds(accessors[position])
+            if bounds is None:
+                continue
+            for corner in product(*zip(*bounds)):
+                for axis in range(3):
+                    row = world[axis]
+                    value = row[0] * corner[0] + row[1] * corner[1] + row[2] * corner[2] + row[3]
+                    lo[axis] = min(lo[axis], value)
+                    hi[axis] = max(hi[axis], value)
+
+    has_bounds = primitive_count > 0 and lo[0] != float("inf")
+    return {
+        "vertex_count": vertex_count,
+        "face_count": face_count,
+        "mesh_count": len(meshes),
+        "primitive_count": primitive_count,
+        "texture_count": len(gltf.get("images", [])),
+        "bbox_min": lo if has_bounds else None,
+        "bbox_max": hi if has_bounds else None,
+        "extensions": gltf.get("extensionsUsed", []),
+        "generator": gltf.get("asset", {}).get("generator"),
+    }
+
+def inspect_glb(source: Union[str, os.PathLike, bytes, bytearray, memoryview]) -> Dict[str, Any]:
+    """
+    Inspect a GLB file without loading its buffers
+
+    Args:
+        source: File path (memory-mapped) or GLB contents
+
+    Returns:
+        Dict with vertex_count, face_count, mesh_count, primitive_count,
+        texture_count, bbox_min, bbox_max, extensions, generator and file_size
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    gltf = read_glb_json(view)
+                    file_size = len(view)
+    else:
+        with memoryview(source) as view:
+            gltf = read_glb_json(view)
+            file_size = len(view)
+
+    stats = gltf_stats(gltf)
+    stats["file_size"] = file_size
+    return stats
@@ -0,0 +1,79 @@
+"""
+GLB container helpers: pack/unpack the JSON and BIN chunks of binary glTF
+"""
+import json
+import struct
+from typing import Any, Dict, List, Tuple, Union
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A  # "JSON"
+CHUNK_BIN = 0x004E4942  # "BIN\0"
+
+def _pad(data: bytes, fill: bytes) -> bytes:
+    """Pad chunk data to a 4-byte boundary"""
+    return data + fill * (-len(data) % 4)
+
+def pack_glb(gltf: Dict[str, Any], binary: bytes = b"") -> bytes:
+    """Serialize a glTF JSON document and its binary buffer into a GLB file"""
+    json_chunk = _pad(json.dumps(gltf, separators=(",", ":")).encode("utf-8"), b" ")
+    bin_chunk = _pad(bytes(binary), b"\0") if binary else b""
+
+    total = 12 + 8 + len(json_chunk) + (8 + len(bin_chunk) if bin_chunk else 0)
+    parts = [
+        struct.pack("<III", GLB_MAGIC, GLB_VERSION, total),
+        struct.pack("<II", len(json_chunk), CHUNK_JSON),
+        json_chunk,
+    ]
+    if bin_chunk:
+        parts += [struct.pack("<II", len(bin_chunk), CHUNK_BIN), bin_chunk]
+    return b"".join(parts)
+
+def unpack_glb(data: Union[bytes, memoryview]) -> Tuple[Dict[str, Any], memoryview]:
+    """
+    Split a GLB file into its JSON document and BIN chunk
+
+    The BIN chunk is returned as a memoryview into ``data``, nothing is copied.
+    """
+    view = memoryview(data)
+    magic, version, length = struct.unpack_from("<III", view, 0)
+    if magic != GLB_MAGIC:
+        raise ValueError("Not a GLB file")
+    if version != GLB_VERSION:
+        raise ValueError(f"Unsupported GLB version: {version}")
+
+    json_length, json_type = struct.unpack_from("<II", view, 12)
+    if json_type != CHUNK_JSON:
+        raise ValueError("GLB JSON chunk missing")
+    gltf = json.loads(bytes(view[20:20 + json_length]))
+
+    binary = view[0:0]
+    offset = 20 + json_length
+    if offset + 8 <= min(length, len(view)):
+        bin_length, bin_type = struct.unpack_from("<II", view, offset)
+        if bin_type == CHUNK_BIN:
+            binary = view[offset + 8:offset + 8 + bin_length]
+
+    return gltf, binary
+
+class BufferBuilder:
+    """Accumulate aligned bufferView payloads for the GLB BIN chunk"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.length = 0
+
+    def append(self, data: bytes, alignment: int = 4) -> Tuple[int, int]:
+        """Append data and return its (byteOffset, byteLength)"""
+        padding = -self.length % alignment
+        if padding:
+            self.parts.append(b"\0" * padding)
+            self.length += padding
+
+        offset = self.length
+        self.parts.append(bytes(data))
+        self.length += len(data)
+        return offset, len(data)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
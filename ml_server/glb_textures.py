@@ -0,0 +1,166 @@
+"""
+Texture re-encoding for GLB files
+
+Re-encodes embedded images (typically the baked PNG from ``to_glb``) as JPEG
+or WebP, optionally downscaling them, and rewrites the BIN chunk and
+bufferViews in place. Geometry is copied byte-for-byte; the scene is never
+reloaded.
+"""
+import io
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from PIL import Image
+
+from glb_io import BufferBuilder, pack_glb, unpack_glb
+
+TEXTURE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+WEBP_EXTENSION = "EXT_texture_webp"
+
+def _encode_image(image: Image.Image, texture_format: str, quality: int) -> bytes:
+    pil_format, _ = TEXTURE_FORMATS[texture_format]
+    buffer = io.BytesIO()
+    if pil_format == "JPEG":
+        image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    elif pil_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def _has_alpha(image: Image.Image) -> bool:
+    """True if the image carries a non-opaque alpha channel"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        alpha = np.asarray(image.convert("RGBA"))[..., 3]
+        return bool((alpha < 255).any())
+    return False
+
+def _reencode(
+    data: memoryview,
+    texture_format: str,
+    quality: int,
+    max_size: Optional[int]
+) -> Tuple[Optional[bytes], str, Dict[str, Any]]:
+    """
+    Re-encode one embedded image
+
+    Returns:
+        Tuple of (new bytes or None to keep the original, format used, per-image stats)
+    """
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    info = {"width": image.width, "height": image.height, "bytes_before": len(data)}
+
+    resized = False
+    if max_size and max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        resized = True
+
+    # JPEG has no alpha channel: keep translucent textures lossless
+    if texture_format == "jpeg" and _has_alpha(image):
+        texture_format = "png"
+
+    encoded = _encode_image(image, texture_format, quality)
+    if not resized and len(encoded) >= len(data):
+        info.update(bytes_after=len(data), format="original")
+        return None, texture_format, info
+
+    info.update(width=image.width, height=image.height, bytes_after=len(encoded), format=texture_format)
+    return encoded, texture_format, info
+
+def reencode_glb_textures(
+    glb: Union[bytes, memoryview],
+    texture_format: str = "jpeg",
+    quality: int = 85,
+    max_size: Optional[int] = None
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Re-encode the images embedded in a GLB file
+
+    Args:
+        glb: GLB file contents
+        texture_format: "jpeg", "webp" (adds EXT_texture_webp) or "png"
+        quality: Encoder quality for lossy formats (1-100)
+        max_size: Optional maximum texture edge, e.g. 512 or 256
+
+    Returns:
+        Tuple of (new GLB bytes, stats with per-image and total sizes)
+    """
+    if texture_format not in TEXTURE_FORMATS:
+        raise ValueError(f"Unsupported texture format: {texture_format}")
+
+    gltf, binary = unpack_glb(glb)
+    buffer_views = gltf.get("bufferViews", [])
+    images = gltf.get("images", [])
+
+    # Re-encode images stored in the BIN chunk, keyed by their bufferView
+    replacements: Dict[int, bytes] = {}
+    image_stats: List[Dict[str, Any]] = []
+    webp_images = set()
+    for index, image in enumerate(images):
+        view_index = image.get("bufferView")
+        if view_index is None or buffer_views[view_index].get("buffer", 0) != 0:
+            continue
+        view = buffer_views[view_index]
+        offset = view.get("byteOffset", 0)
+        data = binary[offset:offset + view["byteLength"]]
+
+        encoded, used_format, info = _reencode(data, texture_format, quality, max_size)
+        image_stats.append(dict(info, image=index))
+        if encoded is None:
+            continue
+        replacements[view_index] = encoded
+        image["mimeType"] = TEXTURE_FORMATS[used_format][1]
+        if used_format == "webp":
+            webp_images.add(index)
+
+    if not replacements:
+        return bytes(glb), _summarize(len(glb), len(glb), image_stats)
+
+    # Rebuild the BIN chunk: every range of buffer 0 is copied (or replaced) in original order
+    ranges = []
+    for view_index, view in enumerate(buffer_views):
+        if view.get("buffer", 0) == 0:
+            ranges.append((view, view_index))
+        meshopt = view.get("extensions", {}).get("EXT_meshopt_compression")
+        if meshopt is not None and meshopt.get("buffer", 0) == 0:
+            ranges.append((meshopt, None))
+
+    builder = BufferBuilder()
+    for target, view_index in sorted(ranges, key=lambda item: item[0].get("byteOffset", 0)):
+        if view_index in replacements:
+            data = replacements[view_index]
+        else:
+            offset = target.get("byteOffset", 0)
+            data = binary[offset:offset + target["byteLength"]]
+        target["byteOffset"], target["byteLength"] = builder.append(data)
+
+    if gltf.get("buffers"):
+        gltf["buffers"][0]["byteLength"] = builder.length
+
+    if webp_images:
+        _use_webp_extension(gltf, webp_images)
+
+    output = pack_glb(gltf, builder.getvalue())
+    return output, _summarize(len(glb), len(output), image_stats)
+
+def _use_webp_extension(gltf: Dict[str, Any], webp_images: set):
+    """Point textures at WebP images through EXT_texture_webp"""
+    for texture in gltf.get("textures", []):
+        if texture.get("source") in webp_images:
+            texture.setdefault("extensions", {})[WEBP_EXTENSION] = {"source": texture.pop("source")}
+    for key in ("extensionsUsed", "extensionsRequired"):
+        extensions = gltf.setdefault(key, [])
+        if WEBP_EXTENSION not in extensions:
+            extensions.append(WEBP_EXTENSION)
+
+def _summarize(size_before: int, size_after: int, images: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "bytes_before": size_before,
+        "bytes_after": size_after,
+        "reduction": round(1.0 - size_after / size_before, 4) if size_before else 0.0,
+        "images": images,
+    }
@@ -3,8 +3,8 @@ RunPod Handler for TRELLIS 3D Generation
 Version: 2.0 - Fixed image_data support + easydict dependency
 """
 import os
-import json
 import base64
+import shutil
 import tempfile
 import traceback
 from io import BytesIO
@@ -12,40 +12,30 @@ from typing import Dict, Any
 import runpod
 import requests
 from PIL import Image
-try:
-    import boto3
-    S3_AVAILABLE = True
-except ImportError:
-    print("⚠️ boto3 не установлен, S3 загрузка недоступна")
-    S3_AVAILABLE = False
 
 from trellis_worker import TrellisWorker
+from artifact_storage import storage_from_env
+from artifact_upload import upload_artifacts
+from disk_gc import TEMP_PREFIX, sweep_orphans
+from job_control import JobCancelled, JobControl, JobStopped
+from json_codec import dumps
 
 # Initialize TRELLIS worker
 trellis_worker = TrellisWorker()
 
-# AWS S3 client (optional)
-s3_client = None
-if S3_AVAILABLE:
-    try:
-        s3_client = boto3.client('s3')
-        print("✅ S3 client initialized")
-    except Exception as e:
-        print(f"⚠️ S3 client not available: {e}")
-else:
-    print("⚠️ S3 не доступен - boto3 не установлен")
+# Remove scratch directories of jobs that crashed in a previous run
+orphans = sweep_orphans(tempfile.gettempdir(), min_age=float(os.environ.get("TEMP_ORPHAN_MIN_AGE_SECONDS", "3600")))
+if orphans["removed"]:
+    print(f"🧹 Removed {orphans['removed']} orphaned temp entries ({orphans['bytes_freed']} bytes)")
 
-def upload_to_s3(file_path: str, bucket: str, key: str) -> str:
-    """Upload file to S3 and return public URL"""
-    if not s3_client:
-        return None
-    
+# Artifact storage (optional): S3 when S3_BUCKET is set, or STORAGE_BACKEND=local|s3
+artifact_storage = None
+if os.environ.get("STORAGE_BACKEND") or os.environ.get("S3_BUCKET"):
     try:
-        s3_client.upload_file(file_path, bucket, key)
-        return f"https://{bucket}.s3.amazonaws.com/{key}"
+        artifact_storage = storage_from_env()
+        print(f"✅ Artifact storage initialized: {type(artifact_storage).__name__}")
     except Exception as e:
-        print(f"S3 upload failed: {e}")
-        return None
+        print(f"⚠️ Artifact storage not available: {e}")
 
 def notify_webhook(webhook_url: str, task_id: str, status: str, result: Dict = None):
     """Notify Railway API about task completion"""
@@ -61,7 +51,8 @@ def notify_webhook(webhook_url: str, task_id: str, status: str, result: Dict = N
         
         response = requests.post(
             webhook_url,
-            json=payload,
+            data=dumps(payload),
+            headers={"Content-Type": "application/json"},
             timeout=30
         )
         print(f"✅ Webhook notification sent: {response.status_code}")
@@ -76,8 +67,9 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
     Expected input:
     {
         "input": {
-            "image_url": "https://...",
+            "image_url": "https://...",    # or "image_data" (base64), or "image_key" (artifact storage)
             "task_id": "uuid",
+            "deadline": 1714564800.0,      # Unix time; the job is abandoned after it
             "webhook_url": "https://railway.../webhook",
             "parameters": {
                 "seed": 42,
@@ -87,46 +79,68 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
         }
     }
     """
+    job_dir = None
     try:
         job_input = job.get("input", {})
         
         # Extract parameters
         image_url = job_input.get("image_url")
         image_data = job_input.get("image_data")
+        image_key = job_input.get("image_key")
         image_format = job_input.get("image_format", "png")
         task_id = job_input.get("task_id", "unknown")
         webhook_url = job_input.get("webhook_url")
         parameters = job_input.get("parameters", {})
         
-        # Validate input - нужен либо image_url, либо image_data
-        if not image_url and not image_data:
+        # Validate input - нужен image_url, image_data или image_key
+        if not image_url and not image_data and not image_key:
+            return {
+                "status": "failed",
+                "error": "Either image_url, image_data or image_key is required",
+                "task_id": task_id
+            }
+        if image_key and not artifact_storage:
             return {
                 "status": "failed",
-                "error": "Either image_url or image_data is required",
+                "error": "image_key needs artifact storage (STORAGE_BACKEND / S3_BUCKET)",
                 "task_id": task_id
             }
         
         print(f"🚀 Starting 3D generation for task: {task_id}")
-        if image_url:
+        if image_key:
+            print(f"📷 Image key: {image_key}")
+        elif image_url:
             print(f"📷 Image URL: {image_url}")
         else:
             print(f"📷 Image data: base64 ({len(image_data)} chars)")
         
-        # Load and save image from URL or base64 data
-        if image_url:
-            print("📥 Downloading input image...")
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            image_content = response.content
+        # Cancellation (DELETE /api/v1/task/{id}) and the deadline are checked between
+        # stages; a job that waited in the RunPod queue past its deadline stops here
+        control = JobControl(task_id, artifact_storage, deadline=job_input.get("deadline"))
+        control.check("image download")
+        
+        # Save to the job scratch directory (removed when the job ends, even on failure)
+        job_dir = tempfile.mkdtemp(prefix=TEMP_PREFIX)
+        if image_key:
+            file_extension = os.path.splitext(image_key)[1] or '.jpg'
         else:
-            print("📥 Decoding base64 image...")
-            image_content = base64.b64decode(image_data)
+            file_extension = f'.{image_format}' if image_data else '.jpg'
+        input_image_path = os.path.join(job_dir, f"input{file_extension}")
         
-        # Save to temporary file
-        file_extension = f'.{image_format}' if image_data else '.jpg'
-        with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as tmp_file:
-            tmp_file.write(image_content)
-            input_image_path = tmp_file.name
+        # Load and save image from storage, URL or base64 data
+        with open(input_image_path, 'wb') as tmp_file:
+            if image_key:
+                print("📥 Fetching input image from storage...")
+                for chunk in artifact_storage.get_stream(image_key):
+                    tmp_file.write(chunk)
+            elif image_url:
+                print("📥 Downloading input image...")
+                response = requests.get(image_url, timeout=30)
+                response.raise_for_status()
+                tmp_file.write(response.content)
+            else:
+                print("📥 Decoding base64 image...")
+                tmp_file.write(base64.b64decode(image_data))
         
         print(f"✅ Image saved: {input_image_path}")
         
@@ -134,32 +148,53 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
         print("🧠 Generating 3D model with TRELLIS...")
         result = trellis_worker.generate_3d(
             image_path=input_image_path,
+            output_dir=job_dir,
+            control=control,
             **parameters
         )
         
         print(f"✅ 3D generation completed!")
         print(f"📊 Result: {list(result.keys())}")
         
-        # Upload results to S3 (if configured)
-        s3_bucket = os.environ.get("S3_BUCKET")
-        if s3_bucket and s3_client:
-            print("☁️ Uploading to S3...")
+        # Upload results to artifact storage (if configured)
+        control.check("upload")
+        if artifact_storage:
+            print("☁️ Uploading artifacts...")
+            
+            files = {
+                file_type: file_path for file_type, file_path in result.items()
+                if isinstance(file_path, str) and os.path.exists(file_path)
+            }
+            uploads = upload_artifacts(
+                artifact_storage,
+                files,
+                prefix=f"generations/{task_id}",
+                content_hash=os.environ.get("STORAGE_CONTENT_HASH_KEYS", "false").lower() == "true"
+            )
             
-            for file_type, file_path in result.items():
-                if file_path and os.path.exists(file_path):
-                    s3_key = f"generations/{task_id}/{file_type}"
-                    s3_url = upload_to_s3(file_path, s3_bucket, s3_key)
-                    if s3_url:
-                        result[f"{file_type}_url"] = s3_url
+            upload_timings = {}
+            for file_type, upload in uploads["files"].items():
+                if "error" in upload:
+                    print(f"Upload failed for {file_type}: {upload['error']}")
+                    continue
+                result[f"{file_type}_key"] = upload["key"]
+                if upload["url"]:
+                    result[f"{file_type}_url"] = upload["url"]
+                upload_timings[file_type] = upload["seconds"]
+                print(f"☁️ {file_type}: {upload['bytes']} bytes in {upload['seconds']}s")
+            result["upload_timings"] = dict(upload_timings, total=uploads["seconds"])
+            print(f"✅ Uploaded {uploads['bytes']} bytes in {uploads['seconds']}s")
         
         # Notify Railway webhook
         if webhook_url:
             notify_webhook(webhook_url, task_id, "completed", result)
         
-        # Convert files to base64 for download
+        # Convert files to base64 for download; stored artifacts are fetched
+        # through their presigned URLs instead, unless INLINE_ARTIFACTS=true
+        inline_all = os.environ.get("INLINE_ARTIFACTS", "false").lower() == "true"
         result_with_data = {}
         for key, file_path in result.items():
-            if isinstance(file_path, str) and os.path.exists(file_path):
+            if isinstance(file_path, str) and os.path.exists(file_path) and (inline_all or f"{key}_url" not in result):
                 try:
                     with open(file_path, "rb") as f:
                         file_data = f.read()
@@ -173,15 +208,9 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
                 except Exception as e:
                     print(f"⚠️ Failed to encode {key}: {e}")
                     result_with_data[key] = file_path
-        
-        # Cleanup temporary files
-        try:
-            os.unlink(input_image_path)
-            for file_path in result.values():
-                if isinstance(file_path, str) and os.path.exists(file_path):
-                    os.unlink(file_path)
-        except Exception as e:
-            print(f"⚠️ Cleanup warning: {e}")
+            else:
+                # Non-file entries (stats, storage keys and URLs) are passed through as-is
+                result_with_data[key] = file_path
         
         return {
             "task_id": task_id,
@@ -189,6 +218,20 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
             "result": result_with_data
         }
         
+    except JobStopped as e:
+        print(f"🛑 {e}")
+        status = "cancelled" if isinstance(e, JobCancelled) else "failed"
+        webhook_url = job.get("input", {}).get("webhook_url")
+        if webhook_url:
+            notify_webhook(webhook_url, e.task_id, status, {"stage": e.stage, "error_code": e.error_code})
+        
+        return {
+            "task_id": e.task_id,
+            "status": status,
+            "error": str(e),
+            "error_code": e.error_code
+        }
+    
     except Exception as e:
         error_msg = str(e)
         error_trace = traceback.format_exc()
@@ -211,6 +254,10 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
             "status": "failed",
             "error": error_msg
         }
+    
+    finally:
+        if job_dir:
+            shutil.rmtree(job_dir, ignore_errors=True)
 
 if __name__ == "__main__":
     print("🚀 Starting TRELLIS RunPod Handler...")
@@ -0,0 +1,134 @@
+"""
+Cooperative job cancellation and deadlines
+
+A cancelled task leaves a small marker object in artifact storage; the job
+running it checks for the marker between pipeline stages (``check``) and
+stops early, so the GPU and scratch disk are released without waiting for
+the remaining stages. Checks are throttled, so calling ``check`` often costs
+at most one storage lookup per poll interval.
+
+Jobs also carry the absolute deadline stamped when the task was admitted
+(Unix time, GENERATION_TIMEOUT_SECONDS after admission); past it nobody is
+waiting for the result any more, so ``check`` stops the job as well.
+
+The API also records which RunPod job runs each task under ``JOB_PREFIX``,
+so a cancel request reaching any API process can find the job to stop.
+Until RunPod answers the submission the record is ``PENDING_JOB``; a cancel
+request then only leaves the marker, and the submitting process cancels the
+job as soon as its id arrives.
+
+Shared by the RunPod worker and the API (imported as ``ml_server.job_control``),
+so this module must not import other worker modules.
+"""
+import time
+from typing import Optional
+
+CANCEL_PREFIX = "control/cancelled/"
+JOB_PREFIX = "control/jobs/"
+POLL_INTERVAL = 2.0  # Seconds between marker lookups
+PENDING_JOB = ""  # Job id recorded while the submission is in flight
+
+class JobStopped(Exception):
+    """The job should not continue; raised between pipeline stages"""
+
+    reason = "stopped"
+    error_code = "stopped"
+
+    def __init__(self, task_id: str, stage: str):
+        super().__init__(f"Task {task_id} {self.reason} before {stage}")
+        self.task_id = task_id
+        self.stage = stage
+
+class JobCancelled(JobStopped):
+    """The task was cancelled"""
+
+    reason = "cancelled"
+    error_code = "cancelled"
+
+class DeadlineExceeded(JobStopped):
+    """The task's deadline passed"""
+
+    reason = "timed out"
+    error_code = "timeout"
+
+def deadline_after(timeout_seconds: float, now: Optional[float] = None) -> float:
+    """Absolute deadline (Unix time) ``timeout_seconds`` from now"""
+    return (time.time() if now is None else now) + timeout_seconds
+
+def cancel_key(task_id: str) -> str:
+    """Storage key of a task's cancellation marker"""
+    return f"{CANCEL_PREFIX}{task_id}"
+
+def request_cancel(storage, task_id: str):
+    """Leave the cancellation marker for the job running ``task_id``"""
+    storage.put_bytes(cancel_key(task_id), b"cancelled", "text/plain")
+
+def cancel_requested(storage, task_id: str) -> bool:
+    """Whether ``task_id`` has a cancellation marker"""
+    return storage.exists(cancel_key(task_id))
+
+def record_job(storage, task_id: str, job_id: str):
+    """Remember the RunPod job running ``task_id`` (visible to every API process)"""
+    storage.put_bytes(f"{JOB_PREFIX}{task_id}", job_id.encode(), "text/plain")
+
+def lookup_job(storage, task_id: str) -> Optional[str]:
+    """RunPod job running ``task_id``, ``PENDING_JOB`` while submitting, None if none is recorded"""
+    key = f"{JOB_PREFIX}{task_id}"
+    if not storage.exists(key):
+        return None
+    return storage.get_bytes(key).decode()
+
+def forget_job(storage, task_id: str):
+    """Drop the record of ``task_id``'s RunPod job once the job is over"""
+    storage.delete(f"{JOB_PREFIX}{task_id}")
+
+class JobControl:
+    """Stop checks for one job"""
+
+    def __init__(
+        self,
+        task_id: str,
+        storage=None,
+        deadline: Optional[float] = None,
+        poll_interval: float = POLL_INTERVAL
+    ):
+        """
+        Args:
+            task_id: Task the job runs
+            storage: ArtifactStorage holding cancellation markers (None: never cancelled)
+            deadline: Unix time after which the job is abandoned (None: no deadline)
+            poll_interval: Minimum seconds between marker lookups
+        """
+        self.task_id = task_id
+        self.storage = storage
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self._cancelled = False
+        self._checked_at: Optional[float] = None
+
+    def cancelled(self) -> bool:
+        """Whether the task was cancelled (sticky once seen)"""
+        if self._cancelled or self.storage is None:
+            return self._cancelled
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            try:
+                self._cancelled = cancel_requested(self.storage, self.task_id)
+            except Exception as e:
+                print(f"⚠️ Cancellation check failed: {e}")
+        return self._cancelled
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def check(self, stage: str):
+        """
+        Raises:
+            DeadlineExceeded: If the deadline passed
+            JobCancelled: If the task was cancelled
+        """
+        if self.expired():
+            raise DeadlineExceeded(self.task_id, stage)
+        if self.cancelled():
+            raise JobCancelled(self.task_id, stage)
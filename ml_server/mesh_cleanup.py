@@ -0,0 +1,181 @@
+"""
+Vectorized mesh cleanup before GLB export
+
+Welds duplicate vertices, drops degenerate / duplicate faces and tiny
+disconnected islands. Every pass is a constant number of NumPy /
+hash-table sweeps over the arrays, so the whole cleanup stays linear in the
+face count. ``vertex_normals`` recomputes normals the same way; the worker
+applies it to the exported mesh, since ``to_glb`` simplifies and
+re-parametrizes the cleaned one.
+"""
+import time
+from typing import Any, Dict, Tuple
+import numpy as np
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+KEY_BITS = 21  # Bits per axis when packing quantized coordinates into one int64
+
+def _factorize(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map int64 keys to dense labels in order of first appearance
+
+    Returns:
+        Tuple of (labels per key, index of the first occurrence of each label)
+    """
+    if PANDAS_AVAILABLE:
+        labels, _ = pd.factorize(keys)  # hash table, O(n)
+        labels = labels.astype(np.int64)
+        # Labels are numbered by first appearance, so each new label raises the running max
+        running_max = np.maximum.accumulate(labels) if len(labels) else labels
+        first = np.flatnonzero(np.diff(running_max, prepend=-1) > 0)
+        return labels, first
+
+    _, first, labels = np.unique(keys, return_index=True, return_inverse=True)
+    return labels.reshape(-1), first
+
+def _face_cross(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Unnormalized face normals (length is twice the face area)"""
+    v0 = vertices[faces[:, 0]]
+    return np.cross(vertices[faces[:, 1]] - v0, vertices[faces[:, 2]] - v0)
+
+def weld_vertices(vertices: np.ndarray, tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge vertices that fall into the same quantization cell
+
+    Args:
+        vertices: (V, 3) positions
+        tolerance: Cell size used for quantized hashing
+
+    Returns:
+        Tuple of (labels mapping each vertex to its welded vertex, source index per welded vertex)
+    """
+    lo = vertices.min(axis=0)
+    grid = np.floor((vertices - lo) / tolerance).astype(np.int64)
+    if grid.max(initial=0) >= (1 << KEY_BITS):
+        raise ValueError("Weld tolerance too small for the mesh extent")
+    keys = (grid[:, 0] << (2 * KEY_BITS)) | (grid[:, 1] << KEY_BITS) | grid[:, 2]
+    return _factorize(keys)
+
+def vertex_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Area-weighted vertex normals"""
+    cross = _face_cross(vertices, faces)
+    corners = faces.reshape(-1)
+    weights = np.repeat(cross, 3, axis=0)
+    normals = np.stack([
+        np.bincount(corners, weights=weights[:, k], minlength=len(vertices))
+        for k in range(3)
+    ], axis=1)
+    return normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+def _component_labels(num_vertices: int, faces: np.ndarray) -> np.ndarray:
+    """Connected component of every face (faces sharing a vertex are connected)"""
+    if SCIPY_AVAILABLE:
+        rows = np.concatenate([faces[:, 0], faces[:, 1]])
+        cols = np.concatenate([faces[:, 1], faces[:, 2]])
+        graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(num_vertices, num_vertices))
+        _, labels = connected_components(graph, directed=False)
+        return labels[faces[:, 0]]
+
+    # Label propagation fallback: repeat min-label sweeps until stable
+    labels = np.arange(num_vertices)
+    while True:
+        face_min = labels[faces].min(axis=1)
+        updated = labels.copy()
+        np.minimum.at(updated, faces.reshape(-1), np.repeat(face_min, 3))
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels[faces[:, 0]]
+        labels = updated
+
+def clean_mesh(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    weld_tolerance: float = 1e-6,
+    min_component_ratio: float = 0.001
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    Clean a triangle mesh for export
+
+    Args:
+        vertices: (V, 3) positions
+        faces: (F, 3) triangle indices
+        weld_tolerance: Weld distance relative to the bounding box diagonal
+        min_component_ratio: Islands with less than this fraction of the total
+            surface area are removed (the largest island is always kept)
+
+    Returns:
+        Tuple of (vertices, faces, vertex_map, stats) where
+        ``vertex_map`` gives the source vertex of every output vertex
+    """
+    start = time.perf_counter()
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    stats = {"vertices_before": len(vertices), "faces_before": len(faces)}
+
+    # 1. Weld coincident vertices via quantized hashing
+    diagonal = float(np.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0))) if len(vertices) else 0.0
+    labels, source = weld_vertices(vertices, max(weld_tolerance * diagonal, 1e-12))
+    vertices = vertices[source]
+    faces = labels[faces]
+    stats["vertices_welded"] = stats["vertices_before"] - len(vertices)
+
+    # 2. Drop faces with repeated corners or zero area
+    area = 0.5 * np.linalg.norm(_face_cross(vertices, faces), axis=1)
+    valid = (
+        (faces[:, 0] != faces[:, 1])
+        & (faces[:, 1] != faces[:, 2])
+        & (faces[:, 2] != faces[:, 0])
+        & (area > (weld_tolerance * diagonal) ** 2)
+    )
+    faces, area = faces[valid], area[valid]
+    stats["degenerate_faces_removed"] = int((~valid).sum())
+
+    # 3. Drop duplicate faces (same corners in any order)
+    sorted_faces = np.sort(faces, axis=1)
+    if len(vertices) < (1 << KEY_BITS):
+        keys = (sorted_faces[:, 0] << (2 * KEY_BITS)) | (sorted_faces[:, 1] << KEY_BITS) | sorted_faces[:, 2]
+        _, first = _factorize(keys)
+    else:
+        _, first = np.unique(sorted_faces, axis=0, return_index=True)
+    first = np.sort(first)
+    stats["duplicate_faces_removed"] = len(faces) - len(first)
+    faces, area = faces[first], area[first]
+
+    # 4. Remove islands by surface area
+    components_removed = 0
+    if len(faces):
+        face_components = _component_labels(len(vertices), faces)
+        component_area = np.bincount(face_components, weights=area)
+        keep_components = component_area >= min_component_ratio * area.sum()
+        keep_components[np.argmax(component_area)] = True
+        keep = keep_components[face_components]
+        components_removed = int(((component_area > 0) & ~keep_components).sum())
+        faces = faces[keep]
+    stats["components_removed"] = components_removed
+
+    # 5. Compact unreferenced vertices
+    used = np.zeros(len(vertices), dtype=bool)
+    used[faces.reshape(-1)] = True
+    remap = np.cumsum(used) - 1
+    vertices = vertices[used]
+    faces = remap[faces]
+    vertex_map = source[used]
+
+    stats.update(
+        vertices_after=len(vertices),
+        faces_after=len(faces),
+        seconds=round(time.perf_counter() - start, 3)
+    )
+    return vertices, faces, vertex_map, stats
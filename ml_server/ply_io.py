@@ -0,0 +1,263 @@
+"""
+Memory-mapped PLY I/O
+
+Reads binary PLY elements (Gaussian splats, point clouds) as NumPy structured
+arrays backed by ``np.memmap``, so stats, pruning and format conversion only
+page in the rows they touch. Writes binary little-endian by default, either
+from arrays or into pre-sized memory-mapped output elements filled block by
+block. List properties (mesh faces) are not supported.
+"""
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple, Union
+import numpy as np
+
+# PLY scalar types (both naming schemes) -> NumPy type codes
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+NUMPY_TYPES = {
+    "i1": "char", "u1": "uchar", "i2": "short", "u2": "ushort",
+    "i4": "int", "u4": "uint", "f4": "float", "f8": "double",
+}
+FORMATS = {
+    "binary_little_endian": "<",
+    "binary_big_endian": ">",
+    "ascii": None,
+}
+
+CHUNK_ROWS = 256 * 1024
+
+ElementSpec = Tuple[str, int, np.dtype]  # (name, count, dtype)
+
+class PlyHeader(NamedTuple):
+    """Parsed PLY header"""
+    format: str
+    elements: List[ElementSpec]
+    comments: List[str]
+    size: int  # Header length in bytes, element data starts here
+
+    def offsets(self) -> Dict[str, int]:
+        """Byte offset of each element's data (binary formats only)"""
+        offsets, offset = {}, self.size
+        for name, count, dtype in self.elements:
+            offsets[name] = offset
+            offset += count * dtype.itemsize
+        return offsets
+
+def read_header(path: str) -> PlyHeader:
+    """
+    Parse the header of a PLY file
+
+    Raises:
+        ValueError: If the file is not a PLY file or uses list properties
+    """
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"Not a PLY file: {path}")
+
+        ply_format, comments, elements = None, [], []
+        byte_order = "<"
+        fields: List[Tuple[str, str]] = []
+        for raw in f:
+            line = raw.decode("ascii").strip()
+            words = line.split()
+            if not words:
+                continue
+            keyword = words[0]
+            if keyword == "format":
+                ply_format = words[1]
+                if ply_format not in FORMATS:
+                    raise ValueError(f"Unsupported PLY format: {ply_format}")
+                byte_order = FORMATS[ply_format] or "<"
+            elif keyword in ("comment", "obj_info"):
+                comments.append(line[len(keyword):].strip())
+            elif keyword == "element":
+                fields = []
+                elements.append([words[1], int(words[2]), fields])
+            elif keyword == "property":
+                if words[1] == "list":
+                    raise ValueError(f"List property '{words[-1]}' is not supported")
+                if words[1] not in PLY_TYPES:
+                    raise ValueError(f"Unknown PLY property type: {words[1]}")
+                fields.append((words[2], byte_order + PLY_TYPES[words[1]]))
+            elif keyword == "end_header":
+                break
+        else:
+            raise ValueError(f"PLY header of {path} has no end_header")
+
+        size = f.tell()
+
+    if ply_format is None:
+        raise ValueError(f"PLY header of {path} has no format line")
+    return PlyHeader(
+        ply_format,
+        [(name, count, np.dtype(fields)) for name, count, fields in elements],
+        comments,
+        size
+    )
+
+def read_ply(path: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Read every element of a PLY file
+
+    Args:
+        path: PLY file
+        mmap: Map binary element data read-only instead of loading it
+
+    Returns:
+        Dict of element name to structured array (np.memmap for binary files
+        when mmap is set; ASCII files are always parsed into memory)
+    """
+    header = read_header(path)
+
+    if header.format == "ascii":
+        with open(path, "rb") as f:
+            f.seek(header.size)
+            elements = {}
+            for name, count, dtype in header.elements:
+                rows = [f.readline().split() for _ in range(count)]
+                array = np.empty(count, dtype=dtype)
+                if count:
+                    values = np.array(rows, dtype=np.float64)
+                    for column, field in enumerate(dtype.names):
+                        array[field] = values[:, column]
+                elements[name] = array
+            return elements
+
+    offsets = header.offsets()
+    elements = {}
+    for name, count, dtype in header.elements:
+        if mmap and count:
+            elements[name] = np.memmap(path, dtype=dtype, mode="r", offset=offsets[name], shape=(count,))
+        else:
+            elements[name] = np.fromfile(path, dtype=dtype, count=count, offset=offsets[name])
+    return elements
+
+def read_element(path: str, element: str = "vertex", mmap: bool = True) -> np.ndarray:
+    """
+    Read one PLY element
+
+    Raises:
+        KeyError: If the file has no such element
+    """
+    elements = read_ply(path, mmap)
+    if element not in elements:
+        raise KeyError(f"PLY file {path} has no '{element}' element")
+    return elements[element]
+
+def iter_rows(array: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """Iterate over a (memory-mapped) element in blocks of rows"""
+    for start in range(0, len(array), chunk_rows):
+        yield array[start:start + chunk_rows]
+
+def iter_element(path: str, element: str = "vertex", chunk_rows: int = CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """Stream one element of a binary PLY in blocks of rows"""
+    yield from iter_rows(read_element(path, element), chunk_rows)
+
+def format_header(
+    elements: Sequence[ElementSpec],
+    binary: bool = True,
+    comments: Iterable[str] = ()
+) -> bytes:
+    """
+    Build a PLY header
+
+    Args:
+        elements: (name, count, structured dtype) per element, in file order
+        binary: binary_little_endian (default) or ascii
+    """
+    lines = ["ply", "format binary_little_endian 1.0" if binary else "format ascii 1.0"]
+    lines += [f"comment {comment}" for comment in comments]
+    for name, count, dtype in elements:
+        lines.append(f"element {name} {count}")
+        for field in dtype.names:
+            field_type = dtype[field]
+            if field_type.subdtype is not None or field_type.str[1:] not in NUMPY_TYPES:
+                raise ValueError(f"Property '{field}' has no PLY scalar type ({field_type})")
+            lines.append(f"property {NUMPY_TYPES[field_type.str[1:]]} {field}")
+    lines.append("end_header")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+def little_endian(dtype: np.dtype) -> np.dtype:
+    """Same structured dtype with every field stored little-endian"""
+    return np.dtype([(name, dtype[name].newbyteorder("<")) for name in dtype.names])
+
+def write_ply(
+    path: str,
+    elements: Union[Dict[str, np.ndarray], Sequence[Tuple[str, np.ndarray]]],
+    binary: bool = True,
+    comments: Iterable[str] = (),
+    chunk_rows: int = CHUNK_ROWS
+):
+    """
+    Write structured arrays as PLY elements
+
+    Args:
+        path: Output file
+        elements: Element name -> structured array, in file order
+        binary: binary_little_endian (default) or ascii
+        comments: Header comment lines
+        chunk_rows: Rows converted per write, bounds the temporary copies
+    """
+    items = list(elements.items() if isinstance(elements, dict) else elements)
+    header = format_header([(name, len(array), array.dtype) for name, array in items], binary, comments)
+
+    with open(path, "wb") as f:
+        f.write(header)
+        for _, array in items:
+            if binary:
+                dtype = little_endian(array.dtype)
+                for block in iter_rows(array, chunk_rows):
+                    f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+            else:
+                formats = " ".join("%.9g" if array.dtype[name].kind == "f" else "%d" for name in array.dtype.names)
+                for block in iter_rows(array, chunk_rows):
+                    columns = np.stack([block[name].astype(np.float64) for name in array.dtype.names], axis=1)
+                    np.savetxt(f, columns, fmt=formats)
+
+def create_ply(
+    path: str,
+    elements: Sequence[ElementSpec],
+    comments: Iterable[str] = ()
+) -> Dict[str, np.memmap]:
+    """
+    Create a binary little-endian PLY of fixed size and map its elements for writing
+
+    Callers fill the returned arrays block by block (in any order) and
+    ``flush`` them, so outputs larger than memory never exist as one array.
+
+    Args:
+        path: Output file
+        elements: (name, count, structured dtype) per element, in file order
+
+    Returns:
+        Dict of element name to writable np.memmap
+    """
+    elements = [(name, count, little_endian(np.dtype(dtype))) for name, count, dtype in elements]
+    header = format_header(elements, binary=True, comments=comments)
+    size = len(header) + sum(count * dtype.itemsize for _, count, dtype in elements)
+
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(size)
+
+    mapped, offset = {}, len(header)
+    for name, count, dtype in elements:
+        if count:
+            mapped[name] = np.memmap(path, dtype=dtype, mode="r+", offset=offset, shape=(count,))
+        else:
+            mapped[name] = np.empty(0, dtype=dtype)
+        offset += count * dtype.itemsize
+    return mapped
+
+def flush(mapped: Dict[str, np.ndarray]):
+    """Write back the elements returned by ``create_ply``"""
+    for array in mapped.values():
+        if isinstance(array, np.memmap):
+            array.flush()
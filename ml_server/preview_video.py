@@ -0,0 +1,154 @@
+"""
+Streaming preview video encoding
+
+Renders the orbit preview one frame at a time and pipes each frame straight
+into ffmpeg, so a preview never exists as a (frames, H, W, 3) array: memory
+stays at one frame plus the encoder's buffers regardless of frame count.
+Supports H.264 MP4 and animated WebP (smaller, plays in an <img> tag).
+
+Shared by the RunPod worker and the API (imported as ``ml_server.preview_video``),
+so this module must not import other worker modules.
+"""
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import imageio_ffmpeg
+    IMAGEIO_FFMPEG_AVAILABLE = True
+except ImportError:
+    IMAGEIO_FFMPEG_AVAILABLE = False
+
+try:
+    import imageio
+    IMAGEIO_AVAILABLE = True
+except ImportError:
+    IMAGEIO_AVAILABLE = False
+
+# Output format -> encoder settings
+VIDEO_FORMATS = {
+    "mp4": {
+        "extension": "mp4",
+        "codec": "libx264",
+        "pix_fmt_out": "yuv420p",
+        "macro_block_size": 2,  # yuv420p needs even dimensions
+        "output_params": lambda quality: ["-crf", str(quality), "-preset", "veryfast", "-movflags", "+faststart"],
+        "default_quality": 23,  # CRF, lower is better
+    },
+    "webp": {
+        "extension": "webp",
+        "codec": "libwebp_anim",
+        "pix_fmt_out": "yuv420p",
+        "macro_block_size": 1,
+        "output_params": lambda quality: ["-quality", str(quality), "-loop", "0", "-f", "webp"],
+        "default_quality": 75,  # 0-100, higher is better
+    },
+}
+
+def orbit_frames(
+    gaussian,
+    num_frames: int = 120,
+    resolution: int = 512,
+    bg_color: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+    r: float = 2.0,
+    fov: float = 40.0
+) -> Iterator:
+    """
+    Render the TRELLIS orbit trajectory lazily, one uint8 (H, W, 3) frame at a time
+
+    Same camera path as ``render_utils.render_video``, but frames are yielded
+    as they are rendered instead of being collected into one array.
+    """
+    import numpy as np
+    import torch
+    from trellis.utils import render_utils
+
+    yaws = torch.linspace(0, 2 * math.pi, num_frames).tolist()
+    pitch = (0.25 + 0.5 * torch.sin(torch.linspace(0, 2 * math.pi, num_frames))).tolist()
+    extrinsics, intrinsics = render_utils.yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitch, r, fov)
+    renderer = render_utils.get_renderer(gaussian, resolution=resolution, bg_color=bg_color)
+
+    for extrinsic, intrinsic in zip(extrinsics, intrinsics):
+        with torch.no_grad():
+            color = renderer.render(gaussian, extrinsic, intrinsic)["color"]
+        yield np.clip(color.detach().cpu().numpy().transpose(1, 2, 0) * 255, 0, 255).astype(np.uint8)
+
+def encode_frames(
+    frames: Iterable,
+    path: str,
+    fps: int = 15,
+    video_format: str = "mp4",
+    quality: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Encode frames into a video file as they arrive
+
+    Args:
+        frames: Iterable of uint8 (H, W, 3) RGB frames, all the same size
+        path: Output file
+        fps: Frames per second
+        video_format: "mp4" (H.264) or "webp" (animated WebP)
+        quality: CRF for mp4, 0-100 for webp (default per format)
+
+    Returns:
+        Stats dict with format, frame count, size, bytes and seconds
+
+    Raises:
+        ValueError: Unknown format or no frames
+        RuntimeError: Neither imageio-ffmpeg nor imageio is installed
+    """
+    if video_format not in VIDEO_FORMATS:
+        raise ValueError(f"Unsupported preview format: {video_format}")
+    options = VIDEO_FORMATS[video_format]
+    quality = options["default_quality"] if quality is None else quality
+
+    start = time.perf_counter()
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to encode")
+    height, width = first.shape[:2]
+
+    count = 0
+    if IMAGEIO_FFMPEG_AVAILABLE:
+        writer = imageio_ffmpeg.write_frames(
+            path,
+            (width, height),
+            fps=fps,
+            codec=options["codec"],
+            pix_fmt_in="rgb24",
+            pix_fmt_out=options["pix_fmt_out"],
+            quality=None,
+            macro_block_size=options["macro_block_size"],
+            output_params=options["output_params"](quality),
+            ffmpeg_log_level="error"
+        )
+        writer.send(None)  # Start the ffmpeg process
+        try:
+            for frame in _chain(first, frames):
+                writer.send(frame.tobytes() if hasattr(frame, "tobytes") else bytes(frame))
+                count += 1
+        finally:
+            writer.close()
+    elif IMAGEIO_AVAILABLE:
+        with imageio.get_writer(path, format="FFMPEG", mode="I", fps=fps, codec=options["codec"]) as writer:
+            for frame in _chain(first, frames):
+                writer.append_data(frame)
+                count += 1
+    else:
+        raise RuntimeError("Preview encoding needs imageio-ffmpeg (or imageio)")
+
+    return {
+        "format": video_format,
+        "frames": count,
+        "width": int(width),
+        "height": int(height),
+        "fps": fps,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def _chain(first, rest: Iterator) -> Iterator:
+    yield first
+    yield from rest
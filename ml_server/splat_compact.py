@@ -0,0 +1,188 @@
+"""
+Gaussian splat compaction
+
+Post-processes the 3DGS PLY written by ``gaussian.save_ply``: drops Gaussians
+that are (almost) transparent or too small to ever cover a pixel, and
+optionally truncates the spherical-harmonic coefficients to a lower degree.
+Everything is a boolean mask or a field copy over blocks of the
+memory-mapped vertex array.
+The output keeps the standard 3DGS property layout (x/y/z, f_dc_*, f_rest_*,
+opacity, scale_*, rot_*), so any 3DGS viewer can load it.
+"""
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from ply_io import CHUNK_ROWS, create_ply, flush, iter_rows, read_element
+
+MIN_OPACITY = 1.0 / 255.0  # Below one 8-bit alpha step a Gaussian never shows up
+
+_REST_FIELD = re.compile(r"f_rest_(\d+)$")
+
+def sh_degree(rest_count: int) -> int:
+    """
+    SH degree stored by a 3DGS PLY
+
+    Args:
+        rest_count: Number of f_rest_* properties (3 channels x ((d + 1)^2 - 1))
+    """
+    per_channel = rest_count // 3
+    degree = int(round(np.sqrt(per_channel + 1))) - 1
+    if 3 * ((degree + 1) ** 2 - 1) != rest_count:
+        raise ValueError(f"{rest_count} f_rest properties do not form a full SH degree")
+    return degree
+
+def _rest_fields(names) -> list:
+    rest = [name for name in names if _REST_FIELD.match(name)]
+    return sorted(rest, key=lambda name: int(_REST_FIELD.match(name).group(1)))
+
+def keep_mask(
+    vertices: np.ndarray,
+    min_opacity: float = MIN_OPACITY,
+    min_scale: float = 0.0
+) -> np.ndarray:
+    """Boolean mask of the Gaussians that pass the opacity and scale thresholds"""
+    names = vertices.dtype.names
+    keep = np.ones(len(vertices), dtype=bool)
+
+    # Non-finite Gaussians break sorting in viewers
+    for name in ("x", "y", "z"):
+        keep &= np.isfinite(vertices[name])
+
+    if min_opacity > 0 and "opacity" in names:
+        # sigmoid(logit) < t  <=>  logit < log(t / (1 - t)), no need to activate every value
+        threshold = np.log(min_opacity / (1.0 - min_opacity))
+        keep &= vertices["opacity"] >= threshold
+
+    scale_fields = [name for name in ("scale_0", "scale_1", "scale_2") if name in names]
+    if min_scale > 0 and scale_fields:
+        largest = np.max(np.stack([vertices[name] for name in scale_fields]), axis=0)
+        keep &= largest >= np.log(min_scale)
+
+    return keep
+
+def sh_fields(dtype: np.dtype, max_sh_degree: Optional[int] = None) -> Tuple[List[Tuple[str, str]], int, int]:
+    """
+    Properties to keep when truncating SH
+
+    Returns:
+        Tuple of ((source name, output name) pairs, SH degree before, SH degree after)
+    """
+    rest = _rest_fields(dtype.names)
+    degree_before = sh_degree(len(rest)) if rest else 0
+    degree_after = degree_before if max_sh_degree is None else min(degree_before, max_sh_degree)
+
+    # f_rest is channel-major: all R coefficients, then G, then B
+    per_channel_before = (degree_before + 1) ** 2 - 1
+    per_channel_after = (degree_after + 1) ** 2 - 1
+    rename = {}
+    for channel in range(3):
+        for i in range(per_channel_after):
+            rename[rest[channel * per_channel_before + i]] = f"f_rest_{channel * per_channel_after + i}"
+
+    fields = []
+    for name in dtype.names:
+        if name in rest:
+            if name in rename:
+                fields.append((name, rename[name]))
+        else:
+            fields.append((name, name))
+    return fields, degree_before, degree_after
+
+def _stats(count_before: int, count_after: int, degrees: Tuple[int, int], dtypes: Tuple[np.dtype, np.dtype]) -> Dict[str, Any]:
+    return {
+        "gaussians_before": int(count_before),
+        "gaussians_after": int(count_after),
+        "pruned": int(count_before - count_after),
+        "sh_degree_before": degrees[0],
+        "sh_degree_after": degrees[1],
+        "bytes_per_gaussian_before": dtypes[0].itemsize,
+        "bytes_per_gaussian_after": dtypes[1].itemsize,
+    }
+
+def compact_gaussians(
+    vertices: np.ndarray,
+    min_opacity: float = MIN_OPACITY,
+    min_scale: float = 0.0,
+    max_sh_degree: Optional[int] = None
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Prune Gaussians and truncate their SH coefficients
+
+    Args:
+        vertices: Structured array with the 3DGS vertex properties
+            (opacity is a logit, scale_* are log scales, as 3DGS stores them)
+        min_opacity: Drop Gaussians whose activated opacity is below this
+        min_scale: Drop Gaussians whose largest axis (world units) is below this
+        max_sh_degree: Keep SH bands up to this degree (None keeps all)
+
+    Returns:
+        Tuple of (compacted structured array, stats dict)
+    """
+    fields, degree_before, degree_after = sh_fields(vertices.dtype, max_sh_degree)
+    kept = vertices[keep_mask(vertices, min_opacity, min_scale)]
+    compacted = np.empty(len(kept), dtype=[(new, vertices.dtype[old]) for old, new in fields])
+    for old, new in fields:
+        compacted[new] = kept[old]
+
+    stats = _stats(len(vertices), len(compacted), (degree_before, degree_after), (vertices.dtype, compacted.dtype))
+    return compacted, stats
+
+def compact_ply(
+    src_path: str,
+    dst_path: Optional[str] = None,
+    min_opacity: float = MIN_OPACITY,
+    min_scale: float = 0.0,
+    max_sh_degree: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compact a 3DGS PLY file
+
+    The source is memory-mapped and the output written into a mapped file
+    block by block, so neither is ever held in memory whole.
+
+    Args:
+        src_path: Gaussian PLY written by ``gaussian.save_ply``
+        dst_path: Output path (default: overwrite src_path)
+        min_opacity / min_scale / max_sh_degree: See ``compact_gaussians``
+
+    Returns:
+        Stats dict with Gaussian counts, SH degrees, file sizes and timing
+    """
+    start = time.perf_counter()
+    dst_path = dst_path or src_path
+    bytes_before = os.path.getsize(src_path)
+
+    vertices = read_element(src_path, "vertex")
+    fields, degree_before, degree_after = sh_fields(vertices.dtype, max_sh_degree)
+    keep = np.concatenate(
+        [keep_mask(block, min_opacity, min_scale) for block in iter_rows(vertices)]
+    ) if len(vertices) else np.zeros(0, dtype=bool)
+    source_dtype = vertices.dtype
+    dtype = np.dtype([(new, source_dtype[old]) for old, new in fields])
+
+    # Write next to the destination first, the source stays mapped until the end
+    tmp_path = dst_path + ".tmp"
+    output = create_ply(tmp_path, [("vertex", int(keep.sum()), dtype)])
+    compacted = output["vertex"]
+    written = 0
+    for offset in range(0, len(vertices), CHUNK_ROWS):
+        kept = vertices[offset:offset + CHUNK_ROWS][keep[offset:offset + CHUNK_ROWS]]
+        for old, new in fields:
+            compacted[new][written:written + len(kept)] = kept[old]
+        written += len(kept)
+    flush(output)
+    del output, compacted, vertices
+    os.replace(tmp_path, dst_path)
+
+    stats = _stats(len(keep), written, (degree_before, degree_after), (source_dtype, dtype))
+    bytes_after = os.path.getsize(dst_path)
+    stats.update({
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "reduction": round(1.0 - bytes_after / bytes_before, 4) if bytes_before else 0.0,
+        "seconds": round(time.perf_counter() - start, 3),
+    })
+    return stats
@@ -0,0 +1,218 @@
+"""
+Web-ready quantized splat export
+
+Converts a 3DGS PLY into the PlayCanvas / SuperSplat ``compressed.ply``
+layout: splats are grouped in chunks of 256, each chunk stores its position
+and scale bounds, and every splat is packed into four uint32 words
+(11-10-11 position, 2-10-10-10 smallest-three rotation, 11-10-11 log scale,
+8-8-8-8 RGBA), 16 bytes instead of 248 for a degree-3 splat.
+
+Splats are written in Morton (Z-order) so chunks are spatially tight, or by
+importance (opacity x volume) so a viewer that renders the first N KB shows
+the most visible splats first. The source is memory-mapped and converted in
+blocks of chunks, only the sort keys are held for the whole file.
+"""
+import os
+import time
+from typing import Any, Dict, Tuple
+import numpy as np
+
+from ply_io import create_ply, flush, read_element
+
+CHUNK_SPLATS = 256
+BLOCK_CHUNKS = 1024  # 256K splats converted at a time
+SH_C0 = 0.28209479177387814
+MORTON_BITS = 10  # Per axis, 30-bit codes
+
+CHUNK_PROPERTIES = [
+    "min_x", "min_y", "min_z", "max_x", "max_y", "max_z",
+    "min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z",
+]
+VERTEX_PROPERTIES = ["packed_position", "packed_rotation", "packed_scale", "packed_color"]
+CHUNK_DTYPE = np.dtype([(name, "<f4") for name in CHUNK_PROPERTIES])
+VERTEX_DTYPE = np.dtype([(name, "<u4") for name in VERTEX_PROPERTIES])
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert two zero bits between each of the low 10 bits"""
+    v = v.astype(np.uint32) & 0x3FF
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+def morton_codes(positions: np.ndarray, bounds_min: np.ndarray, bounds_max: np.ndarray) -> np.ndarray:
+    """
+    30-bit Morton codes of positions quantized inside the given bounds
+
+    Args:
+        positions: (N, 3) float positions
+        bounds_min / bounds_max: (3,) bounds of the whole splat cloud
+    """
+    extent = np.where(bounds_max > bounds_min, bounds_max - bounds_min, 1.0)
+    cells = (positions - bounds_min) / extent * ((1 << MORTON_BITS) - 1)
+    cells = np.clip(cells, 0, (1 << MORTON_BITS) - 1).astype(np.uint32)
+    return (_spread_bits(cells[:, 0]) << 2) | (_spread_bits(cells[:, 1]) << 1) | _spread_bits(cells[:, 2])
+
+def _unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    scale = (1 << bits) - 1
+    return np.floor(np.clip(values, 0.0, 1.0) * scale + 0.5).astype(np.uint32)
+
+def _normalize(values: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    extent = high - low
+    return np.divide(values - low, extent, out=np.zeros_like(values), where=extent > 0)
+
+def _pack_11_10_11(values: np.ndarray) -> np.ndarray:
+    return (_unorm(values[:, 0], 11) << 21) | (_unorm(values[:, 1], 10) << 11) | _unorm(values[:, 2], 11)
+
+def pack_rotations(quaternions: np.ndarray) -> np.ndarray:
+    """
+    Smallest-three quaternion packing (2-bit index of the largest component
+    + three 10-bit components), quaternions in rot_0..rot_3 order
+    """
+    norm = np.linalg.norm(quaternions, axis=1, keepdims=True)
+    q = np.divide(quaternions, norm, out=np.tile([1.0, 0.0, 0.0, 0.0], (len(quaternions), 1)), where=norm > 0)
+    largest = np.argmax(np.abs(q), axis=1)
+    rows = np.arange(len(q))
+    q *= np.where(q[rows, largest] < 0, -1.0, 1.0)[:, None]
+
+    # The three remaining components, in order, via a per-row column table
+    others = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    rest = np.take_along_axis(q, others, axis=1) * (np.sqrt(2) * 0.5) + 0.5
+    return (
+        (largest.astype(np.uint32) << 30)
+        | (_unorm(rest[:, 0], 10) << 20)
+        | (_unorm(rest[:, 1], 10) << 10)
+        | _unorm(rest[:, 2], 10)
+    )
+
+def pack_colors(f_dc: np.ndarray, opacity: np.ndarray) -> np.ndarray:
+    """8-bit RGBA from SH DC coefficients and opacity logits"""
+    rgb = 0.5 + SH_C0 * f_dc
+    alpha = 1.0 / (1.0 + np.exp(-opacity))
+    return (
+        (_unorm(rgb[:, 0], 8) << 24)
+        | (_unorm(rgb[:, 1], 8) << 16)
+        | (_unorm(rgb[:, 2], 8) << 8)
+        | _unorm(alpha, 8)
+    )
+
+def compress_block(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize a run of splats (already in output order) into chunks
+
+    Args:
+        block: Structured array with x/y/z, f_dc_*, opacity, scale_*, rot_*
+
+    Returns:
+        Tuple of ((C, 12) float32 chunk bounds, (N, 4) uint32 packed splats)
+    """
+    positions = np.stack([block["x"], block["y"], block["z"]], axis=1).astype(np.float32)
+    scales = np.stack([block["scale_0"], block["scale_1"], block["scale_2"]], axis=1).astype(np.float32)
+    scales = np.clip(np.nan_to_num(scales, nan=-20.0), -20.0, 20.0)
+
+    # Per-chunk bounds, then broadcast back to the splats of each chunk
+    starts = np.arange(0, len(block), CHUNK_SPLATS)
+    chunk_of = np.arange(len(block)) // CHUNK_SPLATS
+    chunks = np.concatenate([
+        np.minimum.reduceat(positions, starts), np.maximum.reduceat(positions, starts),
+        np.minimum.reduceat(scales, starts), np.maximum.reduceat(scales, starts),
+    ], axis=1)
+    position_min, position_max = chunks[chunk_of, 0:3], chunks[chunk_of, 3:6]
+    scale_min, scale_max = chunks[chunk_of, 6:9], chunks[chunk_of, 9:12]
+
+    packed = np.empty((len(block), 4), dtype=np.uint32)
+    packed[:, 0] = _pack_11_10_11(_normalize(positions, position_min, position_max))
+    packed[:, 1] = pack_rotations(np.stack([block[f"rot_{i}"] for i in range(4)], axis=1).astype(np.float64))
+    packed[:, 2] = _pack_11_10_11(_normalize(scales, scale_min, scale_max))
+    packed[:, 3] = pack_colors(
+        np.stack([block[f"f_dc_{i}"] for i in range(3)], axis=1).astype(np.float32),
+        block["opacity"].astype(np.float32)
+    )
+    return chunks.astype(np.float32), packed
+
+def splat_order(vertices: np.ndarray, order: str = "morton") -> np.ndarray:
+    """
+    Output order of the splats
+
+    Args:
+        vertices: (Memory-mapped) structured vertex array
+        order: "morton" (Z-order of positions) or "importance" (opacity x volume, descending)
+    """
+    n = len(vertices)
+    blocks = range(0, n, CHUNK_SPLATS * BLOCK_CHUNKS)
+    step = CHUNK_SPLATS * BLOCK_CHUNKS
+
+    if order == "importance":
+        keys = np.empty(n, dtype=np.float32)
+        for start in blocks:
+            block = vertices[start:start + step]
+            log_volume = block["scale_0"] + block["scale_1"] + block["scale_2"]
+            alpha = 1.0 / (1.0 + np.exp(-block["opacity"]))
+            keys[start:start + step] = -np.nan_to_num(alpha * np.exp(log_volume))
+        return np.argsort(keys, kind="stable")
+
+    if order != "morton":
+        raise ValueError(f"Unknown splat order: {order}")
+
+    bounds_min = np.full(3, np.inf)
+    bounds_max = np.full(3, -np.inf)
+    for start in blocks:
+        block = vertices[start:start + step]
+        for axis, name in enumerate(("x", "y", "z")):
+            values = block[name][np.isfinite(block[name])]
+            if len(values):
+                bounds_min[axis] = min(bounds_min[axis], values.min())
+                bounds_max[axis] = max(bounds_max[axis], values.max())
+    bounds_min = np.where(np.isfinite(bounds_min), bounds_min, 0.0)
+    bounds_max = np.where(np.isfinite(bounds_max), bounds_max, 0.0)
+
+    codes = np.empty(n, dtype=np.uint32)
+    for start in blocks:
+        block = vertices[start:start + step]
+        positions = np.nan_to_num(np.stack([block["x"], block["y"], block["z"]], axis=1).astype(np.float64))
+        codes[start:start + step] = morton_codes(positions, bounds_min, bounds_max)
+    return np.argsort(codes, kind="stable")
+
+def export_compressed_ply(src_path: str, dst_path: str, order: str = "morton") -> Dict[str, Any]:
+    """
+    Convert a 3DGS PLY into a quantized, chunked compressed.ply
+
+    Args:
+        src_path: Binary 3DGS PLY (memory-mapped, never loaded whole)
+        dst_path: Output path (written through a memory map, block by block)
+        order: "morton" or "importance", see ``splat_order``
+
+    Returns:
+        Stats dict with splat/chunk counts, sizes and timing
+    """
+    start_time = time.perf_counter()
+    vertices = read_element(src_path, "vertex")
+    n = len(vertices)
+    indices = splat_order(vertices, order)
+
+    output = create_ply(dst_path, [
+        ("chunk", (n + CHUNK_SPLATS - 1) // CHUNK_SPLATS, CHUNK_DTYPE),
+        ("vertex", n, VERTEX_DTYPE),
+    ])
+    step = CHUNK_SPLATS * BLOCK_CHUNKS
+    for start in range(0, n, step):
+        chunks, packed = compress_block(vertices[indices[start:start + step]])
+        first_chunk = start // CHUNK_SPLATS
+        output["chunk"][first_chunk:first_chunk + len(chunks)] = chunks.astype("<f4").view(CHUNK_DTYPE).reshape(-1)
+        output["vertex"][start:start + len(packed)] = packed.astype("<u4").view(VERTEX_DTYPE).reshape(-1)
+    flush(output)
+    chunk_count = len(output["chunk"])
+    del output, vertices
+
+    bytes_before = os.path.getsize(src_path)
+    bytes_after = os.path.getsize(dst_path)
+    return {
+        "splats": n,
+        "chunks": chunk_count,
+        "order": order,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "reduction": round(1.0 - bytes_after / bytes_before, 4) if bytes_before else 0.0,
+        "seconds": round(time.perf_counter() - start_time, 3),
+    }
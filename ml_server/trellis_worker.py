@@ -13,6 +13,12 @@ import numpy as np
 
 # Import mock modules
 from mock_nvdiffrast import create_mock_nvdiffrast
+from glb_inspect import inspect_glb
+from disk_gc import TEMP_PREFIX
+from job_control import JobControl, JobStopped
+
+# GLB_COMPRESSION values accepted by _export_glb
+GLB_COMPRESSIONS = ("none", "quantize", "meshopt")
 
 # Add TRELLIS to Python path
 trellis_path = '/workspace/trellis_source'
@@ -243,17 +249,41 @@ class TrellisWorker:
         ss_sampling_steps: int = 12,
         slat_guidance_strength: float = 3.0,
         slat_sampling_steps: int = 12,
+        glb_compression: Optional[str] = None,
+        texture_format: Optional[str] = None,
+        texture_quality: Optional[int] = None,
+        texture_max_size: Optional[int] = None,
+        output_dir: Optional[str] = None,
+        control: Optional[JobControl] = None,
         **kwargs
     ) -> Dict[str, str]:
         """
         Generate 3D model from image
         
+        glb_compression: "none" (plain trimesh export), "quantize" (KHR_mesh_quantization)
+        or "meshopt" (quantized + EXT_meshopt_compression); defaults to $GLB_COMPRESSION
+        
+        texture_format: "none" (keep baked PNG), "jpeg" or "webp"; defaults to $GLB_TEXTURE_FORMAT.
+        texture_quality / texture_max_size default to $GLB_TEXTURE_QUALITY / $GLB_TEXTURE_MAX_SIZE
+        
+        output_dir: Job scratch directory for the output files (default: system temp dir);
+        the caller removes it, so files do not leak when a later step fails
+        
+        control: Checked between pipeline stages; a cancelled or expired job stops
+        there and releases the GPU memory of the stages it ran
+        
         Returns:
             Dict with file paths: {"glb_path": "...", "ply_path": "...", "preview_path": "..."}
+        
+        Raises:
+            JobStopped: If the task was cancelled or its deadline passed
+            ValueError: If glb_compression is not one of GLB_COMPRESSIONS
         """
         
         if not self.is_initialized:
             raise RuntimeError("TrellisWorker not initialized")
+        # Rejected before inference rather than after it
+        glb_compression = self._glb_compression(glb_compression)
         
         # Load and preprocess image
         print(f"📷 Loading image: {image_path}")
@@ -266,9 +296,10 @@ class TrellisWorker:
             print(f"📐 Resized image to: {image.size}")
         
         if self.pipeline == "mock":
-            return self._generate_mock_3d(image_path)
+            return self._generate_mock_3d(image_path, output_dir)
         
         try:
+            self._checkpoint(control, "inference")
             print("🧠 Running TRELLIS inference...")
             
             # Set random seed
@@ -294,6 +325,7 @@ class TrellisWorker:
                 )
             
             print("✅ TRELLIS inference completed")
+            self._checkpoint(control, "export")
             
             # Extract results
             gaussian = outputs.get('gaussian', [None])[0]
@@ -302,61 +334,235 @@ class TrellisWorker:
             # Save outputs
             result_paths = {}
             
+            # Clean mesh before export (welding, degenerate faces, islands)
+            if mesh is not None and os.environ.get("MESH_CLEANUP", "true").lower() == "true":
+                mesh, mesh_stats = self._clean_mesh(mesh)
+                result_paths['mesh_stats'] = mesh_stats
+            
             # Save GLB file
             if mesh is not None:
-                glb_path = tempfile.mktemp(suffix='.glb')
-                mesh.export(glb_path)
+                glb_path = self._output_path(output_dir, '.glb')
+                self._export_glb(gaussian, mesh, glb_path, glb_compression)
+                texture_stats = self._reencode_textures(glb_path, texture_format, texture_quality, texture_max_size)
+                if texture_stats is not None:
+                    result_paths['texture_stats'] = texture_stats
                 result_paths['glb_path'] = glb_path
-                print(f"💾 GLB saved: {glb_path}")
+                result_paths['glb_stats'] = inspect_glb(glb_path)
+                print(f"💾 GLB saved: {glb_path} ({os.path.getsize(glb_path)} bytes)")
             
             # Save PLY file
+            self._checkpoint(control, "splat export")
             if gaussian is not None:
-                ply_path = tempfile.mktemp(suffix='.ply')
+                ply_path = self._output_path(output_dir, '.ply')
                 gaussian.save_ply(ply_path)
+                if os.environ.get("SPLAT_COMPACTION", "true").lower() == "true":
+                    result_paths['splat_stats'] = self._compact_splats(ply_path)
                 result_paths['ply_path'] = ply_path
+                if os.environ.get("SPLAT_WEB_EXPORT", "true").lower() == "true":
+                    splat_path = self._output_path(output_dir, '.compressed.ply')
+                    result_paths['splat_web_stats'] = self._export_web_splats(ply_path, splat_path)
+                    result_paths['splat_path'] = splat_path
                 print(f"💾 PLY saved: {ply_path}")
             
             # Generate preview video
+            self._checkpoint(control, "preview")
             if gaussian is not None:
                 try:
-                    preview_path = tempfile.mktemp(suffix='.mp4')
-                    render_utils.render_video(gaussian, preview_path, num_frames=30)
+                    preview_path, preview_stats = self._render_preview(gaussian, output_dir)
                     result_paths['preview_path'] = preview_path
-                    print(f"🎥 Preview video saved: {preview_path}")
+                    result_paths['preview_stats'] = preview_stats
+                    print(
+                        f"🎥 Preview video saved: {preview_path} ({preview_stats['frames']} frames, "
+                        f"{preview_stats['bytes']} bytes in {preview_stats['seconds']}s)"
+                    )
                 except Exception as e:
                     print(f"⚠️ Preview generation failed: {e}")
             
             return result_paths
             
+        except JobStopped as e:
+            print(f"🛑 {e}")
+            # The traceback keeps this frame alive, so drop the pipeline outputs explicitly
+            outputs = gaussian = mesh = None
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            raise
         except Exception as e:
             print(f"❌ TRELLIS generation failed: {e}")
             raise
     
-    def _generate_mock_3d(self, image_path: str) -> Dict[str, str]:
+    @staticmethod
+    def _checkpoint(control: Optional[JobControl], stage: str):
+        """Stop here if the job was cancelled or is past its deadline"""
+        if control is not None:
+            control.check(stage)
+    
+    def _clean_mesh(self, mesh):
+        """Run vectorized cleanup on a TRELLIS mesh, returns (cleaned mesh, stats)"""
+        from mesh_cleanup import clean_mesh
+        from trellis.representations.mesh.cube2mesh import MeshExtractResult
+        
+        vertices, faces, vertex_map, stats = clean_mesh(
+            mesh.vertices.detach().cpu().numpy(),
+            mesh.faces.detach().cpu().numpy()
+        )
+        
+        device = mesh.vertices.device
+        vertex_attrs = None
+        if mesh.vertex_attrs is not None:
+            vertex_attrs = mesh.vertex_attrs[torch.from_numpy(vertex_map).to(device)]
+        
+        cleaned = MeshExtractResult(
+            vertices=torch.from_numpy(vertices).to(device=device, dtype=mesh.vertices.dtype),
+            faces=torch.from_numpy(faces).to(device=device, dtype=mesh.faces.dtype),
+            vertex_attrs=vertex_attrs,
+            res=mesh.res
+        )
+        
+        print(
+            f"🧹 Mesh cleanup: {stats['vertices_before']} → {stats['vertices_after']} vertices, "
+            f"{stats['faces_before']} → {stats['faces_after']} faces "
+            f"(welded {stats['vertices_welded']}, degenerate {stats['degenerate_faces_removed']}, "
+            f"duplicates {stats['duplicate_faces_removed']}, islands {stats['components_removed']}) "
+            f"in {stats['seconds']}s"
+        )
+        return cleaned, stats
+    
+    @staticmethod
+    def _glb_compression(compression: Optional[str] = None) -> str:
+        """Resolve the GLB compression (default $GLB_COMPRESSION), raises ValueError if unknown"""
+        compression = compression or os.environ.get("GLB_COMPRESSION", "none")
+        if compression not in GLB_COMPRESSIONS:
+            # A typo would otherwise ship quantized GLBs without the meshopt stage
+            raise ValueError(f"Unsupported GLB compression: {compression} (expected one of {', '.join(GLB_COMPRESSIONS)})")
+        return compression
+    
+    def _export_glb(self, gaussian, mesh, glb_path: str, compression: Optional[str] = None):
+        """Bake textured GLB and write it with the requested compression"""
+        compression = self._glb_compression(compression)
+        
+        glb = postprocessing_utils.to_glb(
+            gaussian,
+            mesh,
+            simplify=0.95,
+            texture_size=1024,
+            verbose=False
+        )
+        # to_glb simplifies and re-parametrizes the mesh, so normals are recomputed on what is exported
+        from mesh_cleanup import vertex_normals
+        glb.vertex_normals = vertex_normals(np.asarray(glb.vertices), np.asarray(glb.faces))
+        
+        if compression == "none":
+            glb.export(glb_path)
+            return
+        
+        from glb_export import export_trimesh_glb
+        
+        print(f"🗜️ Exporting GLB with {compression} compression...")
+        with open(glb_path, 'wb') as f:
+            f.write(export_trimesh_glb(glb, compress=(compression == "meshopt")))
+    
+    def _reencode_textures(
+        self,
+        glb_path: str,
+        texture_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        max_size: Optional[int] = None
+    ) -> Optional[Dict]:
+        """Re-encode embedded GLB textures in place, returns size stats or None if disabled"""
+        texture_format = texture_format or os.environ.get("GLB_TEXTURE_FORMAT", "none")
+        if texture_format == "none":
+            return None
+        quality = quality or int(os.environ.get("GLB_TEXTURE_QUALITY", "85"))
+        max_size = max_size or int(os.environ.get("GLB_TEXTURE_MAX_SIZE", "0")) or None
+        
+        from glb_textures import reencode_glb_textures
+        
+        with open(glb_path, 'rb') as f:
+            glb, stats = reencode_glb_textures(f.read(), texture_format, quality, max_size)
+        with open(glb_path, 'wb') as f:
+            f.write(glb)
+        
+        print(
+            f"🖼️ Textures re-encoded as {texture_format} (q={quality}, max={max_size or 'original'}): "
+            f"{stats['bytes_before']} → {stats['bytes_after']} bytes (-{stats['reduction']:.0%})"
+        )
+        return stats
+    
+    def _compact_splats(self, ply_path: str) -> Dict:
+        """Prune and SH-truncate the Gaussian PLY in place, returns size stats"""
+        from splat_compact import MIN_OPACITY, compact_ply
+        
+        sh_degree = os.environ.get("SPLAT_SH_DEGREE", "")
+        stats = compact_ply(
+            ply_path,
+            min_opacity=float(os.environ.get("SPLAT_MIN_OPACITY", MIN_OPACITY)),
+            min_scale=float(os.environ.get("SPLAT_MIN_SCALE", "0")),
+            max_sh_degree=int(sh_degree) if sh_degree else None
+        )
+        
+        print(
+            f"✂️ Splats compacted: {stats['gaussians_before']} → {stats['gaussians_after']} Gaussians, "
+            f"SH degree {stats['sh_degree_before']} → {stats['sh_degree_after']}, "
+            f"{stats['bytes_before']} → {stats['bytes_after']} bytes (-{stats['reduction']:.0%}) "
+            f"in {stats['seconds']}s"
+        )
+        return stats
+    
+    def _export_web_splats(self, ply_path: str, splat_path: str) -> Dict:
+        """Write the quantized compressed.ply for web viewers, returns size stats"""
+        from splat_web import export_compressed_ply
+        
+        stats = export_compressed_ply(ply_path, splat_path, order=os.environ.get("SPLAT_WEB_ORDER", "morton"))
+        print(
+            f"🌐 Web splats exported ({stats['order']}): {stats['splats']} splats in {stats['chunks']} chunks, "
+            f"{stats['bytes_before']} → {stats['bytes_after']} bytes in {stats['seconds']}s"
+        )
+        return stats
+    
+    def _render_preview(self, gaussian, output_dir: Optional[str] = None):
+        """Render and encode the orbit preview frame by frame, returns (path, stats)"""
+        from preview_video import VIDEO_FORMATS, encode_frames, orbit_frames
+        
+        video_format = os.environ.get("PREVIEW_FORMAT", "mp4")
+        quality = os.environ.get("PREVIEW_QUALITY", "")
+        preview_path = self._output_path(output_dir, f".{VIDEO_FORMATS[video_format]['extension']}")
+        frames = orbit_frames(
+            gaussian,
+            num_frames=int(os.environ.get("PREVIEW_FRAMES", "30")),
+            resolution=int(os.environ.get("PREVIEW_RESOLUTION", "512"))
+        )
+        stats = encode_frames(
+            frames,
+            preview_path,
+            fps=int(os.environ.get("PREVIEW_FPS", "15")),
+            video_format=video_format,
+            quality=int(quality) if quality else None
+        )
+        return preview_path, stats
+    
+    def _output_path(self, output_dir: Optional[str], suffix: str) -> str:
+        """Reserve an output file (prefixed so orphans are found by the disk sweeper)"""
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=TEMP_PREFIX, dir=output_dir)
+        os.close(fd)
+        return path
+    
+    def _generate_mock_3d(self, image_path: str, output_dir: Optional[str] = None) -> Dict[str, str]:
         """Generate mock 3D files for testing"""
         print("🎭 Generating mock 3D files...")
         
         # Create mock GLB file
-        glb_path = tempfile.mktemp(suffix='.glb')
+        glb_path = self._output_path(output_dir, '.glb')
         with open(glb_path, 'wb') as f:
             f.write(b"mock_glb_data_for_demo_purposes")
         
-        # Create mock PLY file
-        ply_path = tempfile.mktemp(suffix='.ply')
-        ply_content = """ply
-format ascii 1.0
-element vertex 4
-property float x
-property float y
-property float z
-end_header
-0.0 0.0 0.0
-1.0 0.0 0.0
-0.0 1.0 0.0
-0.0 0.0 1.0
-"""
-        with open(ply_path, 'w') as f:
-            f.write(ply_content)
+        # Create mock PLY file (binary little-endian point cloud)
+        from ply_io import write_ply
+        
+        ply_path = self._output_path(output_dir, '.ply')
+        points = np.zeros(4, dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4')])
+        points['x'][1] = points['y'][2] = points['z'][3] = 1.0
+        write_ply(ply_path, {'vertex': points})
         
         print("✅ Mock 3D files generated")
         
@@ -10,6 +10,8 @@ if __name__ == "__main__":
     # Get port from environment variable, default to 8000
     port = int(os.environ.get("PORT", 8000))
     host = os.environ.get("HOST", "0.0.0.0")
+    # Worker processes; in-flight jobs are shared through artifact storage, see asgi_simple
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
     
     print(f"🚀 Starting Photo to 3D server on {host}:{port}")
     print(f"📍 Health check available at: http://{host}:{port}/health")
@@ -28,6 +30,6 @@ if __name__ == "__main__":
         "asgi_simple:app",
         host=host,
         port=port,
-        workers=1,
+        workers=workers,
         log_level="info"
     )
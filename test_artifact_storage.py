@@ -0,0 +1,95 @@
+"""
+Tests for the local and S3 artifact storage backends
+"""
+import base64
+import json
+import os
+import sys
+
+import boto3
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from artifact_storage import LocalStorage, S3Storage, storage_from_env, verify_signature
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path):
+    if request.param == "local":
+        yield LocalStorage(str(tmp_path / "artifacts"))
+        return
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="artifacts")
+        yield S3Storage("artifacts", prefix="outputs", client=client)
+
+def test_stream_roundtrip_and_ranges(storage):
+    """Chunked writes read back whole and by byte range"""
+    data = os.urandom(3 * 1024 * 1024 + 123)
+    chunks = (data[i:i + 65536] for i in range(0, len(data), 65536))
+    info = storage.put_stream("task/model.glb", chunks)
+    
+    assert info.size == len(data)
+    assert info.content_type == "model/gltf-binary"
+    assert storage.get_bytes("task/model.glb") == data
+    assert b"".join(storage.get_stream("task/model.glb", start=1000, length=5000)) == data[1000:6000]
+    assert b"".join(storage.get_stream("task/model.glb", start=len(data) - 10)) == data[-10:]
+
+def test_stat_delete_and_missing(storage):
+    storage.put_bytes("task/preview.mp4", b"video")
+    assert storage.stat("task/preview.mp4").size == 5
+    assert storage.delete("task/preview.mp4")
+    assert not storage.exists("task/preview.mp4")
+    with pytest.raises(FileNotFoundError):
+        storage.stat("task/preview.mp4")
+
+def test_content_hash_keys(storage, tmp_path):
+    """Identical content maps to the same content-addressed key"""
+    path = tmp_path / "splat.ply"
+    path.write_bytes(b"ply data")
+    first = storage.put_file(None, str(path))
+    second = storage.put_bytes(None, b"ply data", suffix=".ply")
+    
+    assert first.key == second.key
+    assert first.key.startswith("objects/") and first.key.endswith(".ply")
+    assert storage.get_bytes(first.key) == b"ply data"
+
+def test_local_rejects_path_traversal(tmp_path):
+    storage = LocalStorage(str(tmp_path / "artifacts"))
+    with pytest.raises(ValueError):
+        storage.put_bytes("../escape.glb", b"x")
+
+def test_s3_presigned_upload_policy(tmp_path):
+    """Direct uploads are POST policies that pin the content type and size"""
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="artifacts")
+        upload = S3Storage("artifacts", prefix="outputs", client=client).presigned_upload(
+            "uploads/photo.jpg", "image/jpeg", 1024
+        )
+    
+    assert upload["method"] == "POST"
+    assert upload["fields"]["key"] == "outputs/uploads/photo.jpg"
+    assert upload["fields"]["Content-Type"] == "image/jpeg"
+    policy = json.loads(base64.b64decode(upload["fields"]["policy"]))
+    assert ["content-length-range", 1, 1024] in policy["conditions"]
+
+def test_worker_reads_the_api_storage_variables(tmp_path, monkeypatch):
+    """URLs the worker signs verify with the API's ARTIFACT_SIGNING_KEY, under the API's OUTPUT_DIR"""
+    for name in ("S3_BUCKET", "STORAGE_BACKEND"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "api"))
+    monkeypatch.setenv("ARTIFACT_BASE_URL", "https://files.example.com")
+    monkeypatch.setenv("ARTIFACT_SIGNING_KEY", "shared")
+    storage = storage_from_env()
+    assert storage.root == str(tmp_path / "api")
+    
+    url = storage.presigned_url("generations/task/model.glb")
+    query = dict(part.split("=", 1) for part in url.split("?", 1)[1].split("&"))
+    assert verify_signature("shared", "GET", "generations/task/model.glb", query["expires"], query["signature"], "")
+    
+    # A key copied from env.example signs nothing
+    monkeypatch.setenv("ARTIFACT_SIGNING_KEY", "your-artifact-signing-key")
+    assert storage_from_env().presigned_url("generations/task/model.glb") is None
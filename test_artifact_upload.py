@@ -0,0 +1,65 @@
+"""
+Tests for concurrent artifact uploads against a moto S3 stand-in
+"""
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+import pytest
+
+moto = pytest.importorskip("moto")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from artifact_storage import S3Storage, client_config
+from artifact_upload import upload_artifacts
+
+MB = 1024 * 1024
+
+@pytest.fixture
+def s3():
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1", config=client_config())
+        client.create_bucket(Bucket="artifacts")
+        yield client
+
+def create_files(tmp_path):
+    files = {}
+    for name, size in (("model.glb", 12 * MB), ("splat.ply", 3 * MB), ("preview.mp4", 1 * MB)):
+        path = tmp_path / name
+        path.write_bytes(os.urandom(size))
+        files[name] = str(path)
+    return files
+
+def test_uploads_all_artifacts_with_timings(s3, tmp_path):
+    """Every file lands under the prefix, large ones via multipart"""
+    files = create_files(tmp_path)
+    storage = S3Storage("artifacts", client=s3, multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+    uploads = upload_artifacts(storage, files, prefix="generations/task")
+    
+    for name, path in files.items():
+        result = uploads["files"][name]
+        head = s3.head_object(Bucket="artifacts", Key=f"generations/task/{name}")
+        assert head["ContentLength"] == os.path.getsize(path)
+        assert result["seconds"] >= 0
+        # Downloads go straight to the bucket through presigned URLs
+        url = urlparse(result["url"])
+        assert url.path.endswith(f"/generations/task/{name}")
+        assert "X-Amz-Signature" in parse_qs(url.query)
+    
+    # Multipart objects carry a part-count suffix in their ETag
+    head = s3.head_object(Bucket="artifacts", Key="generations/task/model.glb")
+    assert "-" in head["ETag"]
+    assert "-" not in s3.head_object(Bucket="artifacts", Key="generations/task/preview.mp4")["ETag"]
+    assert head["ContentType"] == "model/gltf-binary"
+    assert uploads["bytes"] == sum(os.path.getsize(path) for path in files.values())
+
+def test_failed_upload_is_reported(s3, tmp_path):
+    """A failing file is reported without aborting the others"""
+    files = create_files(tmp_path)
+    files["missing.glb"] = str(tmp_path / "missing.glb")
+    uploads = upload_artifacts(S3Storage("artifacts", client=s3), files, prefix="generations/task")
+    
+    assert "error" in uploads["files"]["missing.glb"]
+    assert "error" not in uploads["files"]["model.glb"]
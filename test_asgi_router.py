@@ -0,0 +1,82 @@
+"""
+Tests for the raw ASGI apps' router and precomputed responses
+"""
+import asyncio
+import json
+
+import pytest
+
+from asgi_router import Router, StaticResponse, send_json
+
+def call(app, method: str, path: str):
+    """Run one request through an ASGI app, returns (status, headers, body)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app({"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}, receive, send))
+    start, body = messages
+    return start["status"], dict(start["headers"]), body["body"]
+
+@pytest.fixture
+def router():
+    router = Router()
+    router.constant("GET", "/health", {"status": "healthy"})
+
+    @router.route("GET", "/api/v1/task/{task_id}")
+    async def task(scope, receive, send, task_id):
+        await send_json(send, {"task_id": task_id})
+
+    @router.route("GET", "/api/v1/task/{task_id}/files/{name}")
+    async def task_file(scope, receive, send, task_id, name):
+        await send_json(send, {"task_id": task_id, "name": name})
+
+    return router
+
+def test_static_and_parametric_routes(router):
+    status, headers, body = call(router, "GET", "/health")
+    assert status == 200
+    assert json.loads(body) == {"status": "healthy"}
+    assert headers[b"content-length"] == str(len(body)).encode()
+
+    assert json.loads(call(router, "GET", "/api/v1/task/abc")[2]) == {"task_id": "abc"}
+    assert json.loads(call(router, "GET", "/api/v1/task/abc/files/model.glb")[2]) == {"task_id": "abc", "name": "model.glb"}
+
+def test_unmatched_requests_are_404(router):
+    for method, path in (("POST", "/health"), ("GET", "/api/v1/task/"), ("GET", "/api/v1/task/a/b"), ("GET", "/missing")):
+        status, _, body = call(router, method, path)
+        assert status == 404
+        assert json.loads(body) == {"error": "Not found"}
+
+def test_constant_responses_are_encoded_once(router):
+    """Every request replays the same pre-built messages"""
+    handler, params = router.resolve("GET", "/health")
+    assert isinstance(handler, StaticResponse) and params == {}
+    body = handler.body
+    call(router, "GET", "/health")
+    assert router.resolve("GET", "/health")[0].body is body
+
+def test_asgi_simple_routes():
+    asgi_simple = pytest.importorskip("asgi_simple")
+    status, _, body = call(asgi_simple.app, "GET", "/health")
+    assert status == 200
+    assert json.loads(body)["status"] == "healthy"
+    assert call(asgi_simple.app, "GET", "/api/v1/generate")[0] == 404
+    # Only generations in flight can be cancelled
+    assert call(asgi_simple.app, "DELETE", "/api/v1/task/unknown")[0] == 404
+
+def test_asgi_simple_cancel_while_submitting():
+    asgi_simple = pytest.importorskip("asgi_simple")
+    # /run sent, RunPod has not returned the job id yet
+    asgi_simple.remember_job("submitting", asgi_simple.PENDING_JOB)
+    try:
+        status, _, body = call(asgi_simple.app, "DELETE", "/api/v1/task/submitting")
+        assert status == 202 and json.loads(body)["status"] == "cancelling"
+        assert asgi_simple.was_cancelled("submitting")
+    finally:
+        asgi_simple.release_job("submitting")
+    assert not asgi_simple.was_cancelled("submitting")
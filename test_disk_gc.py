@@ -0,0 +1,60 @@
+"""
+Tests for the disk-budgeted artifact sweeper
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from disk_gc import DiskSweeper, sweep_orphans, touch_access
+
+def write(path, size: int, accessed: float):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (accessed, accessed))
+
+def test_budget_evicts_least_recently_accessed_groups(tmp_path):
+    """Whole task groups go, oldest access first, until under budget"""
+    now = time.time()
+    for age, task in ((30000, "old"), (20000, "mid"), (10000, "new")):
+        for name in (f"{task}.glb", f"{task}_lod1.glb", f"{task}.glb.gz"):
+            write(str(tmp_path / name), 100, now - age)
+    # A download of one file keeps the whole "old" group warm
+    touch_access(str(tmp_path / "old.glb.gz"), now - 500)
+
+    stats = DiskSweeper(str(tmp_path), max_bytes=700, min_age=60).sweep(now)
+
+    assert stats["bytes_before"] == 900
+    assert stats["groups_evicted"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["new.glb", "new.glb.gz", "new_lod1.glb", "old.glb", "old.glb.gz", "old_lod1.glb"]
+
+def test_ttl_min_age_and_partial_writes(tmp_path):
+    """Expired groups and stale partial writes go; recent files stay"""
+    now = time.time()
+    write(str(tmp_path / "expired.ply"), 10, now - 7200)
+    write(str(tmp_path / "running.ply"), 10, now - 10)
+    write(str(tmp_path / "objects" / "ab" / ".tmp-123"), 10, now - 7200)
+    write(str(tmp_path / ".tmp-456"), 10, now - 10)
+
+    stats = DiskSweeper(str(tmp_path), ttl_seconds=3600, min_age=60).sweep(now)
+
+    assert stats["orphans_removed"] == 1
+    assert not os.path.exists(tmp_path / "expired.ply")
+    assert os.path.exists(tmp_path / "running.ply")
+    assert os.path.exists(tmp_path / ".tmp-456")
+    assert not os.path.exists(tmp_path / "objects" / "ab" / ".tmp-123")
+
+def test_sweep_orphans(tmp_path):
+    """Only old entries with our prefix are removed"""
+    old = time.time() - 7200
+    write(str(tmp_path / "trellis-job" / "model.glb"), 50, old)
+    os.utime(tmp_path / "trellis-job", (old, old))
+    write(str(tmp_path / "trellis-new.ply"), 5, time.time())
+    write(str(tmp_path / "other.tmp"), 5, old)
+
+    stats = sweep_orphans(str(tmp_path))
+
+    assert stats == {"removed": 1, "bytes_freed": 50}
+    assert sorted(os.listdir(tmp_path)) == ["other.tmp", "trellis-new.ply"]
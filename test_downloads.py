@@ -0,0 +1,168 @@
+"""
+Tests for artifact downloads: Range, ETag revalidation, cache headers and
+precompressed variants
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+import app.core.downloads as downloads
+import app.core.signed_files as signed_files
+import app.core.storage as storage_module
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+
+from artifact_storage import LocalStorage, sign_key, verify_signature
+
+PLACEHOLDER_SECRET = "your-secret-key-here"  # Default JWT_SECRET_KEY
+
+DATA = bytes(range(256)) * 64
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    storage.put_bytes("task.glb", DATA)
+    monkeypatch.setattr(downloads, "get_storage", lambda: storage)
+    
+    async def download(request):
+        return await downloads.artifact_response(request, "task.glb", "model.glb", "model/gltf-binary")
+    
+    return Starlette(routes=[Route("/glb", download, methods=["GET", "HEAD"])])
+
+def get(app, headers=None, method="GET", url="/glb"):
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # httpx asks for gzip by default, compare raw bytes unless a test opts in
+            return await client.request(method, url, headers={"Accept-Encoding": "identity", **(headers or {})})
+    return asyncio.run(request())
+
+def test_full_download_headers(app):
+    response = get(app)
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"]
+
+def test_byte_ranges(app):
+    response = get(app, {"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == DATA[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+    
+    assert get(app, {"Range": "bytes=-10"}).content == DATA[-10:]
+    assert get(app, {"Range": f"bytes={len(DATA)}-"}).status_code == 416
+    # Multiple ranges fall back to the full body
+    assert get(app, {"Range": "bytes=0-1,5-6"}).status_code == 200
+
+def test_zero_copy_send(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    info = storage.put_bytes("task.glb", DATA)
+    response = downloads.ArtifactResponse(storage, info, (100, 50), headers={}, media_type="model/gltf-binary")
+    scope = {"type": "http", "method": "GET", "extensions": {downloads.ZEROCOPY_EXTENSION: {}}}
+    sent = []
+
+    async def send(message):
+        if message["type"] == downloads.ZEROCOPY_EXTENSION:
+            f = message["file"]
+            f.seek(message["offset"])
+            message = {**message, "data": f.read(message["count"])}
+        sent.append(message)
+
+    asyncio.run(response(scope, None, send))
+    assert sent[0]["status"] == 206
+    assert sent[1]["data"] == DATA[100:150]
+
+def test_etag_revalidation(app):
+    etag = get(app, method="HEAD").headers["etag"]
+    assert get(app, {"If-None-Match": etag}).status_code == 304
+    assert get(app, {"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
+
+def test_precompressed_variant(app, tmp_path):
+    response = get(app, {"Accept-Encoding": "br;q=0.5, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "accept-encoding"
+    assert response.content == DATA
+    
+    # The variant is stored next to the original and reused
+    variant = tmp_path / "task.glb.gz"
+    mtime = variant.stat().st_mtime_ns
+    assert variant.stat().st_size < len(DATA)
+    assert get(app, {"Accept-Encoding": "gzip"}).headers["etag"] == response.headers["etag"]
+    assert variant.stat().st_mtime_ns == mtime
+    
+    assert "content-encoding" not in get(app, {"Accept-Encoding": "identity"}).headers
+    
+    # Ranges always address the identity bytes, whatever the browser accepts
+    ranged = get(app, {"Accept-Encoding": "gzip", "Range": "bytes=100-199"})
+    assert ranged.status_code == 206 and "content-encoding" not in ranged.headers
+    assert ranged.content == DATA[100:200]
+
+def test_signed_file_urls(tmp_path, monkeypatch):
+    """Presigned local URLs are served by the file server only while valid"""
+    storage = LocalStorage(str(tmp_path), base_url="http://test/files", signing_key="secret")
+    storage.put_bytes("generations/task.glb", DATA)
+    monkeypatch.setattr(downloads, "get_storage", lambda: storage)
+    monkeypatch.setattr(signed_files, "signing_key", lambda: "secret")
+    app = Starlette(routes=[Mount("/files", signed_files.app)])
+    
+    url = storage.presigned_url("generations/task.glb", filename="model.glb")
+    # Expiries are rounded, so repeated status polls hand out the same URL
+    assert url == storage.presigned_url("generations/task.glb", filename="model.glb")
+    response = get(app, url=url)
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert 'filename="model.glb"' in response.headers["content-disposition"]
+    assert get(app, {"Range": "bytes=0-9"}, url=url).content == DATA[:10]
+    
+    assert get(app, url=url.replace("model.glb", "other.glb")).status_code == 403
+    assert get(app, url=url.replace("task.glb", "other.glb", 1)).status_code == 403
+    assert get(app, url=storage.presigned_url("generations/task.glb", expires_in=-600)).status_code == 403
+    assert LocalStorage(str(tmp_path)).presigned_url("generations/task.glb") is None
+
+def test_signed_direct_upload(tmp_path, monkeypatch):
+    """Signed PUT targets accept one upload of the declared type and size"""
+    storage = LocalStorage(str(tmp_path), base_url="http://test/files", signing_key="secret")
+    monkeypatch.setattr(signed_files, "get_storage", lambda: storage)
+    monkeypatch.setattr(signed_files, "signing_key", lambda: "secret")
+    app = Starlette(routes=[Mount("/files", signed_files.app)])
+    
+    def put(upload, body, content_type="image/png"):
+        async def request():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.put(upload["url"], content=body, headers={"Content-Type": content_type})
+        return asyncio.run(request())
+    
+    upload = storage.presigned_upload("uploads/photo.png", "image/png", max_bytes=len(DATA))
+    assert upload["method"] == "PUT"
+    assert put(upload, DATA, "image/jpeg").status_code == 400
+    assert put(upload, DATA + b"x").status_code == 413
+    assert put(upload, DATA).status_code == 201
+    assert storage.get_bytes("uploads/photo.png") == DATA
+    
+    # Upload signatures do not grant downloads, and the other way round
+    assert get(app, url=upload["url"]).status_code == 403
+    assert put({"url": storage.presigned_url("uploads/photo.png")}, DATA).status_code == 403
+    
+    # Signed or not, nothing outside uploads/ is writable
+    artifact = storage.presigned_upload("generations/task.glb", "image/png", max_bytes=len(DATA))
+    assert put(artifact, DATA).status_code == 403
+    assert not storage.exists("generations/task.glb")
+
+def test_placeholder_secret_signs_nothing(tmp_path, monkeypatch):
+    """The sample JWT_SECRET_KEY neither signs URLs nor verifies them"""
+    monkeypatch.setattr(storage_module.settings, "ARTIFACT_SIGNING_KEY", None)
+    monkeypatch.setattr(storage_module.settings, "JWT_SECRET_KEY", PLACEHOLDER_SECRET)
+    assert storage_module.signing_key() is None
+    
+    forged = LocalStorage(str(tmp_path), base_url="http://test/files", signing_key=PLACEHOLDER_SECRET)
+    assert forged.presigned_url("generations/task.glb") is None
+    expires = int(time.time()) + 600
+    signature = sign_key(PLACEHOLDER_SECRET, "GET", "task.glb", expires, "")
+    assert not verify_signature(PLACEHOLDER_SECRET, "GET", "task.glb", str(expires), signature, "")
@@ -0,0 +1,166 @@
+"""
+Tests for the bounded, priority / fair-share generation scheduler
+"""
+import asyncio
+
+import pytest
+
+from app.services.generation_scheduler import (
+    FREE, PREMIUM, FairShareQueue, GenerationScheduler, QueuedJob, QueueFull, percentile
+)
+
+def test_concurrency_is_bounded_and_fifo():
+    """Never more than max_concurrent jobs run, waiting jobs start in arrival order"""
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=2, max_queued=10)
+        running, peak, started = [0], [0], []
+        
+        def job(task_id):
+            async def run():
+                started.append(task_id)
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.01)
+                running[0] -= 1
+            return run
+        
+        positions = [await scheduler.submit(f"t{i}", job(f"t{i}")) for i in range(6)]
+        # Workers have not picked anything up yet, positions count from the head
+        assert positions == [1, 2, 3, 4, 5, 6]
+        await asyncio.sleep(0)
+        assert scheduler.position("t0") is None and scheduler.position("t5") == 4
+        while scheduler.counters["completed"] < 6:
+            await asyncio.sleep(0.005)
+        metrics = scheduler.metrics()
+        await scheduler.shutdown()
+        return peak[0], started, metrics
+    
+    peak, started, metrics = asyncio.run(scenario())
+    assert peak == 2
+    assert started == [f"t{i}" for i in range(6)]
+    assert metrics["queue_depth"] == 0 and metrics["running"] == 0
+    assert metrics["wait_seconds"]["samples"] == 6
+    assert metrics["wait_seconds"]["p95"] >= metrics["wait_seconds"]["p50"] >= 0
+
+def test_full_queue_rejects_and_failures_are_counted():
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1, max_queued=2)
+        gate = asyncio.Event()
+        
+        async def blocked():
+            await gate.wait()
+        
+        async def failing():
+            raise RuntimeError("boom")
+        
+        await scheduler.submit("running", blocked)
+        await asyncio.sleep(0)  # The worker takes it, the queue is empty again
+        await scheduler.submit("a", failing)
+        await scheduler.submit("b", failing)
+        with pytest.raises(QueueFull):
+            await scheduler.submit("c", failing)
+        gate.set()
+        while scheduler.counters["failed"] < 2:
+            await asyncio.sleep(0.001)
+        await scheduler.shutdown()
+        return scheduler.counters
+    
+    counters = asyncio.run(scenario())
+    assert counters == {
+        "submitted": 3, "rejected": 1, "cancelled": 0, "expired": 0, "lost": 0, "completed": 1, "failed": 2
+    }
+
+def _job(task_id, priority=FREE, user_id="anonymous"):
+    return QueuedJob(task_id, None, 0.0, priority, user_id)
+
+def test_premium_first_and_users_take_turns():
+    """Premium before free; within a class a bulk uploader alternates with everyone else"""
+    queue = FairShareQueue()
+    for i in range(4):
+        queue.push(_job(f"bulk{i}", user_id="bulk"))
+    queue.push(_job("alice0", user_id="alice"))
+    queue.push(_job("alice1", user_id="alice"))
+    queue.push(_job("vip0", PREMIUM, "vip"))
+    
+    expected = ["vip0", "bulk0", "alice0", "bulk1", "alice1", "bulk2", "bulk3"]
+    assert [job.task_id for job in queue.order()] == expected
+    assert queue.position("alice0") == 3 and queue.position("missing") is None
+    assert [queue.pop().task_id for _ in range(len(queue))] == expected
+
+def test_weighted_users_take_longer_turns():
+    """A user weighted 3 takes three jobs per turn, the others one"""
+    queue = FairShareQueue(weights={"partner": 3})
+    for i in range(3):
+        queue.push(_job(f"bulk{i}", user_id="bulk"))
+    for i in range(5):
+        queue.push(_job(f"partner{i}", user_id="partner"))
+    
+    expected = ["bulk0", "partner0", "partner1", "partner2", "bulk1", "partner3", "partner4", "bulk2"]
+    assert [job.task_id for job in queue.order()] == expected
+    assert queue.position("partner3") == 6 and queue.position("bulk2") == 8
+    assert [queue.pop().task_id for _ in range(len(queue))] == expected
+
+def test_scheduler_takes_user_weights():
+    scheduler = GenerationScheduler(1, user_weights={"partner": 2})
+    assert scheduler.queue.weights == {"partner": 2}
+
+def test_positions_match_the_pop_order():
+    queue = FairShareQueue(weights={"bulk": 4, "b": 2})
+    for i in range(50):
+        queue.push(_job(f"bulk{i}", user_id="bulk"))
+    for user in ("a", "b", "c"):
+        for i in range(3):
+            queue.push(_job(f"{user}{i}", user_id=user))
+    queue.push(_job("vip0", PREMIUM, "vip"))
+    queue.pop()
+    queue.pop()  # The head user has used part of its turn
+    
+    order = [job.task_id for job in queue.order()]
+    popped = []
+    while queue:
+        current = [job.task_id for job in queue.order()]
+        assert [queue.position(task_id) for task_id in current] == list(range(1, len(current) + 1))
+        popped.append(queue.pop().task_id)
+    assert popped == order
+
+def test_cancelled_jobs_leave_the_queue():
+    queue = FairShareQueue()
+    for task_id, user_id in (("a0", "a"), ("b0", "b"), ("a1", "a"), ("b1", "b")):
+        queue.push(_job(task_id, user_id=user_id))
+    
+    assert queue.remove("b0").task_id == "b0" and queue.remove("b0") is None
+    assert queue.remove("a1").task_id == "a1"
+    assert [job.task_id for job in queue.order()] == ["a0", "b1"]
+    assert queue.remove("a0") and queue.remove("b1")
+    assert len(queue) == 0 and not queue.classes[FREE]
+
+def test_class_wait_stats_and_slo():
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1, slo_seconds={PREMIUM: 5.0, FREE: 0.0})
+        
+        async def quick():
+            await asyncio.sleep(0.01)
+        
+        with pytest.raises(ValueError):
+            await scheduler.submit("x", quick, priority="gold")
+        for i in range(3):
+            await scheduler.submit(f"f{i}", quick, priority=FREE, user_id="bulk")
+        await asyncio.sleep(0)  # f0 starts
+        await scheduler.submit("p0", quick, priority=PREMIUM, user_id="vip")
+        assert scheduler.position("p0") == 1
+        while scheduler.counters["completed"] < 4:
+            await asyncio.sleep(0.005)
+        await scheduler.shutdown()
+        return scheduler.metrics()
+    
+    metrics = asyncio.run(scenario())
+    premium, free = metrics["classes"][PREMIUM], metrics["classes"][FREE]
+    assert premium["wait_seconds"]["samples"] == 1 and free["wait_seconds"]["samples"] == 3
+    assert premium["slo_seconds"] == 5.0 and premium["slo"] == {"met": 1, "missed": 0}
+    assert free["slo"] == {"met": 0, "missed": 3}
+    assert metrics["wait_seconds"]["samples"] == 4
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3.0, 1.0, 2.0, 4.0], 0.5) == 2.0
+    assert percentile(list(range(1, 101)), 0.95) == 95
@@ -0,0 +1,62 @@
+"""
+Tests for the quantized / meshopt-compressed GLB export
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from glb_export import export_glb
+from glb_io import unpack_glb
+from meshopt_codec import encode_index_sequence, encode_vertex_buffer
+
+def create_grid(size: int = 40):
+    """Create a flat triangulated grid"""
+    xs, ys = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 2, size))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(size * size)], axis=1)
+    cells = np.arange(size * size).reshape(size, size)[:-1, :-1].ravel()
+    faces = np.concatenate([
+        np.stack([cells, cells + 1, cells + size], axis=1),
+        np.stack([cells + 1, cells + size + 1, cells + size], axis=1),
+    ])
+    return vertices, faces
+
+def test_quantized_positions_roundtrip():
+    """Dequantized positions stay within one quantization step"""
+    vertices, faces = create_grid()
+    gltf, binary = unpack_glb(export_glb(vertices, faces, compress=False))
+    
+    accessor = gltf["accessors"][0]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    data = np.frombuffer(binary, np.int16, count=accessor["count"] * 4, offset=view["byteOffset"])
+    node = gltf["nodes"][0]
+    positions = data.reshape(-1, 4)[:, :3] * node["scale"][0] + node["translation"]
+    
+    assert "KHR_mesh_quantization" in gltf["extensionsRequired"]
+    assert np.allclose(np.sort(positions, axis=0), np.sort(vertices, axis=0), atol=node["scale"][0])
+
+def test_meshopt_buffers_use_fallback():
+    """Compressed views point at the fallback buffer and carry the extension"""
+    vertices, faces = create_grid()
+    gltf, _ = unpack_glb(export_glb(vertices, faces, compress=True))
+    
+    assert gltf["buffers"][1]["extensions"]["EXT_meshopt_compression"]["fallback"]
+    for view in gltf["bufferViews"]:
+        assert view["buffer"] == 1
+        assert view["extensions"]["EXT_meshopt_compression"]["mode"] in ("ATTRIBUTES", "INDICES")
+
+def test_codec_matches_reference_decoder():
+    """Encoded streams decode with the reference meshoptimizer implementation"""
+    meshoptimizer = pytest.importorskip("meshoptimizer")
+    rng = np.random.default_rng(0)
+    vertices = (np.cumsum(rng.integers(-4, 5, (5000, 8)), axis=0) % 256).astype(np.uint8)
+    indices = rng.integers(0, 5000, 3000).astype(np.uint32)
+    
+    decoded = meshoptimizer.decode_vertex_buffer(len(vertices), 8, encode_vertex_buffer(vertices))
+    assert np.frombuffer(decoded.tobytes(), np.uint8)[:vertices.size].tolist() == vertices.ravel().tolist()
+    
+    decoded = meshoptimizer.decode_index_sequence(len(indices), 4, encode_index_sequence(indices))
+    assert np.frombuffer(decoded.tobytes(), np.uint32)[:len(indices)].tolist() == indices.tolist()
@@ -0,0 +1,83 @@
+"""
+Tests for the zero-copy GLB inspector
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+import trimesh
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from glb_export import export_glb
+from glb_inspect import inspect_glb
+from database import GenerationTask
+
+def create_box():
+    box = trimesh.creation.box(extents=[2.0, 4.0, 6.0])
+    box.apply_translation([1.0, 0.0, 0.0])
+    return box
+
+def test_inspect_plain_and_quantized(tmp_path):
+    """Counts and bounds match the mesh for trimesh and quantized exports"""
+    box = create_box()
+    glb_path = tmp_path / "box.glb"
+    glb_path.write_bytes(box.export(file_type="glb"))
+    
+    for stats in (inspect_glb(str(glb_path)), inspect_glb(export_glb(box.vertices, box.faces))):
+        assert stats["vertex_count"] == len(box.vertices)
+        assert stats["face_count"] == len(box.faces)
+        assert np.allclose(stats["bbox_min"], box.bounds[0], atol=1e-3)
+        assert np.allclose(stats["bbox_max"], box.bounds[1], atol=1e-3)
+    assert inspect_glb(str(glb_path))["file_size"] == glb_path.stat().st_size
+
+def test_instances_and_node_transforms():
+    """Every instance is counted and bounds follow node transforms"""
+    box = create_box()
+    scene = trimesh.Scene()
+    scene.add_geometry(box, node_name="a")
+    scene.add_geometry(box, node_name="b", transform=trimesh.transformations.translation_matrix([10.0, 0.0, 0.0]))
+    stats = inspect_glb(scene.export(file_type="glb"))
+    
+    assert stats["face_count"] == 2 * len(box.faces)
+    assert np.allclose(stats["bbox_max"], [12.0, 2.0, 3.0])
+
+def test_task_columns_roundtrip():
+    """Stats are stored in GenerationTask columns"""
+    task = GenerationTask(id="task", original_image_url="image.jpg")
+    task.apply_glb_stats(inspect_glb(export_glb(create_box().vertices, create_box().faces)))
+    
+    stats = task.glb_stats()
+    assert stats["face_count"] == 12
+    assert stats["file_size_mb"] is not None
+    assert np.allclose(stats["bbox_min"], [-0.0, -2.0, -3.0], atol=1e-3)
+
+def test_completed_task_stores_stats_and_indexes(tmp_path, monkeypatch):
+    """Worker stats land in the columns the task list filters on, indexed on old databases too"""
+    import database
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.orm import sessionmaker
+    
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    with engine.begin() as connection:
+        # A table from before the stats columns existed
+        connection.execute(text("CREATE TABLE generation_tasks (id VARCHAR PRIMARY KEY, status VARCHAR, original_image_url VARCHAR NOT NULL, created_at DATETIME)"))
+    monkeypatch.setattr(database, "engine", engine)
+    database.init_database()
+    indexes = {index["name"] for index in inspect(engine).get_indexes("generation_tasks")}
+    assert {"ix_generation_tasks_face_count", "ix_generation_tasks_vertex_count"} <= indexes
+    
+    asgi_app = pytest.importorskip("asgi_app")
+    session = sessionmaker(bind=engine)
+    monkeypatch.setattr(asgi_app, "SessionLocal", session)
+    with session() as db:
+        db.add(GenerationTask(id="task", original_image_url="image.jpg", status="processing"))
+        db.commit()
+    glb = export_glb(create_box().vertices, create_box().faces)
+    asgi_app.complete_task("task", {"glb_path_url": "https://cdn/model.glb", "glb_stats": inspect_glb(glb)})
+    
+    with session() as db:
+        task = db.get(GenerationTask, "task")
+        assert task.status == "completed" and task.glb_file_url == "https://cdn/model.glb"
+        assert db.query(GenerationTask).filter(GenerationTask.face_count >= 12).count() == 1
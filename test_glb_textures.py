@@ -0,0 +1,67 @@
+"""
+Tests for re-encoding textures inside GLB files
+"""
+import io
+import os
+import sys
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from glb_export import export_trimesh_glb
+from glb_io import unpack_glb
+from glb_textures import reencode_glb_textures
+
+def create_textured_mesh(texture_size: int = 512):
+    """Textured icosphere with a noisy texture, similar to a baked one"""
+    sphere = trimesh.creation.icosphere(subdivisions=3)
+    pixels = np.random.default_rng(0).integers(0, 255, (texture_size, texture_size, 3), dtype=np.uint8)
+    material = trimesh.visual.material.PBRMaterial(baseColorTexture=Image.fromarray(pixels))
+    return trimesh.Trimesh(
+        vertices=sphere.vertices,
+        faces=sphere.faces,
+        visual=trimesh.visual.TextureVisuals(uv=sphere.vertices[:, :2] * 0.5 + 0.5, material=material),
+        process=False
+    )
+
+def embedded_image(glb: bytes, index: int = 0) -> Image.Image:
+    gltf, binary = unpack_glb(glb)
+    view = gltf["bufferViews"][gltf["images"][index]["bufferView"]]
+    offset = view.get("byteOffset", 0)
+    return Image.open(io.BytesIO(binary[offset:offset + view["byteLength"]]))
+
+def test_jpeg_downscale_keeps_geometry():
+    """Texture is shrunk and re-encoded while the mesh loads unchanged"""
+    mesh = create_textured_mesh()
+    glb, stats = reencode_glb_textures(mesh.export(file_type="glb"), "jpeg", quality=80, max_size=256)
+    
+    image = embedded_image(glb)
+    assert image.format == "JPEG" and image.size == (256, 256)
+    assert stats["bytes_after"] < stats["bytes_before"]
+    
+    loaded = trimesh.load(io.BytesIO(glb), file_type="glb")
+    geometry = next(iter(loaded.geometry.values()))
+    assert np.allclose(geometry.vertices, mesh.vertices)
+
+def test_webp_in_meshopt_glb():
+    """WebP images use EXT_texture_webp and compressed views stay addressable"""
+    source = export_trimesh_glb(create_textured_mesh(), compress=True)
+    glb, stats = reencode_glb_textures(source, "webp", quality=75)
+    
+    gltf, binary = unpack_glb(glb)
+    assert "EXT_texture_webp" in gltf["extensionsRequired"]
+    assert gltf["textures"][0]["extensions"]["EXT_texture_webp"]["source"] == 0
+    assert embedded_image(glb).format == "WEBP"
+    
+    # Compressed vertex streams are copied verbatim to their new offsets
+    before, before_binary = unpack_glb(source)
+    for old, new in zip(before["bufferViews"], gltf["bufferViews"]):
+        old_ext = old.get("extensions", {}).get("EXT_meshopt_compression")
+        if old_ext:
+            new_ext = new["extensions"]["EXT_meshopt_compression"]
+            assert bytes(before_binary[old_ext["byteOffset"]:old_ext["byteOffset"] + old_ext["byteLength"]]) == \
+                bytes(binary[new_ext["byteOffset"]:new_ext["byteOffset"] + new_ext["byteLength"]])
+    assert len(binary) <= gltf["buffers"][0]["byteLength"] + 3
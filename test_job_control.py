@@ -0,0 +1,67 @@
+"""
+Tests for cooperative job cancellation and deadlines
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from artifact_storage import LocalStorage
+from job_control import (
+    PENDING_JOB, DeadlineExceeded, JobCancelled, JobControl, JobStopped, cancel_key, deadline_after, forget_job,
+    lookup_job, record_job, request_cancel
+)
+
+def test_marker_stops_the_job_at_the_next_check(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    control = JobControl("task-1", storage, poll_interval=0)
+    control.check("inference")
+    
+    request_cancel(storage, "task-1")
+    assert storage.exists(cancel_key("task-1"))
+    with pytest.raises(JobCancelled) as raised:
+        control.check("export")
+    assert raised.value.task_id == "task-1" and raised.value.stage == "export"
+    
+    # Other tasks are unaffected
+    JobControl("task-2", storage, poll_interval=0).check("export")
+
+def test_lookups_are_throttled(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    control = JobControl("task-1", storage, poll_interval=3600)
+    control.check("inference")
+    request_cancel(storage, "task-1")
+    # Seen at the next lookup, not before the poll interval has passed
+    control.check("export")
+    control._checked_at -= 3600
+    with pytest.raises(JobCancelled):
+        control.check("preview")
+
+def test_without_storage_nothing_is_cancelled():
+    JobControl("task-1").check("inference")
+
+def test_expired_jobs_stop_with_a_timeout_code(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    JobControl("task-1", storage, deadline=deadline_after(60)).check("image download")
+    
+    request_cancel(storage, "task-1")
+    control = JobControl("task-1", storage, deadline=time.time() - 1)
+    # Past the deadline the job stops as timed out, whatever else happened to it
+    with pytest.raises(DeadlineExceeded) as raised:
+        control.check("image download")
+    assert isinstance(raised.value, JobStopped)
+    assert raised.value.error_code == "timeout" and "timed out before image download" in str(raised.value)
+
+def test_job_mapping_is_shared_through_storage(tmp_path):
+    # Two API processes on the same storage
+    recorded_by, read_by = LocalStorage(str(tmp_path)), LocalStorage(str(tmp_path))
+    assert lookup_job(read_by, "task-1") is None
+    record_job(recorded_by, "task-1", PENDING_JOB)
+    assert lookup_job(read_by, "task-1") == PENDING_JOB
+    record_job(recorded_by, "task-1", "runpod-job-7")
+    assert lookup_job(read_by, "task-1") == "runpod-job-7"
+    forget_job(recorded_by, "task-1")
+    assert lookup_job(read_by, "task-1") is None
@@ -0,0 +1,210 @@
+"""
+Tests for the durable generation job queue
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.services.job_queue as job_queue
+from app.models.generation import GenerationStatus, GenerationTask
+from app.services.generation_service import GenerationService
+from app.services.task_store import MemoryTaskStore
+from ml_server.artifact_storage import LocalStorage
+from ml_server.job_control import DeadlineExceeded
+
+def make_queue(url, lease_seconds=60.0):
+    engine = create_engine(url)
+    return job_queue.JobQueue(lease_seconds, sessionmaker(bind=engine), engine)
+
+@pytest.fixture
+def database(tmp_path):
+    return f"sqlite:///{tmp_path / 'jobs.db'}"
+
+def test_concurrent_claims_never_share_a_job(database):
+    # Separate engines, like separate processes
+    queues = [make_queue(database) for _ in range(4)]
+
+    async def scenario():
+        for n in range(40):
+            await queues[0].enqueue(f"task-{n}")
+        claims = await asyncio.gather(*(
+            queue.claim(f"worker-{i}", limit=3) for _ in range(5) for i, queue in enumerate(queues)
+        ))
+        claimed = [job.task_id for jobs in claims for job in jobs]
+        assert len(claimed) == len(set(claimed)) == 40
+        assert all(job.attempts == 1 for jobs in claims for job in jobs)
+
+    asyncio.run(scenario())
+
+def test_claims_take_higher_classes_then_older_jobs(database):
+    queue = make_queue(database)
+
+    async def scenario():
+        await queue.enqueue("free-1", "free")
+        await queue.enqueue("premium-1", "premium")
+        await queue.enqueue("free-2", "free")
+        jobs = await queue.claim("worker-a", limit=2)
+        assert [job.task_id for job in jobs] == ["premium-1", "free-1"]
+        assert [job.task_id for job in await queue.claim("worker-a", limit=5)] == ["free-2"]
+        assert await queue.claim("worker-a") == []
+
+    asyncio.run(scenario())
+
+def test_expired_leases_are_claimed_again(database):
+    a, b = make_queue(database, lease_seconds=0.2), make_queue(database, lease_seconds=0.2)
+
+    async def scenario():
+        await a.enqueue("task-1", worker="worker-a")
+        assert await b.claim("worker-b") == []
+        # Heartbeats keep the lease
+        await asyncio.sleep(0.15)
+        assert await a.heartbeat("worker-a", ["task-1"]) == {"task-1"}
+        await asyncio.sleep(0.1)
+        assert await b.claim("worker-b") == []
+        # Silent past the lease: the job moves, as a new attempt
+        await asyncio.sleep(0.25)
+        [job] = await b.claim("worker-b")
+        assert job.task_id == "task-1" and job.attempts == 2
+        assert await a.heartbeat("worker-a", ["task-1"]) == set()
+        assert not await a.finish("task-1", worker="worker-a")
+        assert await b.finish("task-1", worker="worker-b")
+        assert await b.claim("worker-b") == []
+
+    asyncio.run(scenario())
+
+def test_only_named_jobs_are_renewed(database):
+    a, b = make_queue(database, lease_seconds=0.2), make_queue(database, lease_seconds=0.2)
+
+    async def scenario():
+        await a.enqueue("running", worker="worker-a")
+        await a.enqueue("left-behind", worker="worker-a")  # Its finish failed
+        await asyncio.sleep(0.15)
+        assert await a.heartbeat("worker-a", ["running"]) == {"running"}
+        await asyncio.sleep(0.1)
+        assert [job.task_id for job in await b.claim("worker-b", limit=5)] == ["left-behind"]
+
+    asyncio.run(scenario())
+
+def test_released_jobs_are_claimable_right_away(database):
+    a, b = make_queue(database), make_queue(database)
+
+    async def scenario():
+        await a.enqueue("task-1", worker="worker-a")
+        await a.enqueue("task-2", worker="worker-a")
+        assert await a.release("worker-a", "Replica shut down") == 2
+        jobs = await b.claim("worker-b", limit=5)
+        assert {job.task_id for job in jobs} == {"task-1", "task-2"}
+        assert all(job.attempts == 2 and job.last_error == "Replica shut down" for job in jobs)
+
+    asyncio.run(scenario())
+
+@pytest.fixture
+def service(database, tmp_path, monkeypatch):
+    """A GenerationService on a shared job queue whose pipeline only records runs"""
+    runs = []
+
+    async def process(self, task_id):
+        runs.append(task_id)
+        await self._finish_job(task_id)
+
+    monkeypatch.setattr(GenerationService, "_process_generation", process)
+    monkeypatch.setattr(job_queue.settings, "JOB_MAX_ATTEMPTS", 2)
+    store = MemoryTaskStore("replica-b")
+    service = GenerationService(
+        None, LocalStorage(str(tmp_path / "artifacts")), store=store, jobs=make_queue(database, lease_seconds=0.1)
+    )
+    return service, store, runs
+
+def abandoned_task(store, task_id, status=GenerationStatus.PROCESSING):
+    task = GenerationTask(task_id=task_id, status=status, created_at=datetime.utcnow(), owner="replica-a")
+    return store.add(task)
+
+def test_abandoned_jobs_run_again_on_another_replica(service, database):
+    service, store, runs = service
+    dead = make_queue(database, lease_seconds=0.1)
+
+    async def scenario():
+        await abandoned_task(store, "task-1")
+        await dead.enqueue("task-1", worker="replica-a")
+        assert await service.recover_jobs() == 0  # Lease still valid
+        time.sleep(0.15)
+        assert await service.recover_jobs() == 1
+        task = await store.get("task-1")
+        assert task.owner == "replica-b" and task.status == GenerationStatus.PENDING
+        await asyncio.sleep(0.05)
+        assert runs == ["task-1"]
+        assert await service.jobs.claim("replica-c") == []
+        await service.shutdown()
+
+    asyncio.run(scenario())
+
+def test_finished_or_repeatedly_interrupted_jobs_are_not_rerun(service, database):
+    service, store, runs = service
+    dead = make_queue(database, lease_seconds=0.1)
+
+    async def scenario():
+        await abandoned_task(store, "done", status=GenerationStatus.COMPLETED)
+        await dead.enqueue("done", worker="replica-a")
+        await abandoned_task(store, "crashy")
+        await dead.enqueue("crashy", worker="replica-a")
+        await dead.release("replica-a")  # Attempt 2 when claimed
+        await dead.claim("replica-a", limit=5)
+        time.sleep(0.15)
+        assert await service.recover_jobs() == 0
+        crashy = await store.get("crashy")
+        assert crashy.status == GenerationStatus.FAILED and crashy.error_code == "interrupted"
+        assert (await store.get("done")).status == GenerationStatus.COMPLETED
+        assert runs == []
+        assert await service.jobs.claim("replica-c", limit=5) == []
+
+    asyncio.run(scenario())
+
+def test_lost_leases_stop_the_local_run(service, database):
+    service, store, runs = service
+    service.scheduler.max_concurrent = 1
+    other = make_queue(database, lease_seconds=0.1)
+
+    async def scenario():
+        # A job waiting here and one running here, both taken over elsewhere
+        await service.jobs.enqueue("queued", worker="replica-b")
+        await service.jobs.enqueue("running", worker="replica-b")
+        blocked = asyncio.Event()
+        await service.scheduler.submit("running", blocked.wait)
+        await service.scheduler.submit("queued", blocked.wait)
+        await asyncio.sleep(0)
+        time.sleep(0.15)
+        await other.claim("replica-c", limit=5)
+
+        assert await service.renew_leases() == {"queued", "running"}
+        assert service.scheduler.position("queued") is None and service.scheduler.counters["lost"] == 1
+        await abandoned_task(store, "running")
+        with pytest.raises(job_queue.LeaseLost):
+            await service._checkpoint(await store.get("running"), "export")
+        blocked.set()
+        await service.scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+def test_overdue_running_tasks_time_out(service):
+    service, store, runs = service
+
+    async def scenario():
+        task = GenerationTask(
+            task_id="hung",
+            status=GenerationStatus.PROCESSING,
+            created_at=datetime.utcnow(),
+            owner="replica-a",
+            deadline_at=datetime.utcnow() + timedelta(seconds=0.1)
+        )
+        await store.add(task)
+        with pytest.raises(DeadlineExceeded):
+            await service._before_deadline(task, "generation", asyncio.sleep(5))
+        status = await service.get_status("hung")
+        assert status.status == GenerationStatus.FAILED and status.error_code == "timeout"
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+"""
+Tests for the fast JSON codec
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+import json_codec
+
+def test_round_trip_matches_stdlib():
+    payload = {"task_id": "abc", "result": {"glb_path_base64": "QUJD" * 1000, "stats": [1, 2.5, None, True]}}
+    encoded = json_codec.dumps(payload)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == payload
+    assert json_codec.loads(encoded) == payload
+    assert json_codec.loads(encoded.decode()) == payload
+
+def test_encodes_datetimes_and_numpy():
+    """Types the services put in responses encode the same on every backend"""
+    payload = {
+        "created_at": datetime(2024, 5, 1, 12, 30),
+        "face_count": np.int64(96000),
+        "bounds": np.array([[-0.5, 0.0], [0.5, 1.0]], dtype=np.float32),
+    }
+    decoded = json.loads(json_codec.dumps(payload))
+    assert decoded["created_at"].startswith("2024-05-01T12:30:00")
+    assert decoded["face_count"] == 96000
+    assert decoded["bounds"] == [[-0.5, 0.0], [0.5, 1.0]]
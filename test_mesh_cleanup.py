@@ -0,0 +1,53 @@
+"""
+Tests for the vectorized mesh cleanup pass
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from mesh_cleanup import clean_mesh, vertex_normals
+
+def create_split_grid(size: int = 20):
+    """Flat grid where every triangle has its own copy of its corners"""
+    xs, ys = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 1, size))
+    grid = np.stack([xs.ravel(), ys.ravel(), np.zeros(size * size)], axis=1)
+    cells = np.arange(size * size).reshape(size, size)[:-1, :-1].ravel()
+    faces = np.concatenate([
+        np.stack([cells, cells + 1, cells + size], axis=1),
+        np.stack([cells + 1, cells + size + 1, cells + size], axis=1),
+    ])
+    return grid[faces.reshape(-1)], np.arange(faces.size).reshape(-1, 3), len(grid)
+
+def test_weld_restores_shared_vertices():
+    """Split corners are welded back to the shared grid vertices"""
+    vertices, faces, grid_vertices = create_split_grid()
+    V, F, vertex_map, stats = clean_mesh(vertices, faces)
+    
+    assert len(V) == grid_vertices
+    assert len(F) == len(faces)
+    assert np.array_equal(V, vertices[vertex_map])
+    assert np.allclose(np.abs(vertex_normals(V, F)[:, 2]), 1.0)
+    assert stats["vertices_welded"] == len(vertices) - grid_vertices
+
+def test_removes_degenerate_duplicate_and_islands():
+    """Degenerate faces, duplicates and tiny islands are dropped"""
+    vertices, faces, _ = create_split_grid()
+    island = np.array([[5.0, 5.0, 5.0], [5.001, 5.0, 5.0], [5.0, 5.001, 5.0]])
+    vertices = np.concatenate([vertices, island])
+    n = len(faces) * 3
+    faces = np.concatenate([
+        faces,
+        faces[:3][:, ::-1],                # duplicates with flipped winding
+        [[0, 0, 1], [0, 1, 1]],            # degenerate
+        [[n, n + 1, n + 2]],               # island
+    ])
+    V, F, _, stats = clean_mesh(vertices, faces)
+    
+    assert stats["duplicate_faces_removed"] == 3
+    assert stats["degenerate_faces_removed"] == 2
+    assert stats["components_removed"] == 1
+    assert len(F) == stats["faces_before"] - 6
+    assert V[:, 0].max() <= 1.0
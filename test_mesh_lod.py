@@ -0,0 +1,43 @@
+"""
+Tests for GLB mesh decimation and LOD chain generation
+"""
+import numpy as np
+
+from app.services.mesh_lod import quadric_decimate
+
+def create_sphere(subdivisions: int = 5):
+    """Create an icosphere mesh"""
+    import trimesh
+    sphere = trimesh.creation.icosphere(subdivisions=subdivisions)
+    return np.asarray(sphere.vertices), np.asarray(sphere.faces)
+
+def test_decimate_hits_target():
+    """Decimated mesh stays under the face budget and on the surface"""
+    vertices, faces = create_sphere()
+    target = len(faces) // 4
+    
+    new_vertices, new_faces, _ = quadric_decimate(vertices, faces, target)
+    
+    assert 0 < len(new_faces) <= target
+    assert len(new_faces) > target // 2
+    assert new_faces.max() < len(new_vertices)
+    assert np.abs(np.linalg.norm(new_vertices, axis=1) - 1.0).max() < 0.05
+
+def test_decimate_carries_uvs():
+    """UVs are reduced together with the vertices"""
+    vertices, faces = create_sphere(4)
+    uvs = vertices[:, :2] * 0.5 + 0.5
+    
+    new_vertices, new_faces, new_uvs = quadric_decimate(vertices, faces, len(faces) // 20, uvs)
+    
+    assert new_uvs.shape == (len(new_vertices), 2)
+    assert new_uvs.min() >= 0.0 and new_uvs.max() <= 1.0
+
+def test_decimate_noop_above_face_count():
+    """Targets above the current face count return the mesh unchanged"""
+    vertices, faces = create_sphere(2)
+    
+    new_vertices, new_faces, _ = quadric_decimate(vertices, faces, len(faces) * 2)
+    
+    assert len(new_faces) == len(faces)
+    assert np.allclose(new_vertices, vertices)
@@ -0,0 +1,72 @@
+"""
+Tests for memory-mapped PLY I/O
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from plyfile import PlyData, PlyElement
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from ply_io import create_ply, flush, iter_element, read_element, read_header, read_ply, write_ply
+
+def create_points(count: int = 1000) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    points = np.empty(count, dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("red", "u1"), ("id", "<i4")])
+    for name in ("x", "y", "z"):
+        points[name] = rng.normal(size=count)
+    points["red"] = rng.integers(0, 256, size=count)
+    points["id"] = np.arange(count)
+    return points
+
+def test_binary_round_trip_is_memory_mapped(tmp_path):
+    """Binary files written here load in plyfile and map back without copying"""
+    points = create_points()
+    path = str(tmp_path / "points.ply")
+    write_ply(path, {"vertex": points}, comments=["test"])
+
+    header = read_header(path)
+    assert header.format == "binary_little_endian"
+    assert header.comments == ["test"]
+    assert np.array_equal(PlyData.read(path)["vertex"].data, points)
+
+    vertices = read_element(path)
+    assert isinstance(vertices, np.memmap)
+    assert np.array_equal(vertices, points)
+    assert np.array_equal(np.concatenate(list(iter_element(path, chunk_rows=300))), points)
+
+def test_reads_big_endian_and_ascii(tmp_path):
+    """Files from other writers map with their own byte order or parse as text"""
+    points = create_points(50)
+    for text, byte_order in ((False, ">"), (True, "=")):
+        path = str(tmp_path / f"points_{text}.ply")
+        PlyData([PlyElement.describe(points, "vertex")], text=text, byte_order=byte_order).write(path)
+        vertices = read_ply(path)["vertex"]
+        for name in points.dtype.names:
+            assert np.array_equal(vertices[name], points[name])
+
+    write_ply(str(tmp_path / "ascii.ply"), {"vertex": points}, binary=False)
+    assert np.allclose(read_element(str(tmp_path / "ascii.ply"))["x"], points["x"])
+
+def test_create_ply_fills_in_blocks(tmp_path):
+    """Pre-sized outputs are filled through writable maps"""
+    path = str(tmp_path / "out.ply")
+    dtype = np.dtype([("a", "<u4"), ("b", "<f4")])
+    output = create_ply(path, [("chunk", 2, dtype), ("vertex", 10, dtype)])
+    output["vertex"]["a"][:] = np.arange(10)
+    output["chunk"]["b"][:] = [0.5, 1.5]
+    flush(output)
+    del output
+
+    elements = read_ply(path)
+    assert list(elements["vertex"]["a"]) == list(range(10))
+    assert list(elements["chunk"]["b"]) == [0.5, 1.5]
+
+def test_rejects_list_properties(tmp_path):
+    path = str(tmp_path / "mesh.ply")
+    faces = np.array([([0, 1, 2],)], dtype=[("vertex_indices", "i4", (3,))])
+    PlyData([PlyElement.describe(create_points(3), "vertex"), PlyElement.describe(faces, "face")]).write(path)
+    with pytest.raises(ValueError):
+        read_ply(path)
@@ -0,0 +1,46 @@
+"""
+Tests for streaming preview video encoding
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from preview_video import IMAGEIO_FFMPEG_AVAILABLE, encode_frames
+
+pytestmark = pytest.mark.skipif(not IMAGEIO_FFMPEG_AVAILABLE, reason="imageio-ffmpeg not installed")
+
+def moving_bar(count: int = 24, width: int = 96, height: int = 64):
+    """Frames are generated lazily, the encoder must not need them all at once"""
+    for i in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:, (i * 4) % width:(i * 4) % width + 8] = (255, 128, 0)
+        yield frame
+
+def test_mp4_stream(tmp_path):
+    path = str(tmp_path / "preview.mp4")
+    stats = encode_frames(moving_bar(), path, fps=12)
+    
+    assert stats["frames"] == 24
+    assert (stats["width"], stats["height"]) == (96, 64)
+    with open(path, "rb") as f:
+        assert f.read(12)[4:8] == b"ftyp"
+
+def test_animated_webp(tmp_path):
+    path = str(tmp_path / "preview.webp")
+    stats = encode_frames(moving_bar(), path, video_format="webp", quality=60)
+    
+    image = Image.open(path)
+    assert image.format == "WEBP"
+    assert image.n_frames == stats["frames"] == 24
+    assert image.size == (96, 64)
+
+def test_rejects_unknown_format_and_empty_input(tmp_path):
+    with pytest.raises(ValueError):
+        encode_frames(moving_bar(), str(tmp_path / "x.avi"), video_format="avi")
+    with pytest.raises(ValueError):
+        encode_frames(iter([]), str(tmp_path / "x.mp4"))
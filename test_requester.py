@@ -0,0 +1,22 @@
+"""
+Tests for identifying the requester behind a generation
+"""
+import pytest
+
+import app.core.requester as requester
+
+jwt = pytest.importorskip("jose.jwt")
+
+def bearer(secret: str) -> str:
+    return "Bearer " + jwt.encode({"sub": "user-1", "premium": True}, secret, algorithm=requester.settings.JWT_ALGORITHM)
+
+def test_tokens_signed_with_the_configured_secret_count(monkeypatch):
+    monkeypatch.setattr(requester.settings, "JWT_SECRET_KEY", "a-real-random-secret")
+    assert requester._token_claims(bearer("a-real-random-secret")) == {"sub": "user-1", "premium": True}
+    assert requester._token_claims(bearer("another-secret")) is None
+
+@pytest.mark.parametrize("sample", ["your-secret-key-here", "your-super-secret-jwt-key"])
+def test_sample_secrets_grant_nothing(monkeypatch, sample):
+    # Anyone can mint a premium token with a secret from the templates
+    monkeypatch.setattr(requester.settings, "JWT_SECRET_KEY", sample)
+    assert requester._token_claims(bearer(sample)) is None
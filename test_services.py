@@ -0,0 +1,46 @@
+"""
+Tests for the process-wide service registry
+"""
+import asyncio
+
+import pytest
+
+import app.core.services as services
+import app.services.task_store as task_store
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Fresh registry with a counting, instant TrellisService.initialize"""
+    calls = []
+
+    async def initialize(self):
+        calls.append(self)
+        await asyncio.sleep(0.01)  # Let concurrent first requests overlap
+        self.pipeline = "mock"
+        self.is_initialized = True
+
+    monkeypatch.setattr(services.TrellisService, "initialize", initialize)
+    monkeypatch.setattr(services, "_trellis_service", None)
+    monkeypatch.setattr(services, "_generation_service", None)
+    monkeypatch.setattr(services, "_lock", asyncio.Lock())
+    # Tasks in memory, so the tests do not create a database
+    monkeypatch.setattr(task_store.settings, "TASK_STORE", "memory")
+    monkeypatch.setattr(task_store, "_task_store", None)
+    return calls
+
+def test_services_are_initialized_once(registry):
+    async def burst():
+        return await asyncio.gather(*(services.get_generation_service() for _ in range(20)))
+
+    generation_services = asyncio.run(burst())
+    assert len(registry) == 1
+    assert all(service is generation_services[0] for service in generation_services)
+    assert asyncio.run(services.get_trellis_service()) is generation_services[0].trellis_service
+    assert services.services_ready()
+
+def test_shutdown_releases_services(registry):
+    first = asyncio.run(services.init_services())
+    asyncio.run(services.shutdown_services())
+    assert not services.services_ready()
+    assert asyncio.run(services.init_services()) is not first
+    assert len(registry) == 2
@@ -0,0 +1,56 @@
+"""
+Tests for Gaussian splat compaction
+"""
+import os
+import sys
+
+import numpy as np
+from plyfile import PlyData, PlyElement
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from splat_compact import compact_gaussians, compact_ply
+
+def create_gaussians(count: int = 1000, degree: int = 3, seed: int = 0) -> np.ndarray:
+    """Random Gaussians in the 3DGS PLY layout"""
+    rng = np.random.default_rng(seed)
+    rest = 3 * ((degree + 1) ** 2 - 1)
+    names = (
+        ["x", "y", "z", "nx", "ny", "nz", "f_dc_0", "f_dc_1", "f_dc_2"]
+        + [f"f_rest_{i}" for i in range(rest)]
+        + ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    )
+    vertices = np.empty(count, dtype=[(name, "<f4") for name in names])
+    for name in names:
+        vertices[name] = rng.normal(size=count)
+    for i in range(rest):
+        vertices[f"f_rest_{i}"] = i  # Coefficient index, to check the channel layout
+    vertices["opacity"] = rng.uniform(-10, 10, size=count)
+    vertices["scale_0"] = vertices["scale_1"] = vertices["scale_2"] = rng.uniform(-12, 0, size=count)
+    return vertices
+
+def test_prunes_transparent_and_tiny_gaussians():
+    """Opacity and scale thresholds are applied on the activated values"""
+    vertices = create_gaussians()
+    compacted, stats = compact_gaussians(vertices, min_opacity=0.1, min_scale=1e-3)
+
+    opacity = 1.0 / (1.0 + np.exp(-vertices["opacity"]))
+    expected = (opacity >= 0.1) & (np.exp(vertices["scale_0"]) >= 1e-3)
+    assert stats["gaussians_after"] == expected.sum() == len(compacted)
+    assert np.array_equal(compacted["x"], vertices["x"][expected])
+    assert stats["sh_degree_after"] == 3
+
+def test_sh_truncation_keeps_3dgs_layout(tmp_path):
+    """Truncated files keep per-channel coefficient order and stay readable"""
+    src = str(tmp_path / "splat.ply")
+    PlyData([PlyElement.describe(create_gaussians(), "vertex")]).write(src)
+
+    stats = compact_ply(src, str(tmp_path / "out.ply"), min_opacity=0.0, max_sh_degree=1)
+    vertex = PlyData.read(str(tmp_path / "out.ply"))["vertex"]
+
+    rest = [name for name in vertex.data.dtype.names if name.startswith("f_rest_")]
+    assert len(rest) == 9
+    # Degree 3 stores 15 coefficients per channel, degree 1 keeps the first 3 of each
+    assert [int(vertex[f"f_rest_{i}"][0]) for i in range(9)] == [0, 1, 2, 15, 16, 17, 30, 31, 32]
+    assert stats["gaussians_after"] == 1000
+    assert stats["bytes_after"] < stats["bytes_before"]
@@ -0,0 +1,90 @@
+"""
+Tests for the quantized compressed.ply web splat export
+"""
+import os
+import sys
+
+import numpy as np
+from plyfile import PlyData, PlyElement
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml_server'))
+
+from splat_web import CHUNK_SPLATS, SH_C0, export_compressed_ply
+
+FIELDS = [
+    "x", "y", "z", "f_dc_0", "f_dc_1", "f_dc_2", "opacity",
+    "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3",
+]
+
+def write_gaussians(path: str, count: int = 2000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vertices = np.empty(count, dtype=[(name, "<f4") for name in FIELDS])
+    for name in FIELDS:
+        vertices[name] = rng.normal(size=count)
+    vertices["scale_0"] = vertices["scale_1"] = vertices["scale_2"] = rng.uniform(-8, -2, size=count)
+    PlyData([PlyElement.describe(vertices, "vertex")]).write(path)
+    return vertices
+
+def unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    return (values & ((1 << bits) - 1)) / ((1 << bits) - 1)
+
+def decode(path: str):
+    """Unpack positions, rotations and colors the way the PlayCanvas reader does"""
+    ply = PlyData.read(path)
+    chunks = np.stack([ply["chunk"][name] for name in ply["chunk"].data.dtype.names], axis=1)
+    vertex = ply["vertex"]
+    chunk_of = np.arange(vertex.count) // CHUNK_SPLATS
+    lo, hi = chunks[chunk_of, 0:3], chunks[chunk_of, 3:6]
+
+    position = vertex["packed_position"]
+    unit = np.stack([unorm(position >> 21, 11), unorm(position >> 11, 10), unorm(position, 11)], axis=1)
+
+    rotation = vertex["packed_rotation"]
+    rest = np.stack([unorm(rotation >> 20, 10), unorm(rotation >> 10, 10), unorm(rotation, 10)], axis=1)
+    rest = (rest - 0.5) / (np.sqrt(2) * 0.5)
+    largest = np.sqrt(np.maximum(0.0, 1.0 - np.sum(rest ** 2, axis=1)))
+    quaternions = np.insert(rest, 0, 0.0, axis=1)
+    for row, index in enumerate(rotation >> 30):
+        quaternions[row] = np.insert(rest[row], index, largest[row])
+
+    color = vertex["packed_color"]
+    rgb = np.stack([unorm(color >> 24, 8), unorm(color >> 16, 8), unorm(color >> 8, 8)], axis=1)
+    return chunks, lo + unit * (hi - lo), quaternions, rgb
+
+def test_round_trip_within_quantization(tmp_path):
+    """Decoded splats match the source up to the packing precision"""
+    vertices = write_gaussians(str(tmp_path / "splat.ply"))
+    stats = export_compressed_ply(str(tmp_path / "splat.ply"), str(tmp_path / "web.ply"))
+    chunks, positions, quaternions, rgb = decode(str(tmp_path / "web.ply"))
+
+    assert stats["splats"] == len(vertices)
+    assert stats["chunks"] == len(chunks) == -(-len(vertices) // CHUNK_SPLATS)
+
+    # Match every decoded splat back to its source by position
+    source = np.stack([vertices["x"], vertices["y"], vertices["z"]], axis=1)
+    nearest = np.argmin(np.linalg.norm(positions[:, None] - source[None], axis=2), axis=1)
+    assert len(np.unique(nearest)) == len(vertices)
+    extent = chunks[:, 3:6] - chunks[:, 0:3]
+    assert np.abs(positions - source[nearest]).max() <= extent.max() / 1023
+
+    q = np.stack([vertices[f"rot_{i}"] for i in range(4)], axis=1)[nearest]
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    assert np.abs(np.sum(q * quaternions, axis=1)).min() > 0.999
+
+    f_dc = np.stack([vertices[f"f_dc_{i}"] for i in range(3)], axis=1)[nearest]
+    assert np.abs(rgb - np.clip(0.5 + SH_C0 * f_dc, 0, 1)).max() <= 0.5 / 255 + 1e-6
+
+def test_orderings(tmp_path):
+    """Morton chunks are spatially tighter than importance-ordered ones, which put visible splats first"""
+    write_gaussians(str(tmp_path / "splat.ply"))
+    export_compressed_ply(str(tmp_path / "splat.ply"), str(tmp_path / "morton.ply"), order="morton")
+    export_compressed_ply(str(tmp_path / "splat.ply"), str(tmp_path / "importance.ply"), order="importance")
+
+    morton_chunks = decode(str(tmp_path / "morton.ply"))[0]
+    importance_chunks = decode(str(tmp_path / "importance.ply"))[0]
+    morton_extent = np.prod(morton_chunks[:, 3:6] - morton_chunks[:, 0:3], axis=1).mean()
+    importance_extent = np.prod(importance_chunks[:, 3:6] - importance_chunks[:, 0:3], axis=1).mean()
+    assert morton_extent < importance_extent / 2
+
+    # Larger splats (higher max scale) land in the first chunks
+    assert importance_chunks[0, 9:12].max() >= importance_chunks[-1, 9:12].max()
@@ -0,0 +1,119 @@
+"""
+Tests for the shared generation task store
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.services.task_store as task_store
+from app.models.generation import GenerationStatus, GenerationTask
+
+def make_task(task_id, owner, priority="free", seconds=0, status=GenerationStatus.PENDING):
+    return GenerationTask(
+        task_id=task_id,
+        status=status,
+        created_at=datetime(2024, 5, 1, 12, 0, 0) + timedelta(seconds=seconds),
+        owner=owner,
+        priority=priority
+    )
+
+def sql_store(url, owner):
+    engine = create_engine(url)
+    return task_store.SqlTaskStore(owner, sessionmaker(bind=engine), engine)
+
+@pytest.fixture(params=["memory", "database"])
+def replicas(request, tmp_path):
+    """Two replicas' views of the same task state"""
+    if request.param == "memory":
+        store = task_store.MemoryTaskStore("replica-a")
+        return store, store
+    url = f"sqlite:///{tmp_path / 'tasks.db'}"
+    return sql_store(url, "replica-a"), sql_store(url, "replica-b")
+
+def test_any_replica_reads_any_task(replicas):
+    a, b = replicas
+
+    async def scenario():
+        await a.add(make_task("task-1", a.owner))
+        seen = await b.get("task-1")
+        assert seen.status == GenerationStatus.PENDING and seen.owner == "replica-a"
+        seen.status = GenerationStatus.COMPLETED
+        assert await b.save(seen)
+        assert (await a.get("task-1")).status == GenerationStatus.COMPLETED
+        await b.delete("task-1")
+        assert await a.get("task-1") is None
+
+    asyncio.run(scenario())
+
+def test_save_is_compare_and_set(replicas):
+    a, b = replicas
+
+    async def scenario():
+        await a.add(make_task("task-1", a.owner))
+        # Cancelled through the other replica while queued
+        cancelled = await b.get("task-1")
+        cancelled.status = GenerationStatus.CANCELLED
+        assert await b.save(cancelled, expected=task_store.ACTIVE_STATUSES)
+        # The owner's PENDING -> PROCESSING transition no longer applies
+        started = make_task("task-1", a.owner, status=GenerationStatus.PROCESSING)
+        assert not await a.save(started, expected=(GenerationStatus.PENDING,))
+        assert (await a.get("task-1")).status == GenerationStatus.CANCELLED
+        assert not await a.save(make_task("missing", a.owner))
+
+    asyncio.run(scenario())
+
+def test_stored_copies_are_not_shared(replicas):
+    a, _ = replicas
+
+    async def scenario():
+        task = make_task("task-1", a.owner)
+        await a.add(task)
+        task.status = GenerationStatus.FAILED
+        assert (await a.get("task-1")).status == GenerationStatus.PENDING
+
+    asyncio.run(scenario())
+
+def test_queued_ahead_counts_the_owners_earlier_or_higher_tasks(replicas):
+    a, b = replicas
+
+    async def scenario():
+        await a.add(make_task("free-1", "replica-a", seconds=1))
+        await a.add(make_task("premium-1", "replica-a", priority="premium", seconds=5))
+        await a.add(make_task("free-2", "replica-a", seconds=2))
+        await a.add(make_task("done", "replica-a", status=GenerationStatus.COMPLETED))
+        await a.add(make_task("elsewhere", "replica-c"))
+        assert await b.queued_ahead(await b.get("free-2")) == 2
+        assert await b.queued_ahead(await b.get("free-1")) == 1
+        assert await b.queued_ahead(await b.get("premium-1")) == 0
+        assert await b.counts() == {"pending": 4, "completed": 1}
+
+    asyncio.run(scenario())
+
+def test_purge_removes_only_old_finished_tasks(replicas):
+    a, b = replicas
+    old = datetime(2024, 5, 1, 12, 0, 0)
+
+    async def scenario():
+        await a.add(make_task("old-done", a.owner, status=GenerationStatus.COMPLETED))
+        await a.add(make_task("old-pending", a.owner))
+        await a.add(make_task("new-done", a.owner, seconds=3600, status=GenerationStatus.FAILED))
+        assert await b.purge(old + timedelta(minutes=1)) == 1
+        assert await a.get("old-done") is None
+        assert await a.get("old-pending") is not None and await a.get("new-done") is not None
+
+    asyncio.run(scenario())
+
+def test_memory_store_evicts_oldest_finished_tasks():
+    store = task_store.MemoryTaskStore("replica-a", max_tasks=2)
+
+    async def scenario():
+        await store.add(make_task("done-1", "replica-a", status=GenerationStatus.COMPLETED))
+        await store.add(make_task("pending-1", "replica-a"))
+        await store.add(make_task("pending-2", "replica-a"))
+        assert list(store.tasks) == ["pending-1", "pending-2"]
+
+    asyncio.run(scenario())